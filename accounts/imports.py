@@ -0,0 +1,296 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from rest_framework.exceptions import ValidationError
+from sentry_sdk import logger as sentry_logger
+
+from docuhealth2.utils.email_service import QueuedEmailService
+from docuhealth2.utils.generate import generate_otp
+from docuhealth2.utils.hin import reserve_hins
+from hospital_ops.models import HospitalPatientActivity
+
+from .models import User, OTP, PatientProfile, PatientImportJob, PatientImportError
+from .serializers import PatientImportRowSerializer
+
+mailer = QueuedEmailService()
+job_executor = ThreadPoolExecutor(max_workers=settings.PATIENT_IMPORT_JOB_WORKERS, thread_name_prefix="patient-import")
+
+# Jobs submitted to this process's executor that have not started yet
+queued_job_ids = set()
+queued_lock = threading.Lock()
+
+FORMAT_EXTENSIONS = {
+    ".csv": PatientImportJob.Format.CSV,
+    ".ndjson": PatientImportJob.Format.NDJSON,
+    ".jsonl": PatientImportJob.Format.NDJSON,
+}
+
+class UnreadableRow:
+    """Stands in for an NDJSON line that is not a JSON object, so it is reported like any invalid row."""
+
+    def __init__(self, error):
+        self.error = error
+
+    def get(self, key, default=None):
+        return default
+
+def detect_format(file_name):
+    return FORMAT_EXTENSIONS.get(os.path.splitext(file_name or "")[1].lower())
+
+def spool_path_for(file_name):
+    os.makedirs(settings.PATIENT_IMPORT_SPOOL_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=os.path.splitext(file_name)[1], dir=settings.PATIENT_IMPORT_SPOOL_DIR)
+    os.close(fd)
+    return path
+
+def create_import_job(hospital, file_name, fmt, created_by=None, staff=None, verify_url="", upload=None, source_path=None, run=True):
+    """
+    Copies the file (an UploadedFile or a path on disk) to the spool directory and records a
+    PatientImportJob. With `run`, the job starts on the import executor once the caller's
+    transaction commits.
+    """
+    path = spool_path_for(file_name)
+    try:
+        if upload is not None:
+            with open(path, "wb") as spool:
+                for chunk in upload.chunks():
+                    spool.write(chunk)
+        else:
+            shutil.copyfile(source_path, path)
+
+        job = PatientImportJob.objects.create(
+            hospital=hospital, created_by=created_by, staff=staff,
+            file_name=file_name, file_path=path, format=fmt, verify_url=verify_url or "",
+        )
+    except Exception:
+        remove_spooled(path)
+        raise
+
+    if run:
+        transaction.on_commit(lambda: submit_import_job(job.id))
+    return job
+
+def submit_import_job(job_id):
+    with queued_lock:
+        queued_job_ids.add(job_id)
+    job_executor.submit(run_import_job, job_id)
+
+def keep_queued_jobs_fresh(job):
+    """Touches the jobs waiting behind a long import, so the sweep does not take them for orphans."""
+    with queued_lock:
+        job_ids = list(queued_job_ids)
+    if job_ids:
+        PatientImportJob.objects.filter(id__in=job_ids, status=PatientImportJob.Status.PENDING).update(updated_at=timezone.now())
+
+def remove_spooled(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def iter_rows(job):
+    """Streams the file's data rows as dicts; the file is never read into memory whole."""
+    with open(job.file_path, newline="", encoding="utf-8-sig") as file:
+        if job.format == PatientImportJob.Format.CSV:
+            for row in csv.DictReader(file):
+                yield {
+                    key.strip().lower(): value.strip() if isinstance(value, str) else value
+                    for key, value in row.items() if key
+                }
+            return
+
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield UnreadableRow(f"Invalid JSON: {e}")
+                continue
+            yield row if isinstance(row, dict) else UnreadableRow("Each line must be a JSON object")
+
+def run_import_job(job_id):
+    """
+    Imports a pending job from where it left off. Safe to call from any thread. The spooled
+    file only exists on the machine that took the upload, so failures are retried here,
+    in-process, rather than by another worker.
+    """
+    with queued_lock:
+        queued_job_ids.discard(job_id)
+
+    try:
+        claimed = PatientImportJob.objects.filter(id=job_id, status=PatientImportJob.Status.PENDING).update(
+            status=PatientImportJob.Status.PROCESSING, attempts=F("attempts") + 1
+        )
+        if not claimed:
+            return
+
+        job = PatientImportJob.objects.select_related("hospital", "staff").get(id=job_id)
+        if not os.path.exists(job.file_path):
+            # Lost with a restarted machine; retrying cannot bring it back
+            abandon_import_job(job, f"Spooled file is gone: {job.file_name}")
+            return
+
+        import_rows(job, progress=keep_queued_jobs_fresh)
+
+    except Exception as e:
+        sentry_logger.error(f"Patient import job {job_id} crashed: {e}")
+        job = PatientImportJob.objects.filter(id=job_id, status=PatientImportJob.Status.PROCESSING).first()
+        if job is not None:
+            fail_import_job(job, str(e))
+    finally:
+        close_old_connections()
+
+def retry_delay(attempts):
+    return min(settings.PATIENT_IMPORT_BACKOFF_SECONDS * (2 ** (attempts - 1)), settings.PATIENT_IMPORT_MAX_BACKOFF_SECONDS)
+
+def fail_import_job(job, error):
+    """
+    Schedules another attempt after a backoff, continuing after the last committed chunk, or
+    gives up once PATIENT_IMPORT_MAX_ATTEMPTS is reached.
+    """
+    if job.attempts >= settings.PATIENT_IMPORT_MAX_ATTEMPTS:
+        abandon_import_job(job, error)
+        return
+
+    job.last_error = error
+    job.status = PatientImportJob.Status.PENDING
+    job.save(update_fields=["status", "last_error", "updated_at"])
+
+    timer = threading.Timer(retry_delay(job.attempts), submit_import_job, args=(job.id,))
+    timer.daemon = True
+    timer.start()
+
+def abandon_import_job(job, error):
+    job.last_error = error
+    job.status = PatientImportJob.Status.FAILED
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "last_error", "finished_at", "updated_at"])
+    sentry_logger.error(f"Patient import job {job.id} failed: {error}")
+    remove_spooled(job.file_path)
+
+def import_rows(job, chunk_size=None, progress=None):
+    chunk_size = chunk_size or settings.PATIENT_IMPORT_CHUNK_SIZE
+    validator = PatientImportRowSerializer()
+
+    rows = iter_rows(job)
+    for _ in islice(rows, job.rows_processed):
+        pass
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        import_chunk(job, chunk, validator)
+        if progress:
+            progress(job)
+
+    job.status = PatientImportJob.Status.COMPLETED
+    job.last_error = ""
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "last_error", "finished_at", "updated_at"])
+    remove_spooled(job.file_path)
+
+def import_chunk(job, rows, validator):
+    """
+    Validates a chunk and registers its valid rows with one bulk INSERT per table. The rows,
+    their errors and the job's progress commit together, so a crash never half-imports a chunk.
+    """
+    first_row_number = job.rows_processed + 1
+    valid, errors = [], []
+
+    for row_number, row in enumerate(rows, start=first_row_number):
+        if isinstance(row, UnreadableRow):
+            errors.append(PatientImportError(job=job, row_number=row_number, errors={"row": [row.error]}))
+            continue
+        try:
+            data = validator.run_validation(row)
+        except ValidationError as e:
+            errors.append(PatientImportError(job=job, row_number=row_number, email=str(row.get("email") or "")[:255], errors=e.detail))
+            continue
+
+        data["email"] = User.objects.normalize_email(data.get("email")) or None
+        valid.append((row_number, data))
+
+    # Earlier chunks are already committed, so this also catches duplicates across the file
+    emails = [data["email"] for _, data in valid if data["email"]]
+    taken = set(User.objects.filter(email__in=emails).values_list("email", flat=True))
+    accepted = []
+    for row_number, data in valid:
+        email = data["email"]
+        if email and email in taken:
+            errors.append(PatientImportError(job=job, row_number=row_number, email=email, errors={"email": ["User with this email already exists."]}))
+            continue
+        if email:
+            taken.add(email)
+        accepted.append(data)
+
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(email=data["email"], role=User.Role.PATIENT, is_verified=False, password=make_password(None))
+            for data in accepted
+        ])
+        profiles = PatientProfile.objects.bulk_create([
+            PatientProfile(user=user, hin=hin, **profile_fields(data))
+            for user, hin, data in zip(users, reserve_hins(len(users)), accepted)
+        ])
+        HospitalPatientActivity.objects.bulk_create([
+            HospitalPatientActivity(patient=profile, staff=job.staff, hospital=job.hospital, action="create_patient_account")
+            for profile in profiles
+        ])
+        if job.verify_url:
+            queue_welcome_emails(job, [user for user in users if user.email])
+        PatientImportError.objects.bulk_create(errors)
+
+        job.rows_processed += len(rows)
+        job.rows_imported += len(users)
+        job.rows_failed += len(errors)
+        job.save(update_fields=["rows_processed", "rows_imported", "rows_failed", "updated_at"])
+
+def profile_fields(data):
+    fields = {key: value for key, value in data.items() if key not in ("email", "house_no")}
+    house_no = data.get("house_no")
+    if house_no:
+        fields["street"] = f'{house_no}, {fields["street"]}' if fields.get("street") else house_no
+    return fields
+
+def queue_welcome_emails(job, users):
+    """One OTP per patient and one outbox row per email, written in bulk; the outbox worker sends them."""
+    expiry = timezone.now() + timedelta(minutes=settings.PATIENT_IMPORT_OTP_EXPIRY_MINUTES)
+    otps = OTP.objects.bulk_create([OTP(user=user, otp=generate_otp(), expiry=expiry) for user in users])
+    minutes = settings.PATIENT_IMPORT_OTP_EXPIRY_MINUTES
+    expires_in = f"{minutes // (60 * 24)} days" if minutes >= 60 * 24 else f"{minutes} mins"
+
+    mailer.send_many([
+        {
+            "subject": f"{job.hospital.name} registered you on DocuHealth",
+            "body": (
+                f"{job.hospital.name} has created a DocuHealth account for you.\n\n"
+                f"Enter the OTP below into the required field \n"
+                f"The OTP will expire in {expires_in}\n\n"
+                f"OTP: {otp.otp}\n\n"
+
+                f"Please use the link below and enter your OTP: \n\n"
+                f"{job.verify_url}\n\n"
+
+                f"If you do not recognise this hospital, please contact support@docuhealthservices.com\n\n"
+                f"From the Docuhealth Team"
+            ),
+            "recipient": user.email,
+        }
+        for user, otp in zip(users, otps)
+    ])
@@ -0,0 +1,69 @@
+import random
+import secrets
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import User, PatientProfile
+from docuhealth2.utils.hin import reserve_hins, is_valid_hin
+
+class Rollback(Exception):
+    pass
+
+def legacy_hin():
+    """The previous scheme: 13 random digits, re-rolled until no existing patient has them."""
+    while True:
+        hin = ''.join([str(random.randint(0, 9)) for _ in range(13)])
+        if not PatientProfile.all_objects.filter(hin=hin).exists():
+            return hin
+
+class Command(BaseCommand):
+    help = 'Registers patients with reserved HIN blocks and compares per-row registration with the old random-retry HINs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Patients to insert in bulk')
+        parser.add_argument('--block', type=int, default=10_000, help='HINs reserved per round trip')
+        parser.add_argument('--sample', type=int, default=2_000, help='Patients registered one at a time for each per-row comparison')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['block'], options['sample'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, block, sample):
+        tag = secrets.token_hex(4)
+
+        start = time.perf_counter()
+        for offset in range(0, rows, block):
+            count = min(block, rows - offset)
+            users = User.objects.bulk_create(
+                User(email=f"bench-{tag}-{offset + i}@docuhealth.local", role=User.Role.PATIENT) for i in range(count)
+            )
+            PatientProfile.objects.bulk_create(
+                PatientProfile(user=user, hin=hin, firstname="Bench", lastname="Patient", dob="1990-01-01", gender="male")
+                for user, hin in zip(users, reserve_hins(count))
+            )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Bulk: {rows:,} patients in {elapsed:.1f}s ({rows / elapsed:,.0f}/s), HINs reserved {block:,} at a time")
+
+        inserted = PatientProfile.objects.filter(user__email__startswith=f"bench-{tag}-")
+        hins = list(inserted.values_list('hin', flat=True))
+        self.stdout.write(f"Distinct HINs: {len(set(hins)):,} of {len(hins):,}; failing the check digit: {sum(not is_valid_hin(h) for h in hins)}")
+
+        # Per-row registration, as the signup views do it, with the table now holding `rows` patients.
+        for label, hin_source in (("random-retry", legacy_hin), ("allocator", None)):
+            start = time.perf_counter()
+            for i in range(sample):
+                user = User.objects.create(email=f"bench-{tag}-{label}-{i}@docuhealth.local", role=User.Role.PATIENT)
+                PatientProfile.objects.create(
+                    user=user, hin=hin_source() if hin_source else "",
+                    firstname="Bench", lastname="Patient", dob="1990-01-01", gender="male",
+                )
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"Per row, {label:<12}: {elapsed / sample * 1000:.3f} ms/patient over {sample:,}")
+
+        self.stdout.write(self.style.SUCCESS('Done (all rows rolled back)'))
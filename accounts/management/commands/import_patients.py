@@ -0,0 +1,92 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import PatientImportJob
+from accounts.imports import create_import_job, detect_format, import_rows, run_import_job
+from organizations.models import HospitalProfile
+
+# Jobs are retried in-process by the machine that spooled their file, within a few minutes
+# (PATIENT_IMPORT_MAX_BACKOFF_SECONDS), and a running import touches the jobs queued behind
+# it after every chunk. One untouched for this long lost that machine.
+STALE_AFTER = timedelta(minutes=15)
+
+class Command(BaseCommand):
+    help = (
+        'Imports patients for a hospital from a CSV or NDJSON file, or with --resume sweeps import jobs '
+        'orphaned by a restart: each is run once more, which continues it if its spooled file is on '
+        'this machine and marks it failed otherwise'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='CSV or NDJSON file of patients')
+        parser.add_argument('--hospital', help='HIN of the hospital the patients are registered with')
+        parser.add_argument('--format', choices=PatientImportJob.Format.values, help='Defaults from the file extension')
+        parser.add_argument('--verify-url', default='', help='Send each patient with an email an OTP and this link')
+        parser.add_argument('--chunk-size', type=int, help='Rows validated and inserted per transaction')
+        parser.add_argument('--resume', action='store_true', help='Continue stale jobs from their last committed chunk')
+        parser.add_argument('--loop', action='store_true', help='With --resume, keep sweeping instead of exiting')
+        parser.add_argument('--sleep', type=float, default=60.0, help='Seconds between sweeps when looping')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            while True:
+                self.resume()
+                if not options['loop']:
+                    return
+                time.sleep(options['sleep'])
+
+        if not options['path'] or not options['hospital']:
+            raise CommandError("Pass a file and --hospital, or --resume")
+        if not os.path.exists(options['path']):
+            raise CommandError(f"No such file: {options['path']}")
+
+        hospital = HospitalProfile.objects.filter(hin=options['hospital']).first()
+        if hospital is None:
+            raise CommandError(f"No hospital with HIN {options['hospital']}")
+
+        file_name = os.path.basename(options['path'])
+        fmt = options['format'] or detect_format(file_name)
+        if not fmt:
+            raise CommandError("Could not tell the format from the file name; pass --format")
+
+        job = create_import_job(
+            hospital=hospital, file_name=file_name, fmt=fmt,
+            verify_url=options['verify_url'], source_path=options['path'], run=False,
+        )
+        PatientImportJob.objects.filter(id=job.id).update(status=PatientImportJob.Status.PROCESSING, attempts=1)
+        job.refresh_from_db()
+
+        start = time.perf_counter()
+        import_rows(job, chunk_size=options['chunk_size'], progress=self.report)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Job {job.id}: imported {job.rows_imported:,} of {job.rows_processed:,} rows in {elapsed:.1f}s, "
+            f"{job.rows_failed:,} rejected (see /patients/import/{job.id}/errors)"
+        ))
+
+    def report(self, job):
+        self.stdout.write(f"  {job.rows_processed:,} rows read, {job.rows_imported:,} imported, {job.rows_failed:,} rejected")
+
+    def resume(self):
+        stale = PatientImportJob.objects.filter(
+            Q(status=PatientImportJob.Status.PROCESSING) | Q(status=PatientImportJob.Status.PENDING),
+            updated_at__lt=timezone.now() - STALE_AFTER,
+        )
+        stale.filter(status=PatientImportJob.Status.PROCESSING).update(status=PatientImportJob.Status.PENDING)
+
+        job_ids = list(stale.order_by('created_at').values_list('id', flat=True))
+        if not job_ids:
+            return
+
+        for job_id in job_ids:
+            run_import_job(job_id)
+
+        for job in PatientImportJob.objects.filter(id__in=job_ids).order_by('created_at'):
+            self.stdout.write(f"Job {job.id}: {job.status}, {job.rows_imported:,} imported, {job.rows_failed:,} rejected")
+        self.stdout.write(self.style.SUCCESS(f"Swept {len(job_ids)} stale jobs"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_seed_staff_id_sequences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientprofile',
+            name='last_completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:41
+
+from django.db import migrations, models
+
+
+def create_hin_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE SEQUENCE IF NOT EXISTS hin_seq AS bigint START 1")
+
+
+def drop_hin_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP SEQUENCE IF EXISTS hin_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_user_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HINCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_hin_sequence, drop_hin_sequence),
+    ]
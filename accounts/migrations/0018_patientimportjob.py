@@ -0,0 +1,65 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_hincounter'),
+        ('organizations', '0017_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_path', models.CharField(max_length=500)),
+                ('format', models.CharField(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], max_length=10)),
+                ('verify_url', models.URLField(blank=True, default='')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('rows_imported', models.PositiveIntegerField(default=0)),
+                ('rows_failed', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='patient_import_jobs', to=settings.AUTH_USER_MODEL)),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='patient_import_jobs', to='organizations.hospitalprofile')),
+                ('staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='patient_import_jobs', to='accounts.hospitalstaffprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PatientImportError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField()),
+                ('email', models.CharField(blank=True, default='', max_length=255)),
+                ('errors', models.JSONField(default=dict)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='row_errors', to='accounts.patientimportjob')),
+            ],
+            options={
+                'ordering': ['row_number'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='patientimportjob',
+            index=models.Index(fields=['status', 'updated_at'], name='accounts_pa_status_d0cc94_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientimportjob',
+            index=models.Index(fields=['hospital', 'created_at'], name='accounts_pa_hospita_5e01a8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientimporterror',
+            index=models.Index(fields=['job', 'row_number'], name='accounts_pa_job_id_a85056_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:56
+
+from django.db import migrations, models
+
+
+# Expression indexes for accounts.search. Postgres only: other backends fall back to plain scans.
+SEARCH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS patients_patientprofile_name_trgm ON patients_patientprofile "
+    "USING gin ((firstname || ' ' || COALESCE(middlename, '') || ' ' || lastname) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS patients_patientprofile_firstname_upper_like ON patients_patientprofile "
+    "((UPPER(firstname::text)) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS patients_patientprofile_lastname_upper_like ON patients_patientprofile "
+    "((UPPER(lastname::text)) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS core_user_email_upper_like ON core_user "
+    "((UPPER(email::text)) text_pattern_ops)",
+]
+
+INDEX_NAMES = [
+    "patients_patientprofile_name_trgm",
+    "patients_patientprofile_firstname_upper_like",
+    "patients_patientprofile_lastname_upper_like",
+    "core_user_email_upper_like",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for sql in SEARCH_INDEXES:
+            schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in INDEX_NAMES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_patientimportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patientprofile',
+            name='phone_num',
+            field=models.CharField(blank=True, db_index=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -5,7 +5,8 @@ from django.utils.timezone import now, timedelta
 
 from cloudinary.models import CloudinaryField
 
-from docuhealth2.utils.generate import generate_HIN, generate_otp, generate_staff_id, get_next_staff_id
+from docuhealth2.utils.generate import generate_otp, get_next_staff_id
+from docuhealth2.utils.hin import allocate_hin
 from docuhealth2.models import BaseModel
 
 def default_notification_settings():
@@ -64,6 +65,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     paystack_cus_code = models.CharField(max_length=200, blank=True, null=True)
     
+    # Stamped into access tokens as `tv`. Bumped (accounts.tokens.bump_token_version) when role,
+    # staff role, ward or active status change, so older tokens go back through the database.
+    token_version = models.PositiveIntegerField(default=0)
+    
     USERNAME_FIELD = 'email'
     
     objects = UserManager()
@@ -150,7 +155,7 @@ class PatientProfile(BaseModel):
     
     dob = models.DateField()
     gender = models.CharField(choices=Gender.choices)
-    phone_num = models.CharField(blank=True)
+    phone_num = models.CharField(blank=True, db_index=True)
     firstname = models.CharField(max_length=100)
     lastname = models.CharField(max_length=100)
     middlename = models.CharField(max_length=100, blank=True, null=True)
@@ -169,13 +174,14 @@ class PatientProfile(BaseModel):
     
     notification_settings = models.JSONField(default=default_notification_settings)
     
+    # Scheduled time of the patient's latest COMPLETED appointment at any hospital, maintained by
+    # Appointment.save(). Deliberately per patient, not per (patient, hospital): appointment lists
+    # report last_visited across hospitals, including the hospital-scoped ones.
+    last_completed_at = models.DateTimeField(blank=True, null=True)
+    
     def save(self, *args, **kwargs):
-        if not self.hin:  
-            while True:
-                new_hin = generate_HIN()
-                if not PatientProfile.all_objects.filter(hin=new_hin).exists():
-                    self.hin = new_hin
-                    break
+        if not self.hin:
+            self.hin = allocate_hin()
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -241,12 +247,8 @@ class SubaccountProfile(BaseModel):
     updated_at = models.DateTimeField(auto_now=True)
     
     def save(self, *args, **kwargs):
-        if not self.hin:  
-            while True:
-                new_hin = generate_HIN()
-                if not SubaccountProfile.all_objects.filter(hin=new_hin).exists():
-                    self.hin = new_hin
-                    break
+        if not self.hin:
+            self.hin = allocate_hin()
         super().save(*args, **kwargs)
         
     class Meta:
@@ -283,11 +285,26 @@ class HospitalStaffProfile(BaseModel):
     
     updated_at = models.DateTimeField(auto_now=True)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        data = instance.__dict__
+        if {"role", "ward_id", "hospital_id"} <= data.keys():
+            # What this staff member's access tokens carry; see save()
+            instance._loaded_claims = (data["role"], data["ward_id"], data["hospital_id"])
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.staff_id:
             self.staff_id = get_next_staff_id(self.hospital, self.role)
         super().save(*args, **kwargs)
         
+        loaded = getattr(self, "_loaded_claims", None)
+        if loaded is not None and loaded != (self.role, self.ward_id, self.hospital_id):
+            from .tokens import bump_token_version
+            bump_token_version([self.user_id])
+        self._loaded_claims = (self.role, self.ward_id, self.hospital_id)
+        
     class Meta:
         db_table = 'hospitals_hospitalstaffprofile'
     
@@ -306,3 +323,61 @@ class StaffCounter(models.Model):
 
     class Meta:
         unique_together = ("hospital", "role")
+
+class HINCounter(models.Model):
+    """Stands in for the `hin_seq` Postgres sequence on backends without sequences."""
+    last_value = models.BigIntegerField(default=0)
+
+class PatientImportJob(BaseModel):
+    """A CSV/NDJSON file of patients being registered in bulk by accounts.imports, one committed chunk at a time."""
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    class Format(models.TextChoices):
+        CSV = "csv", "CSV"
+        NDJSON = "ndjson", "NDJSON"
+
+    hospital = models.ForeignKey("organizations.HospitalProfile", on_delete=models.CASCADE, related_name="patient_import_jobs")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="patient_import_jobs")
+    staff = models.ForeignKey(HospitalStaffProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name="patient_import_jobs")
+
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500)
+    format = models.CharField(max_length=10, choices=Format.choices)
+    verify_url = models.URLField(blank=True, default="")
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    # Data rows consumed so far; a resumed job skips this many rows of the file.
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "updated_at"]),
+            models.Index(fields=["hospital", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Patient import {self.id} ({self.status})"
+
+class PatientImportError(models.Model):
+    job = models.ForeignKey(PatientImportJob, on_delete=models.CASCADE, related_name="row_errors")
+    row_number = models.PositiveIntegerField()
+    email = models.CharField(max_length=255, blank=True, default="")
+    errors = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ["row_number"]
+        indexes = [
+            models.Index(fields=["job", "row_number"]),
+        ]
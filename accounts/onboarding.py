@@ -0,0 +1,60 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from docuhealth2.utils.email_service import QueuedEmailService
+from docuhealth2.utils.generate import reserve_staff_ids
+
+from .models import User, HospitalStaffProfile
+
+mailer = QueuedEmailService()
+# PBKDF2 runs outside the GIL, so a batch of passwords hashes in parallel on these threads
+password_hasher = ThreadPoolExecutor(max_workers=settings.TEAM_ONBOARDING_HASH_WORKERS, thread_name_prefix="password-hash")
+
+def hash_passwords(passwords):
+    return list(password_hasher.map(make_password, passwords))
+
+def onboard_team_members(hospital, members, invitation_message, login_url):
+    """
+    Creates every member's user and staff profile with one bulk INSERT per table, reserves
+    staff IDs with one upsert per role, and queues the invitations in one outbox write.
+    All of it commits together, so a failure leaves no half-onboarded team.
+    """
+    passwords = hash_passwords([member["password"] for member in members])
+
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(email=member["email"], password=password, role=User.Role.HOSPITAL_STAFF, is_active=True, is_verified=True)
+            for member, password in zip(members, passwords)
+        ])
+
+        # Taken last, just before the rows that use them: a role's first reservation creates its counter row, locked until commit
+        roles = Counter(member["profile"]["role"] for member in members)
+        staff_ids = {role: iter(reserve_staff_ids(hospital, role, count)) for role, count in roles.items()}
+
+        profiles = HospitalStaffProfile.objects.bulk_create([
+            HospitalStaffProfile(user=user, hospital=hospital, staff_id=next(staff_ids[member["profile"]["role"]]), **member["profile"])
+            for user, member in zip(users, members)
+        ])
+
+        mailer.send_many([
+            {
+                "subject": f"Welcome to {hospital.name} hospital",
+                "body": (
+                    f"{invitation_message} \n\n"
+
+                    f"Please use the link below to log in to your account: \n\n"
+                    f"{login_url}\n\n"
+
+                    f"If you did not initiate this request, please contact support@docuhealthservices.com\n\n"
+                    f"From the Docuhealth Team"
+                ),
+                "recipient": user.email,
+            }
+            for user in users
+        ])
+
+    return profiles
@@ -1,7 +1,8 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from docuhealth2.utils.http_client import ProviderClient
+
 load_dotenv()
 
 korapay_key = os.getenv('KORAPAY_LIVE_SECRET_KEY')
@@ -11,7 +12,9 @@ headers = {
                 "Content-Type": "application/json"
             }
 
-url = "https://api.korapay.com/merchant/api/v1/identities/ng/nin"
+base_url = "https://api.korapay.com/merchant/api/v1/"
+
+korapay = ProviderClient("korapay", base_url, headers=headers)
 
 def verify_nin_request(nin):
         payload = {
@@ -20,7 +23,7 @@ def verify_nin_request(nin):
         }
 
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = korapay.post("identities/ng/nin", json=payload)
             data = response.json()
             
         except Exception as e:
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.db.models import BooleanField, Exists, FloatField, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+
+from hospital_ops.models import HospitalPatientActivity
+
+from .models import PatientProfile
+
+MIN_QUERY_LENGTH = 2
+MIN_FUZZY_LENGTH = 3
+
+_table = PatientProfile._meta.db_table
+# Must match the trigram index expression in accounts migration 0019 for Postgres to use it
+SEARCH_NAME_SQL = f"({_table}.firstname || ' ' || COALESCE({_table}.middlename, '') || ' ' || {_table}.lastname)"
+
+def hospital_patients(hospital):
+    """Patients with any recorded activity at `hospital`."""
+    return PatientProfile.objects.filter(
+        Exists(HospitalPatientActivity.objects.filter(hospital=hospital, patient=OuterRef("pk")))
+    ).select_related("user")
+
+def search_patients(hospital, query, limit=20):
+    """
+    Ranked matches among the hospital's patients for a reception desk search box. Digits
+    match HIN or phone number prefixes, anything with an @ matches email prefixes, and
+    everything else matches names: first- or last-name prefixes first, then (on Postgres)
+    trigram matches that tolerate typos and word order, best first.
+    """
+    query = " ".join(query.split())
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+
+    patients = hospital_patients(hospital)
+
+    if query.lstrip("+").isdigit():
+        return list(patients.filter(Q(hin__startswith=query) | Q(phone_num__startswith=query)).order_by("hin")[:limit])
+
+    if "@" in query:
+        return list(patients.filter(user__email__istartswith=query).order_by("user__email")[:limit])
+
+    # One prefix query per column, so each can be answered from that column's own index
+    results = {}
+    for field in ("firstname", "lastname"):
+        for patient in patients.filter(**{f"{field}__istartswith": query}).order_by(Upper(field), "id")[:limit]:
+            results.setdefault(patient.id, patient)
+
+    results = sorted(results.values(), key=lambda patient: (patient.firstname.upper(), patient.lastname.upper(), patient.id))[:limit]
+    if len(results) < limit and len(query) >= MIN_FUZZY_LENGTH:
+        results += fuzzy_name_matches(patients.exclude(id__in=[patient.id for patient in results]), query, limit - len(results))
+    return results
+
+def fuzzy_name_matches(patients, query, limit):
+    if connection.vendor == "postgresql":
+        # `<%` is pg_trgm's word-similarity operator, answered from the GIN trigram index
+        return list(
+            patients.filter(RawSQL(f"%s <%% {SEARCH_NAME_SQL}", [query], output_field=BooleanField()))
+            .annotate(rank=RawSQL(f"word_similarity(%s, {SEARCH_NAME_SQL})", [query], output_field=FloatField()))
+            .order_by("-rank", "id")[:limit]
+        )
+
+    # Other backends (local SQLite) have no trigram support: every word must appear in some name
+    for term in query.split():
+        patients = patients.filter(Q(firstname__icontains=term) | Q(middlename__icontains=term) | Q(lastname__icontains=term))
+    return list(patients.order_by("lastname", "firstname", "id")[:limit])
@@ -1,17 +1,24 @@
+from collections import Counter
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 from rest_framework import serializers, exceptions
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import AccessToken
 
 from docuhealth2.mixins import StrictFieldsMixin
+from docuhealth2.utils.hin import HINRelatedField
 
-from .models import EmailChange, User, OTP, UserProfileImage, PatientProfile, SubaccountProfile, HospitalStaffProfile, IdCard
+from .models import EmailChange, User, OTP, UserProfileImage, PatientProfile, SubaccountProfile, HospitalStaffProfile, IdCard, PatientImportJob, PatientImportError
+from .tokens import stamp_claims
 
 from facility.models import HospitalWard
 from facility.serializers import WardNameSerializer
 
-from organizations.models import HospitalProfile, Subscription
+from organizations.models import HospitalProfile
+from organizations.services import is_entitled
 
 class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
@@ -56,11 +63,12 @@ class VerifyOTPSerializer(serializers.Serializer):
         return validated_data
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    # @classmethod
-    # def get_token(cls, user):
-    #     token = super().get_token(user)
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        stamp_claims(token, user)
 
-    #     return token
+        return token
     
     def validate(self, attrs):
         data = super().validate(attrs)
@@ -73,6 +81,18 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             
         return data
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        
+        # Re-stamp the new access token so role, ward and token version are current
+        access = AccessToken(data["access"])
+        user = User.objects.select_related("hospital_profile", "hospital_staff_profile", "patient_profile").get(id=access["user_id"])
+        stamp_claims(access, user)
+        data["access"] = str(access)
+        
+        return data
+
 class ResetPasswordSerializer(serializers.Serializer):
     new_password = serializers.CharField(write_only=True, required=True, min_length=8)
 
@@ -207,7 +227,7 @@ class ReceptionistCreatePatientSerializer(BaseUserCreateSerializer):
 class UpdatePatientProfileSerializer(StrictFieldsMixin , serializers.ModelSerializer):
     class Meta:
         model = PatientProfile
-        exclude = ['is_deleted', 'deleted_at', 'created_at', 'user', 'hin', 'id_card_generated', 'referred_by', 'emergency']
+        exclude = ['is_deleted', 'deleted_at', 'created_at', 'user', 'hin', 'id_card_generated', 'referred_by', 'emergency', 'last_completed_at']
         
 class UpdatePatientSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(required=False, write_only=True)
@@ -281,7 +301,7 @@ class CreateSubaccountSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
         
 class UpgradeSubaccountSerializer(serializers.ModelSerializer): # TODO: Work on this
-    subaccount = serializers.SlugRelatedField(slug_field="hin", queryset=SubaccountProfile.objects.all(), write_only=True)
+    subaccount = HINRelatedField(queryset=SubaccountProfile.objects.all(), write_only=True)
     
     phone_num = serializers.CharField(required=True, write_only=True)
     password = serializers.CharField(write_only=True, required=True, min_length=8)
@@ -360,8 +380,15 @@ class PatientBasicInfoSerializer(serializers.ModelSerializer):
         model = PatientProfile
         fields = ['hin', 'firstname', 'lastname', 'gender', 'dob']
         
+class PatientSearchResultSerializer(serializers.ModelSerializer):
+    email = serializers.EmailField(source="user.email", read_only=True)
+    
+    class Meta:
+        model = PatientProfile
+        fields = ['hin', 'firstname', 'middlename', 'lastname', 'gender', 'dob', 'phone_num', 'email']
+        
 class VerifyUserNINSerializer(serializers.Serializer):
-    patient = serializers.SlugRelatedField(slug_field="hin", queryset=PatientProfile.objects.all(), write_only=True)
+    patient = HINRelatedField(queryset=PatientProfile.objects.all(), write_only=True)
     nin = serializers.CharField(write_only=True, required=True, min_length=11, max_length=11)
     
 class CreateStaffProfileSerializer(serializers.ModelSerializer):
@@ -408,6 +435,59 @@ class TeamMemberCreateSerializer(BaseUserCreateSerializer):
         
         return user
     
+class BulkStaffProfileSerializer(CreateStaffProfileSerializer):
+    # Looked up for the whole batch in BulkTeamMemberCreateSerializer.validate_members
+    ward = serializers.IntegerField(write_only=True, required=False, allow_null=True)
+
+class BulkTeamMemberSerializer(BaseUserCreateSerializer):
+    # Uniqueness is checked once for the whole batch, not with a query per member
+    email = serializers.EmailField()
+    profile = BulkStaffProfileSerializer(required=True)
+
+    class Meta(BaseUserCreateSerializer.Meta):
+        fields = BaseUserCreateSerializer.Meta.fields + ['profile']
+
+class BulkTeamMemberCreateSerializer(serializers.Serializer):
+    members = BulkTeamMemberSerializer(many=True, allow_empty=False, max_length=settings.TEAM_ONBOARDING_MAX_MEMBERS)
+    invitation_message = serializers.CharField(write_only=True, required=True)
+    login_url = serializers.URLField(required=True, write_only=True)
+
+    def validate_members(self, members):
+        hospital = self.context['hospital']
+
+        for member in members:
+            member["email"] = User.objects.normalize_email(member["email"])
+
+        emails = Counter(member["email"] for member in members)
+        taken = set(User.objects.filter(email__in=emails).values_list("email", flat=True))
+        ward_ids = {member["profile"].get("ward") for member in members} - {None}
+        wards = HospitalWard.objects.filter(hospital=hospital).in_bulk(ward_ids)
+
+        errors = []
+        for member in members:
+            error = {}
+            if emails[member["email"]] > 1:
+                error["email"] = ["This email appears more than once in the request."]
+            elif member["email"] in taken:
+                error["email"] = ["User with this email already exists."]
+
+            ward_id = member["profile"].get("ward")
+            if ward_id is not None:
+                if ward_id in wards:
+                    member["profile"]["ward"] = wards[ward_id]
+                else:
+                    error["profile"] = {"ward": [f'Invalid pk "{ward_id}" - object does not exist.']}
+            errors.append(error)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return members
+
+    def create(self, validated_data):
+        from .onboarding import onboard_team_members
+
+        return onboard_team_members(self.context['hospital'], **validated_data)
+
 class DeactivateTeamMembersSerializer(serializers.Serializer):
     staff_ids = serializers.ListField(child=serializers.CharField(), allow_empty=False, required=True)
     
@@ -445,10 +525,7 @@ class PatientDashboardInfoSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_subscribed(self, obj):
-        return Subscription.objects.filter(
-            user=obj.user, 
-            status=Subscription.SubscriptionStatus.ACTIVE
-        ).exists()
+        return is_entitled(obj.user_id)
         
 class ResendOTPSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
@@ -467,4 +544,35 @@ class ResendOTPSerializer(serializers.Serializer):
         if user.is_verified:
             raise serializers.ValidationError({"email": "User with this email is already verified."})
         
-        return validated_data
\ No newline at end of file
+        return validated_data
+class PatientImportRowSerializer(PatientFullInfoSerializer):
+    """One row of a bulk patient import; the same fields as receptionist registration, plus an optional email."""
+    email = serializers.EmailField(required=False, allow_blank=True, allow_null=True)
+
+class CreatePatientImportSerializer(serializers.Serializer):
+    file = serializers.FileField(write_only=True)
+    format = serializers.ChoiceField(choices=PatientImportJob.Format.choices, required=False, help_text="Defaults from the file extension: .csv, .ndjson or .jsonl")
+    verify_url = serializers.URLField(required=False, allow_blank=True, help_text="When set, each imported patient with an email is sent an OTP and this link")
+
+    def validate(self, attrs):
+        validated_data = super().validate(attrs)
+
+        if not validated_data.get("format"):
+            from .imports import detect_format
+
+            validated_data["format"] = detect_format(validated_data["file"].name)
+            if not validated_data["format"]:
+                raise serializers.ValidationError({"format": "Could not tell the format from the file name; pass csv or ndjson."})
+
+        return validated_data
+
+class PatientImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PatientImportJob
+        fields = ['id', 'file_name', 'format', 'status', 'rows_processed', 'rows_imported', 'rows_failed', 'last_error', 'created_at', 'updated_at', 'finished_at']
+        read_only_fields = fields
+
+class PatientImportErrorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PatientImportError
+        fields = ['row_number', 'email', 'errors']
@@ -1,3 +1,354 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from docuhealth2.authentications import TenantJWTAuthentication, ClaimsJWTAuthentication
+from docuhealth2.utils.generate import reserve_staff_ids
+from docuhealth2.utils.hin import HINConverter, HINRelatedField, format_hin, is_valid_hin, luhn_check_digit, permute, reserve_hins, unpermute
+from facility.models import HospitalWard
+from hospital_ops.models import HospitalPatientActivity
+from organizations.models import HospitalProfile
+
+from .search import search_patients
+from .imports import create_import_job, import_chunk, keep_queued_jobs_fresh, queued_job_ids, run_import_job
+from .models import User, HospitalStaffProfile, PatientImportJob, PatientProfile, StaffCounter
+from .serializers import CustomTokenObtainPairSerializer
+from .tokens import bump_token_version, current_token_version
+
+class ClaimsView:
+    authenticate_from_claims = True
+
+class LookupView:
+    authenticate_from_claims = False
+
+class TenantAuthenticationQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email="hospital@docuhealth.local", role=User.Role.HOSPITAL, is_active=True), name="Test Hospital"
+        )
+        cls.ward = HospitalWard.objects.create(hospital=cls.hospital, name="Ward A", total_beds=4)
+        cls.user = User.objects.create(email="nurse@docuhealth.local", role=User.Role.HOSPITAL_STAFF, is_active=True)
+        cls.staff = HospitalStaffProfile.objects.create(
+            user=cls.user, hospital=cls.hospital, ward=cls.ward, firstname="Test", lastname="Nurse",
+            phone_num="08000000000", role=HospitalStaffProfile.StaffRole.NURSE, gender="female",
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, token, view=ClaimsView(), method="get"):
+        factory_request = getattr(APIRequestFactory(), method)("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return Request(factory_request, parser_context={"view": view})
+
+    def claims_token(self):
+        return CustomTokenObtainPairSerializer.get_token(self.user).access_token
+
+    def test_tenant_authentication_loads_the_tenant_in_one_query(self):
+        request = self.request(AccessToken.for_user(self.user))
+
+        with self.assertNumQueries(1):
+            user, _ = TenantJWTAuthentication().authenticate(request)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(request.staff.pk, self.staff.pk)
+            self.assertEqual(request.hospital.pk, self.hospital.pk)
+            self.assertEqual(request.staff.ward.name, "Ward A")
+
+    def test_claims_authentication_runs_no_query_when_the_token_version_matches(self):
+        request = self.request(self.claims_token())
+        current_token_version(self.user.pk)
+
+        with self.assertNumQueries(0):
+            user, _ = ClaimsJWTAuthentication().authenticate(request)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.role, User.Role.HOSPITAL_STAFF)
+            self.assertEqual(request.staff.pk, self.staff.pk)
+            self.assertEqual(request.staff.role, HospitalStaffProfile.StaffRole.NURSE)
+            self.assertEqual(request.hospital.pk, self.hospital.pk)
+            self.assertEqual(request.staff.ward_id, self.ward.pk)
+
+    def test_claims_authentication_falls_back_to_the_database_when_the_token_version_is_stale(self):
+        token = self.claims_token()
+        bump_token_version([self.user.pk])
+        current_token_version(self.user.pk)
+
+        with self.assertNumQueries(1):
+            user, _ = ClaimsJWTAuthentication().authenticate(self.request(token))
+
+        self.assertEqual(user.token_version, token["tv"] + 1)
+
+    def test_claims_authentication_looks_the_user_up_for_writes_and_other_views(self):
+        current_token_version(self.user.pk)
+
+        for request in (self.request(self.claims_token(), method="post"), self.request(self.claims_token(), view=LookupView())):
+            with self.assertNumQueries(1):
+                ClaimsJWTAuthentication().authenticate(request)
+
+PATIENTS_CSV = (
+    "firstname,lastname,dob,gender,email\n"
+    "Ada,Eze,1990-01-01,female,ada@example.com\n"
+    "Femi,Bello,1985-06-30,male,femi@example.com\n"
+)
+
+@override_settings(PATIENT_IMPORT_CHUNK_SIZE=1, PATIENT_IMPORT_MAX_ATTEMPTS=2, PATIENT_IMPORT_BACKOFF_SECONDS=30, PATIENT_IMPORT_MAX_BACKOFF_SECONDS=300)
+class ImportJobTests(TestCase):
+    def setUp(self):
+        spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool_dir, ignore_errors=True)
+        source_path = os.path.join(spool_dir, "patients.csv")
+        with open(source_path, "w") as source:
+            source.write(PATIENTS_CSV)
+
+        hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email="hospital@docuhealth.local", role=User.Role.HOSPITAL), name="Test Hospital"
+        )
+        with override_settings(PATIENT_IMPORT_SPOOL_DIR=spool_dir):
+            self.job = create_import_job(hospital, "patients.csv", PatientImportJob.Format.CSV, source_path=source_path, run=False)
+
+        timer = mock.patch("accounts.imports.threading.Timer")
+        self.timer = timer.start()
+        self.addCleanup(timer.stop)
+
+    def run_job(self):
+        run_import_job(self.job.id)
+        self.job.refresh_from_db()
+
+    def test_imports_rows_and_removes_the_spooled_file(self):
+        self.run_job()
+
+        self.assertEqual(self.job.status, PatientImportJob.Status.COMPLETED)
+        self.assertEqual((self.job.rows_processed, self.job.rows_imported), (2, 2))
+        self.assertFalse(os.path.exists(self.job.file_path))
+
+    def test_crashed_job_is_retried_in_process_and_continues_after_the_last_chunk(self):
+        calls = []
+        def flaky_chunk(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError("database went away")
+            import_chunk(*args)
+
+        with mock.patch("accounts.imports.import_chunk", side_effect=flaky_chunk):
+            self.run_job()
+
+        self.assertEqual(self.job.status, PatientImportJob.Status.PENDING)
+        self.assertEqual((self.job.attempts, self.job.rows_processed), (1, 1))
+        self.assertEqual(self.job.last_error, "database went away")
+        self.assertEqual(self.timer.call_args.args[0], 30)
+        self.assertEqual(self.timer.call_args.kwargs["args"], (self.job.id,))
+        self.timer.return_value.start.assert_called_once()
+
+        self.run_job()
+
+        self.assertEqual(self.job.status, PatientImportJob.Status.COMPLETED)
+        self.assertEqual((self.job.attempts, self.job.rows_imported), (2, 2))
+        self.assertEqual(PatientProfile.objects.filter(user__email="ada@example.com").count(), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        with mock.patch("accounts.imports.import_chunk", side_effect=RuntimeError("database went away")):
+            self.run_job()
+            self.run_job()
+
+        self.assertEqual(self.job.status, PatientImportJob.Status.FAILED)
+        self.assertEqual(self.job.attempts, 2)
+        self.assertIsNotNone(self.job.finished_at)
+        self.assertEqual(self.timer.call_count, 1)
+        self.assertFalse(os.path.exists(self.job.file_path))
+
+    def test_missing_spooled_file_fails_without_retrying(self):
+        os.remove(self.job.file_path)
+
+        self.run_job()
+
+        self.assertEqual(self.job.status, PatientImportJob.Status.FAILED)
+        self.assertIn("patients.csv", self.job.last_error)
+        self.timer.assert_not_called()
+
+    def test_running_import_keeps_the_jobs_queued_behind_it_fresh(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        PatientImportJob.objects.filter(id=self.job.id).update(updated_at=long_ago)
+        queued_job_ids.add(self.job.id)
+        self.addCleanup(queued_job_ids.discard, self.job.id)
+
+        keep_queued_jobs_fresh(None)
+
+        self.job.refresh_from_db()
+        self.assertGreater(self.job.updated_at, long_ago)
+
+    def test_sweep_fails_jobs_orphaned_by_a_restart(self):
+        os.remove(self.job.file_path)
+        fresh = PatientImportJob.objects.create(hospital=self.job.hospital, file_name="later.csv", file_path="/missing/later.csv", format=PatientImportJob.Format.CSV)
+        PatientImportJob.objects.filter(id=self.job.id).update(
+            status=PatientImportJob.Status.PROCESSING, updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        call_command("import_patients", "--resume", stdout=StringIO())
+
+        self.job.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(self.job.status, PatientImportJob.Status.FAILED)
+        self.assertEqual(fresh.status, PatientImportJob.Status.PENDING)
+
+class ReserveStaffIdsTests(TestCase):
+    def setUp(self):
+        self.hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email="hospital@docuhealth.local", role=User.Role.HOSPITAL), name="Olive Clinic"
+        )
+
+    def test_reserves_consecutive_ids_per_hospital_and_role(self):
+        self.assertEqual(reserve_staff_ids(self.hospital, "doctor", 2), ["OLIV-DR001", "OLIV-DR002"])
+        self.assertEqual(reserve_staff_ids(self.hospital, "doctor", 1), ["OLIV-DR003"])
+        self.assertEqual(reserve_staff_ids(self.hospital, "nurse", 1), ["OLIV-NR001"])
+
+    def postgres_side_connection(self, returned_row):
+        side_connection = mock.MagicMock()
+        side_connection.cursor.return_value.__enter__.return_value.fetchone.return_value = returned_row
+        patches = (
+            mock.patch.object(connections["default"], "vendor", "postgresql"),
+            mock.patch("docuhealth2.utils.generate.counter_connection", return_value=side_connection),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        return side_connection
+
+    def test_existing_counter_is_bumped_outside_the_callers_transaction(self):
+        StaffCounter.objects.create(hospital=self.hospital, role="doctor", current_value=3)
+        side_connection = self.postgres_side_connection((5,))
+
+        with transaction.atomic():
+            staff_ids = reserve_staff_ids(self.hospital, "doctor", 2)
+
+        self.assertEqual(staff_ids, ["OLIV-DR004", "OLIV-DR005"])
+        self.assertIn("UPDATE", side_connection.cursor.return_value.__enter__.return_value.execute.call_args.args[0])
+        # The caller's connection never touched the counter row
+        self.assertEqual(StaffCounter.objects.get(hospital=self.hospital, role="doctor").current_value, 3)
+
+    def test_first_reservation_creates_the_counter_in_the_callers_transaction(self):
+        self.postgres_side_connection(None)
+
+        with transaction.atomic():
+            staff_ids = reserve_staff_ids(self.hospital, "doctor", 2)
+
+        self.assertEqual(staff_ids, ["OLIV-DR001", "OLIV-DR002"])
+        self.assertEqual(StaffCounter.objects.get(hospital=self.hospital, role="doctor").current_value, 2)
+
+def wrong_check_digit(hin):
+    return hin[:-1] + str((int(hin[-1]) + 1) % 10)
+
+class HINTests(TestCase):
+    def test_permutation_round_trips_and_stays_in_range(self):
+        values = [0, 1, 2, 12345, 10 ** 13 - 1, *range(10 ** 9, 10 ** 9 + 200)]
+        permuted = [permute(value) for value in values]
+
+        self.assertEqual([unpermute(value) for value in permuted], values)
+        self.assertEqual(len(set(permuted)), len(values))
+        self.assertTrue(all(0 <= value < 10 ** 13 for value in permuted))
+
+    def test_check_digit_is_generated_and_validated(self):
+        self.assertEqual(luhn_check_digit("7992739871"), "3")
+
+        hin = format_hin(42)
+        self.assertEqual(len(hin), 14)
+        self.assertEqual(hin[-1], luhn_check_digit(hin[:-1]))
+        self.assertTrue(is_valid_hin(hin))
+        self.assertFalse(is_valid_hin(wrong_check_digit(hin)))
+        self.assertFalse(is_valid_hin(hin[:-2]))
+        # Legacy HINs predate the check digit
+        self.assertTrue(is_valid_hin("1234567890123"))
+
+    def test_reserved_hins_are_distinct_and_valid(self):
+        hins = reserve_hins(5) + reserve_hins(5)
+
+        self.assertEqual(len(set(hins)), 10)
+        self.assertTrue(all(is_valid_hin(hin) for hin in hins))
+
+    def test_url_converter_rejects_a_wrong_check_digit(self):
+        hin = format_hin(42)
+
+        self.assertEqual(HINConverter().to_python(hin), hin)
+        with self.assertRaises(ValueError):
+            HINConverter().to_python(wrong_check_digit(hin))
+        self.assertEqual(self.client.get(f"/api/medical-records/soap-note/{wrong_check_digit(hin)}").status_code, 404)
+
+    def test_related_field_rejects_a_wrong_check_digit_without_a_query(self):
+        patient = PatientProfile.objects.create(
+            user=User.objects.create(email="ada@example.com", role=User.Role.PATIENT),
+            firstname="Ada", lastname="Eze", dob=date(1990, 1, 1), gender="female",
+        )
+        field = HINRelatedField(queryset=PatientProfile.objects.all())
+
+        self.assertTrue(is_valid_hin(patient.hin))
+        self.assertEqual(field.to_internal_value(patient.hin), patient)
+        with self.assertNumQueries(0), self.assertRaises(serializers.ValidationError) as raised:
+            field.to_internal_value(wrong_check_digit(patient.hin))
+        self.assertEqual(raised.exception.detail, ["Enter a valid HIN."])
+
+class PatientSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email="hospital@docuhealth.local", role=User.Role.HOSPITAL), name="Test Hospital"
+        )
+        other_hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email="other@docuhealth.local", role=User.Role.HOSPITAL), name="Other Hospital"
+        )
+
+        def patient(email, firstname, lastname, phone_num="", middlename=None, hospital=cls.hospital):
+            profile = PatientProfile.objects.create(
+                user=User.objects.create(email=email, role=User.Role.PATIENT), firstname=firstname, lastname=lastname,
+                middlename=middlename, phone_num=phone_num, dob=date(1990, 1, 1), gender="female",
+            )
+            if hospital:
+                HospitalPatientActivity.objects.create(hospital=hospital, patient=profile, action="create_patient_account")
+            return profile
+
+        cls.ada = patient("ada.eze@example.com", "Ada", "Eze", phone_num="08031110000")
+        cls.adaobi = patient("adaobi@example.com", "Adaobi", "Nwosu", phone_num="08099990000")
+        cls.chidi = patient("chidi@example.com", "Chidi", "Adams")
+        cls.ngozi = patient("ngozi@example.com", "Ngozi", "Okoro", middlename="Amaka")
+        cls.elsewhere = patient("ada.obi@example.com", "Ada", "Obi", phone_num="08031112222", hospital=other_hospital)
+        cls.unseen = patient("ada.uche@example.com", "Ada", "Uche", hospital=None)
+
+    def search(self, query):
+        return search_patients(self.hospital, query)
+
+    def test_digits_match_hin_and_phone_prefixes(self):
+        self.assertEqual(self.search(self.ada.hin), [self.ada])
+        self.assertEqual(self.search("0803111"), [self.ada])
+        self.assertEqual(self.search("0809"), [self.adaobi])
+
+    def test_email_prefix_matches_ignore_case(self):
+        self.assertEqual(self.search("ADA.EZE@"), [self.ada])
+        self.assertEqual(self.search("ada.obi@"), [])
+
+    def test_name_prefixes_rank_by_first_then_last_name(self):
+        self.assertEqual(self.search("ada"), [self.ada, self.adaobi, self.chidi])
+
+    def test_fuzzy_fallback_matches_words_in_any_order_and_middle_names(self):
+        self.assertEqual(self.search("okoro ngozi"), [self.ngozi])
+        self.assertEqual(self.search("amaka"), [self.ngozi])
+
+    def test_only_the_hospitals_own_patients_are_returned(self):
+        self.assertEqual(self.search(self.elsewhere.hin), [])
+        self.assertEqual(self.search(self.unseen.hin), [])
+        self.assertNotIn(self.elsewhere, self.search("obi"))
+
+    def test_short_queries_return_nothing(self):
+        self.assertEqual(self.search(" a "), [])
@@ -1,3 +1,8 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
 from rest_framework_simplejwt.tokens import Token
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken
@@ -22,3 +27,67 @@ class PasswordResetTokenAuthentication(JWTAuthentication):
 
         return super().get_user(validated_token)
 
+
+def token_version_cache_key(user_id):
+    return f"auth:token-version:{user_id}"
+
+def token_claims(user):
+    """Role and tenant claims carried by a user's access token; see ClaimsJWTAuthentication."""
+    from .models import User
+
+    claims = {
+        "role": user.role,
+        "staff_role": None,
+        "hospital_id": None,
+        "ward_id": None,
+        "staff_profile_id": None,
+        "patient_profile_id": None,
+        "tv": user.token_version,
+    }
+
+    if user.role == User.Role.HOSPITAL:
+        hospital = getattr(user, "hospital_profile", None)
+        claims["hospital_id"] = hospital.id if hospital else None
+
+    elif user.role == User.Role.HOSPITAL_STAFF:
+        staff = getattr(user, "hospital_staff_profile", None)
+        if staff:
+            claims.update(staff_role=staff.role, hospital_id=staff.hospital_id, ward_id=staff.ward_id, staff_profile_id=staff.id)
+
+    elif user.role == User.Role.PATIENT:
+        patient = getattr(user, "patient_profile", None)
+        claims["patient_profile_id"] = patient.id if patient else None
+
+    return claims
+
+def stamp_claims(token, user):
+    for claim, value in token_claims(user).items():
+        token[claim] = value
+    return token
+
+def current_token_version(user_id):
+    """The user's token version, from the cache when possible. None if the user is gone."""
+    from .models import User
+
+    key = token_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(id=user_id).values_list("token_version", flat=True).first()
+        if version is not None:
+            cache.set(key, version, settings.JWT_TOKEN_VERSION_CACHE_TTL)
+    return version
+
+def bump_token_version(user_ids):
+    """Invalidates the claims in these users' outstanding access tokens."""
+    from .models import User
+
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if not user_ids:
+        return 0
+
+    updated = User.objects.filter(id__in=user_ids).update(token_version=F("token_version") + 1)
+    keys = [token_version_cache_key(user_id) for user_id in user_ids]
+    # Drop now and again after commit, so a reader that cached the old row in between is evicted
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+    return updated
@@ -1,4 +1,5 @@
 from django.db import transaction
+from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.db.models.functions import TruncMonth
@@ -13,29 +14,34 @@ from rest_framework.generics import GenericAPIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.exceptions import NotFound
 
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
 
-from .models import User, OTP, UserProfileImage, NINVerificationAttempt, PatientProfile, SubaccountProfile, HospitalStaffProfile, EmailChange
-from .serializers import ForgotPasswordSerializer, VerifyOTPSerializer, ResetPasswordSerializer, UserProfileImageSerializer, UpdatePasswordSerializer, CreateSubaccountSerializer, UpgradeSubaccountSerializer, CreatePatientSerializer, UpdatePatientSerializer, PatientIDCardSerializer, GenerateSubaccountIDCardSerializer, VerifyUserNINSerializer, PatientBasicInfoSerializer, PatientEmergencySerializer, HospitalStaffInfoSerilizer, TeamMemberCreateSerializer, DeactivateTeamMembersSerializer, TeamMemberUpdateRoleSerializer, ReceptionistCreatePatientSerializer, UpdateEmailSerializer, VerifyEmailOTPSerializer, UpdateProfileSerializer, UpdateHospitalAdminProfileSerializer, PatientDashboardInfoSerializer, RemoveBrandingSerializer, CustomTokenObtainPairSerializer, ResendOTPSerializer
+from .models import User, OTP, UserProfileImage, NINVerificationAttempt, PatientProfile, SubaccountProfile, HospitalStaffProfile, EmailChange, PatientImportJob
+from .tokens import bump_token_version
+from .serializers import ForgotPasswordSerializer, VerifyOTPSerializer, ResetPasswordSerializer, UserProfileImageSerializer, UpdatePasswordSerializer, CreateSubaccountSerializer, UpgradeSubaccountSerializer, CreatePatientSerializer, UpdatePatientSerializer, PatientIDCardSerializer, GenerateSubaccountIDCardSerializer, VerifyUserNINSerializer, PatientBasicInfoSerializer, PatientSearchResultSerializer, PatientEmergencySerializer, HospitalStaffInfoSerilizer, TeamMemberCreateSerializer, BulkTeamMemberCreateSerializer, DeactivateTeamMembersSerializer, TeamMemberUpdateRoleSerializer, ReceptionistCreatePatientSerializer, UpdateEmailSerializer, VerifyEmailOTPSerializer, UpdateProfileSerializer, UpdateHospitalAdminProfileSerializer, PatientDashboardInfoSerializer, RemoveBrandingSerializer, CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer, ResendOTPSerializer, CreatePatientImportSerializer, PatientImportJobSerializer, PatientImportErrorSerializer
+from .imports import create_import_job
+from .search import search_patients, MIN_QUERY_LENGTH
 
 from .requests import verify_nin_request
 from .utils import *
 from sentry_sdk import logger as sentry_logger
 
 from docuhealth2.permissions import IsAuthenticatedHospitalAdmin, IsAuthenticatedHospitalStaff
-from docuhealth2.views import PublicGenericAPIView
+from docuhealth2.views import PublicGenericAPIView, HospitalScopedMixin
+from docuhealth2.pagination import SelectablePagination
 from docuhealth2.permissions import IsAuthenticatedHospitalStaff, IsAuthenticatedPatient, IsAuthenticatedDoctor, IsAuthenticatedNurse, IsAuthenticatedReceptionist
-from docuhealth2.utils.email_service import BrevoEmailService
-from docuhealth2.utils.supabase import upload_file_to_supabase, delete_from_supabase
+from docuhealth2.utils.email_service import QueuedEmailService
+from docuhealth2.utils.supabase import upload_file_to_supabase, delete_from_supabase, file_source
 
 from records.serializers import MedicalSummarySerializer
+from records.summaries import medical_summary_rows, render_medical_summaries
 from records.models import SoapNote, Appointment
 from facility.serializers import WardBasicInfoSerializer
 from hospital_ops.models import HospitalPatientActivity
 from accounts.serializers import PatientFullInfoSerializer
-from organizations.models import Subscription
+from organizations.services import is_entitled, is_hospital_entitled
 
-mailer = BrevoEmailService()
+mailer = QueuedEmailService()
 
 def set_refresh_cookie(response):
     data = response.data
@@ -59,6 +65,7 @@ def set_refresh_cookie(response):
 class ListUserView(generics.ListAPIView):
     queryset = User.objects.exclude(role="subaccount").order_by("-created_at")
     serializer_class = PatientBasicInfoSerializer
+    pagination_class = SelectablePagination
       
 @extend_schema(tags=["Auth"])  
 class VerifySignupOTPView(PublicGenericAPIView):  
@@ -118,16 +125,7 @@ class LoginView(TokenObtainPairView, PublicGenericAPIView):
                 response.data["data"]["staff_role"] = staff_role
                 
             if role in [User.Role.PATIENT, User.Role.HOSPITAL]:
-                is_subscribed = Subscription.objects.filter(
-                    user=user,
-                    status__in=[
-                        Subscription.SubscriptionStatus.ACTIVE, 
-                        Subscription.SubscriptionStatus.PAST_DUE
-                    ],
-                    next_payment_date__isnull=False,
-                    next_payment_date__gte=timezone.now()
-                ).exists()
-                response.data["data"]["is_subscribed"] = is_subscribed
+                response.data["data"]["is_subscribed"] = is_entitled(user.id)
                 
             mailer.send(
                 subject="New Login Alert",
@@ -198,6 +196,8 @@ class ResetPasswordView(GenericAPIView):
 
 @extend_schema(tags=["Auth"])  
 class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+    
     def post(self, request, *args, **kwargs):
         refresh_token = request.COOKIES.get("refresh_token")
         
@@ -392,7 +392,7 @@ class UpdateHospitalAdminProfileView(generics.UpdateAPIView):
     parser_classes = [MultiPartParser, FormParser]
     
     def get_object(self):
-        return self.request.user.hospital_profile
+        return self.request.hospital
     
     def patch(self, request, *args, **kwargs):
         instance = self.get_object()  
@@ -419,7 +419,7 @@ class UpdateHospitalAdminProfileView(generics.UpdateAPIView):
                         old_images_to_delete.append(old_data.get("path"))
 
                     uploaded_data = upload_file_to_supabase(
-                        image_file.read(), 
+                        file_source(image_file), 
                         image_file.name, 
                         image_file.content_type, 
                         folder
@@ -450,7 +450,7 @@ class RemoveHospitalBrandingView(generics.GenericAPIView):
     permission_classes = [IsAuthenticatedHospitalAdmin]
 
     def get_object(self):
-        return self.request.user.hospital_profile
+        return self.request.hospital
 
     @transaction.atomic
     def post(self, request, *args, **kwargs):
@@ -585,10 +585,9 @@ class PatientDashboardView(generics.GenericAPIView):
         queryset = SoapNote.objects.filter(patient=profile).select_related(
             "patient", "hospital", "vital_signs", "staff", "appointment").prefetch_related("drug_records", "additional_notes").order_by("-created_at")
         
-        page = self.paginate_queryset(queryset)
-        records_serializer = self.get_serializer(page, many=True)
+        page = self.paginate_queryset(medical_summary_rows(queryset))
         
-        paginated_response = self.get_paginated_response(records_serializer.data)
+        paginated_response = self.get_paginated_response(render_medical_summaries(page))
         patient_serializer = PatientDashboardInfoSerializer(profile)
 
         response_data = {}
@@ -645,6 +644,7 @@ class DeletePatientAccountView(generics.DestroyAPIView):
     def perform_destroy(self, instance):
         profile = instance.patient_profile
         profile.soft_delete()
+        bump_token_version([instance.id])
         
 @extend_schema(tags=['Patient'])
 class GeneratePatientIdCard(generics.CreateAPIView):
@@ -689,7 +689,7 @@ class TeamMemberCreateView(generics.CreateAPIView):
     
     @transaction.atomic
     def perform_create(self, serializer):
-        hospital = self.request.user.hospital_profile
+        hospital = self.request.hospital
         invitation_message = serializer.validated_data.pop("invitation_message")
         login_url = serializer.validated_data.pop("login_url")
         user = serializer.save(is_active=True, is_verified=True)
@@ -708,19 +708,33 @@ class TeamMemberCreateView(generics.CreateAPIView):
                 recipient=user.email,
             )
         
+@extend_schema(tags=["Hospital Admin"], responses=HospitalStaffInfoSerilizer(many=True))
+class BulkTeamMemberCreateView(HospitalScopedMixin, generics.CreateAPIView):
+    """Onboards up to TEAM_ONBOARDING_MAX_MEMBERS staff at once; either every member is created or none is."""
+    serializer_class = BulkTeamMemberCreateSerializer
+    permission_classes = [IsAuthenticatedHospitalAdmin]
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["hospital"] = self.get_hospital()
+        return context
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        profiles = serializer.save()
+        
+        return Response(HospitalStaffInfoSerilizer(profiles, many=True).data, status=status.HTTP_201_CREATED)
+        
 @extend_schema(tags=["Hospital Admin", "Receptionist", "Nurse", "Doctor"])
 class TeamMemberListView(generics.ListAPIView):
     serializer_class = HospitalStaffInfoSerilizer
     permission_classes = [IsAuthenticatedHospitalAdmin | IsAuthenticatedHospitalStaff]
+    authenticate_from_claims = True
     
     def get_queryset(self):
-        user = self.request.user
+        hospital = self.request.hospital
         
-        if user.role == User.Role.HOSPITAL:
-            hospital = user.hospital_profile
-        else:
-            hospital = user.hospital_staff_profile.hospital
-            
         return HospitalStaffProfile.objects.filter(hospital=hospital).select_related("hospital").order_by('-created_at')
         
 @extend_schema(tags=["Hospital Admin"])
@@ -734,7 +748,7 @@ class DeactivateTeamMembersView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         
         staff_ids = serializer.validated_data.get("staff_ids")
-        hospital = request.user.hospital_profile
+        hospital = request.hospital
 
         users = HospitalStaffProfile.objects.filter(
             hospital=hospital,
@@ -752,6 +766,7 @@ class DeactivateTeamMembersView(generics.GenericAPIView):
         user_ids = set(users.values_list("user_id", flat=True))
 
         updated_count = User.objects.filter(id__in=user_ids, is_active=True).update(is_active=False)
+        bump_token_version(user_ids)
         if updated_count == 0:
             return Response(
                 {"message": "No changes detected. No team members deactivated."},
@@ -774,7 +789,7 @@ class RemoveTeamMembersView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         
         staff_ids = serializer.validated_data.get("staff_ids")
-        hospital = request.user.hospital_profile
+        hospital = request.hospital
 
         staff = HospitalStaffProfile.objects.filter(
             hospital=hospital,
@@ -792,6 +807,7 @@ class RemoveTeamMembersView(generics.GenericAPIView):
         user_ids = set(staff.values_list("user_id", flat=True))
         staff_updated_count = staff.update(is_deleted=True, deleted_at=timezone.now())
         updated_count = User.objects.filter(id__in=user_ids, is_active=True).update(is_active=False)
+        bump_token_version(user_ids)
         if staff_updated_count == 0:
             return Response(
                 {"message": "No changes detected. No team members removed."},
@@ -810,7 +826,7 @@ class TeamMemberUpdateRoleView(generics.UpdateAPIView):
     http_method_names = ["patch"]
     
     def get_object(self):
-        hospital = self.request.user.hospital_profile
+        hospital = self.request.hospital
         staff = HospitalStaffProfile.objects.filter(hospital=hospital, staff_id=self.kwargs["staff_id"]).first()
         
         if not staff:
@@ -824,10 +840,8 @@ class DoctorDashboardView(generics.GenericAPIView):
     serializer_class = HospitalStaffInfoSerilizer
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        staff = user.hospital_staff_profile
-        hospital = staff.hospital
-        hospital_user = hospital.user
+        staff = request.staff
+        hospital = request.hospital
         
         doctor_info = self.get_serializer(staff).data
         hospital_theme = {
@@ -836,7 +850,7 @@ class DoctorDashboardView(generics.GenericAPIView):
             "theme_color": hospital.theme_color
         }
         
-        is_subscribed = Subscription.objects.filter(user=hospital_user, status=Subscription.SubscriptionStatus.ACTIVE).exists()
+        is_subscribed = is_hospital_entitled(hospital)
         
         doctor_info["is_subscribed"] = is_subscribed
         
@@ -850,10 +864,8 @@ class NurseDashboardView(generics.GenericAPIView):
     permission_classes = [IsAuthenticatedNurse]
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        staff = user.hospital_staff_profile
-        hospital = staff.hospital
-        hospital_user = hospital.user
+        staff = request.staff
+        hospital = request.hospital
         ward = staff.ward
         
         hospital_theme = {
@@ -863,7 +875,7 @@ class NurseDashboardView(generics.GenericAPIView):
         }
 
         response = {}
-        is_subscribed = Subscription.objects.filter(user=hospital_user, status=Subscription.SubscriptionStatus.ACTIVE).exists()
+        is_subscribed = is_hospital_entitled(hospital)
         
         nurse_info = HospitalStaffInfoSerilizer(staff).data
         nurse_info["is_subscribed"] = is_subscribed
@@ -882,12 +894,10 @@ class ReceptionistDashboardView(generics.GenericAPIView):
     permission_classes = [IsAuthenticatedReceptionist]
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        staff = user.hospital_staff_profile
-        hospital = staff.hospital
-        hospital_user = hospital.user
+        staff = request.staff
+        hospital = request.hospital
         
-        is_subscribed = Subscription.objects.filter(user=hospital_user, status=Subscription.SubscriptionStatus.ACTIVE).exists()
+        is_subscribed = is_hospital_entitled(hospital)
         hospital_theme = {
             "name": hospital.name,
             "bg_image": hospital.bg_image.get("url") if hospital.bg_image else None,
@@ -921,7 +931,7 @@ class ReceptionistCreatePatientView(generics.CreateAPIView):
         return super().post(request, *args, **kwargs)
     
     def perform_create(self, serializer):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         verify_url = serializer.validated_data.pop("verify_url")
         user = serializer.save()
@@ -945,6 +955,60 @@ class ReceptionistCreatePatientView(generics.CreateAPIView):
         
         HospitalPatientActivity.objects.create(patient=user.patient_profile, staff=staff, hospital=hospital, action="create_patient_account")
         
+@extend_schema(tags=["Hospital Admin", "Receptionist"], summary="Bulk import patients from a CSV or NDJSON file")
+class ListCreatePatientImportView(HospitalScopedMixin, generics.ListCreateAPIView):
+    """
+    POST stores the file and starts an import job in the background (202); poll the job for
+    progress and list its row errors. GET lists the hospital's import jobs.
+    """
+    permission_classes = [IsAuthenticatedHospitalAdmin | IsAuthenticatedReceptionist]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def get_serializer_class(self):
+        if self.request.method == "POST":
+            return CreatePatientImportSerializer
+        return PatientImportJobSerializer
+    
+    def get_queryset(self):
+        return self.scope_to_hospital(PatientImportJob.objects.order_by('-created_at'))
+    
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        
+        job = create_import_job(
+            hospital=self.get_hospital(),
+            file_name=upload.name,
+            fmt=serializer.validated_data["format"],
+            created_by=request.user,
+            staff=self.get_staff(),
+            verify_url=serializer.validated_data.get("verify_url", ""),
+            upload=upload,
+        )
+        
+        return Response(PatientImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    
+@extend_schema(tags=["Hospital Admin", "Receptionist"], summary="Get a patient import job's progress")
+class RetrievePatientImportView(HospitalScopedMixin, generics.RetrieveAPIView):
+    serializer_class = PatientImportJobSerializer
+    permission_classes = [IsAuthenticatedHospitalAdmin | IsAuthenticatedReceptionist]
+    authenticate_from_claims = True
+    
+    def get_queryset(self):
+        return self.scope_to_hospital(PatientImportJob.objects.all())
+    
+@extend_schema(tags=["Hospital Admin", "Receptionist"], summary="List the rows a patient import rejected")
+class ListPatientImportErrorsView(HospitalScopedMixin, generics.ListAPIView):
+    serializer_class = PatientImportErrorSerializer
+    permission_classes = [IsAuthenticatedHospitalAdmin | IsAuthenticatedReceptionist]
+    authenticate_from_claims = True
+    
+    def get_queryset(self):
+        job = get_object_or_404(self.scope_to_hospital(PatientImportJob.objects.all()), pk=self.kwargs["pk"])
+        return job.row_errors.order_by('row_number')
+    
 @extend_schema(tags=["Receptionist"], summary="Get patient details by HIN")
 class GetPatientDetailsView(generics.RetrieveAPIView):
     serializer_class = PatientFullInfoSerializer
@@ -962,7 +1026,7 @@ class GetPatientDetailsView(generics.RetrieveAPIView):
         
     def get(self, request, *args, **kwargs):
         patient_user = self.get_object()
-        staff = request.user.hospital_staff_profile
+        staff = request.staff
         hospital = staff.hospital
         
         serializer = self.get_serializer(patient_user.patient_profile)
@@ -971,6 +1035,30 @@ class GetPatientDetailsView(generics.RetrieveAPIView):
         
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+@extend_schema(
+    tags=["Receptionist"],
+    summary="Search the hospital's patients by name, phone number, email or HIN prefix",
+    parameters=[
+        OpenApiParameter('q', OpenApiTypes.STR, description=f'Search text, at least {MIN_QUERY_LENGTH} characters'),
+        OpenApiParameter('limit', OpenApiTypes.INT, description='Maximum results (default 20, at most 50)'),
+    ],
+)
+class SearchPatientsView(HospitalScopedMixin, generics.ListAPIView):
+    """Best matches first; only patients with activity at the receptionist's hospital are searched."""
+    serializer_class = PatientSearchResultSerializer
+    permission_classes = [IsAuthenticatedReceptionist]
+    authenticate_from_claims = True
+    pagination_class = None
+    max_limit = 50
+    
+    def get_queryset(self):
+        try:
+            limit = min(max(int(self.request.query_params.get("limit", 20)), 1), self.max_limit)
+        except ValueError:
+            limit = 20
+        
+        return search_patients(self.get_hospital(), self.request.query_params.get("q", ""), limit=limit)
+
 @extend_schema(tags=["Receptionist", "Nurse", "Doctor"], summary="Get hospital staff by role")
 class GetStaffByRoleView(generics.ListAPIView):
     permission_classes = [IsAuthenticatedHospitalStaff | IsAuthenticatedHospitalAdmin]
@@ -979,7 +1067,7 @@ class GetStaffByRoleView(generics.ListAPIView):
     
     def get(self, request, *args, **kwargs):
         staff_role = kwargs.get("role")
-        hospital = request.user.hospital_staff_profile.hospital
+        hospital = request.hospital
         
         if not staff_role:
             return Response({"detail": "staff_role is required"}, status=status.HTTP_400_BAD_REQUEST)
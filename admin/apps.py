@@ -5,3 +5,7 @@ class AdminConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin'
     label = 'dh_admin'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
@@ -0,0 +1,55 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.models import User, PatientProfile
+from admin.scale_data import DEFAULTS, generate, estimate_rows, hospital_email
+
+class Command(BaseCommand):
+    help = (
+        'Generates production-scale synthetic hospitals, staff, patients and records with chunked bulk INSERTs. '
+        'The same --seed and sizes produce the same data; --workers splits patient chunks across processes (PostgreSQL only).'
+    )
+
+    def add_arguments(self, parser):
+        # --hospitals, --patients (per hospital), --soap-notes-per-patient, --bed-occupancy, ...
+        for key, value in DEFAULTS.items():
+            parser.add_argument(f"--{key.replace('_', '-')}", dest=key, type=type(value), default=value, help=f"Default {value}")
+        parser.add_argument('--seed', type=int, default=0, help='Seed for every random choice')
+        parser.add_argument('--tag', default='scale', help='Email prefix of the generated accounts; use a new one to add a second dataset')
+        parser.add_argument('--workers', type=int, default=min(os.cpu_count() or 1, 8), help='Processes inserting patient chunks')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Patients per chunk (one transaction each)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        config = {key: options[key] for key in DEFAULTS}
+        if min(config["hospitals"], config["patients"], config["doctors"], config["nurses"], options["chunk_size"], options["batch_size"]) < 1:
+            raise CommandError("--hospitals, --patients, --doctors, --nurses, --chunk-size and --batch-size must be at least 1")
+        if User.objects.filter(email=hospital_email(options["tag"], 0)).exists():
+            raise CommandError(f"A dataset tagged {options['tag']!r} already exists; pass another --tag")
+
+        workers = options["workers"]
+        if workers > 1 and connection.vendor != "postgresql":
+            self.stdout.write(self.style.WARNING(f"{connection.vendor} does not take concurrent writers; using one worker"))
+            workers = 1
+
+        total = config["hospitals"] * config["patients"]
+        self.stdout.write(f"Generating about {estimate_rows(config):,} rows for {total:,} patients with {workers} worker(s)...")
+
+        def progress(counts, elapsed):
+            rows = sum(counts.values())
+            self.stdout.write(f"  {counts[PatientProfile._meta.label]:,}/{total:,} patients, {rows:,} rows, {rows / elapsed:,.0f} rows/s")
+
+        started = time.perf_counter()
+        counts = generate(
+            config, seed=options["seed"], workers=workers, chunk_size=options["chunk_size"],
+            batch_size=options["batch_size"], tag=options["tag"], progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f"  {label}: {count:,}")
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(f"Generated {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)"))
@@ -0,0 +1,39 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from admin.rollups import rebuild_rollups, rebuild_stale_rollups, earliest_day
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the admin dashboard rollups: the most recent days (rows bulk-inserted without '
+        'signals land there) and every day marked stale by a change to the rows it counts. '
+        'Runs continuously with --loop; --full recomputes everything once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ADMIN_DASHBOARD_RECENT_DAYS, help='Number of most recent days to recompute')
+        parser.add_argument('--full', action='store_true', help='Recompute everything since the first user signed up')
+        parser.add_argument('--loop', action='store_true', help='Keep rebuilding instead of exiting')
+        parser.add_argument('--sleep', type=float, default=300.0, help='Seconds between passes when looping')
+
+    def handle(self, *args, **options):
+        while True:
+            self.rebuild(options)
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+    def rebuild(self, options):
+        end_day = timezone.localdate()
+        start_day = earliest_day() if options['full'] else end_day - timedelta(days=max(options['days'], 1) - 1)
+
+        rows = rebuild_rollups(start_day, end_day)
+        stale_days = rebuild_stale_rollups()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} rollup rows for {start_day} to {end_day} and {len(stale_days)} stale days'
+        ))
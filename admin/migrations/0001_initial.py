@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('metric', models.CharField(choices=[('users', 'Registered users by role'), ('users_by_state', 'Registered users by state'), ('subscribed_users', 'Users with an active subscription'), ('active_subscriptions', 'Active subscriptions by start date'), ('revenue', 'Transaction volume'), ('patients_with_subaccounts', 'Patients with subaccounts'), ('patients_without_subaccounts', 'Patients without subaccounts')], max_length=40)),
+                ('dimension', models.CharField(blank=True, default='', max_length=50)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metric', 'day'], name='dh_admin_da_metric_f4d9ba_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'metric', 'dimension'), name='unique_dashboard_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dh_admin', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleRollupDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('marked_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='dashboardrollup',
+            name='metric',
+            field=models.CharField(choices=[('users', 'Registered users by role'), ('users_by_state', 'Registered users by state'), ('revenue', 'Transaction volume'), ('patients_with_subaccounts', 'Patients with subaccounts'), ('patients_without_subaccounts', 'Patients without subaccounts')], max_length=40),
+        ),
+    ]
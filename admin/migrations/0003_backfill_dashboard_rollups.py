@@ -0,0 +1,23 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    from admin.rollups import Metric, rebuild_rollups, earliest_day
+
+    DashboardRollup = apps.get_model('dh_admin', 'DashboardRollup')
+    DashboardRollup.objects.exclude(metric__in=Metric.values).delete()
+    rebuild_rollups(earliest_day(apps), timezone.localdate(), apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dh_admin', '0002_stale_rollup_days'),
+        ('accounts', '0019_patient_search_indexes'),
+        ('organizations', '0017_webhookevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,40 @@
 from django.db import models
 
 # Create your models here.
+class DashboardRollup(models.Model):
+    """
+    One counter per (day, metric, dimension), rebuilt by `manage.py rebuild_dashboard_rollups`.
+    The admin dashboard sums these instead of aggregating users and transactions live.
+    Subscription metrics are not rolled up: entitlement lapses with time, not with a write.
+    """
+    class Metric(models.TextChoices):
+        USERS = "users", "Registered users by role"
+        USERS_BY_STATE = "users_by_state", "Registered users by state"
+        REVENUE = "revenue", "Transaction volume"
+        PATIENTS_WITH_SUBACCOUNTS = "patients_with_subaccounts", "Patients with subaccounts"
+        PATIENTS_WITHOUT_SUBACCOUNTS = "patients_without_subaccounts", "Patients without subaccounts"
+
+    day = models.DateField()
+    metric = models.CharField(max_length=40, choices=Metric.choices)
+    dimension = models.CharField(max_length=50, blank=True, default="")
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "metric", "dimension"], name="unique_dashboard_rollup"),
+        ]
+        indexes = [
+            models.Index(fields=["metric", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.metric}[{self.dimension}] = {self.value}"
+
+class StaleRollupDay(models.Model):
+    """A day whose rollups no longer match the rows they count, rebuilt on the next rebuild_dashboard_rollups pass."""
+    day = models.DateField(unique=True)
+    marked_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.day} (marked {self.marked_at})"
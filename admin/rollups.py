@@ -0,0 +1,165 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum, Q, Value, F, Exists, OuterRef, CharField
+from django.db.models.functions import TruncDate, TruncMonth, Coalesce
+from django.utils import timezone
+
+from organizations.models import Subscription, Transaction
+from organizations.services import entitlement_q
+from accounts.models import User
+
+from .models import DashboardRollup, StaleRollupDay
+
+Metric = DashboardRollup.Metric
+
+MEMBER_ROLES = [User.Role.HOSPITAL, User.Role.PATIENT]
+
+def rollup_sources(apps=global_apps):
+    """
+    Per metric: the rows it counts, the dimension to group by and the aggregate. Days come from
+    created_at. `apps` is the app registry, so migrations can rebuild with historical models.
+    """
+    users = apps.get_model("accounts", "User").objects
+    subaccounts = apps.get_model("accounts", "SubaccountProfile").objects
+    transactions = apps.get_model("organizations", "Transaction").objects
+
+    members = users.filter(is_active=True, role__in=MEMBER_ROLES)
+    patients = members.filter(role=User.Role.PATIENT).annotate(
+        has_subaccounts=Exists(subaccounts.filter(parent__user=OuterRef('pk'), is_deleted=False))
+    )
+    no_dimension = Value("", output_field=CharField())
+
+    return {
+        Metric.USERS: (members, F('role'), Count('id')),
+        Metric.USERS_BY_STATE: (
+            members,
+            Coalesce(F('patient_profile__state'), F('hospital_profile__state'), Value('Unknown')),
+            Count('id'),
+        ),
+        Metric.REVENUE: (
+            transactions.filter(status=Transaction.Status.SUCCESS, is_deleted=False),
+            no_dimension,
+            Sum('amount'),
+        ),
+        Metric.PATIENTS_WITH_SUBACCOUNTS: (patients.filter(has_subaccounts=True), no_dimension, Count('id')),
+        Metric.PATIENTS_WITHOUT_SUBACCOUNTS: (patients.filter(has_subaccounts=False), no_dimension, Count('id')),
+    }
+
+def earliest_day(apps=global_apps):
+    first = apps.get_model("accounts", "User").objects.order_by('created_at').values_list('created_at', flat=True).first()
+    return timezone.localdate(first) if first else timezone.localdate()
+
+def rebuild_rollups(start_day, end_day, apps=global_apps):
+    """Recomputes every metric for [start_day, end_day] and replaces those days' rows. Idempotent."""
+    DashboardRollup = apps.get_model("dh_admin", "DashboardRollup")
+    tz = timezone.get_current_timezone()
+    window = Q(
+        created_at__gte=datetime.combine(start_day, time.min, tzinfo=tz),
+        created_at__lt=datetime.combine(end_day + timedelta(days=1), time.min, tzinfo=tz),
+    )
+
+    rows = []
+    for metric, (queryset, dimension, aggregate) in rollup_sources(apps).items():
+        grouped = (
+            queryset.filter(window)
+            .annotate(day=TruncDate('created_at'), dimension=dimension)
+            .values('day', 'dimension')
+            .annotate(value=aggregate)
+            .order_by()
+        )
+        rows.extend(
+            DashboardRollup(day=item['day'], metric=metric, dimension=item['dimension'] or "", value=item['value'] or 0)
+            for item in grouped
+        )
+
+    with transaction.atomic():
+        DashboardRollup.objects.filter(day__range=(start_day, end_day)).delete()
+        DashboardRollup.objects.bulk_create(rows, batch_size=1000)
+
+    return len(rows)
+
+def rebuilt_every_pass(day):
+    """
+    Whether every pass of `rebuild_dashboard_rollups` recomputes `day` anyway. A pass covers
+    the last ADMIN_DASHBOARD_RECENT_DAYS days; one day of that is kept as margin for a pass
+    that runs after midnight.
+    """
+    return day > timezone.localdate() - timedelta(days=max(settings.ADMIN_DASHBOARD_RECENT_DAYS, 1) - 1)
+
+def mark_stale_days(moments):
+    """
+    Queues the days of these created_at values for the next rebuild. Called when a row the
+    rollups count changes after its day was rolled up (admin.signals, bulk deactivations).
+    Today's rows are left to the recent-days pass, so a signup or payment never writes here.
+    """
+    days = {timezone.localdate(moment) for moment in moments if moment}
+    days = [day for day in sorted(days) if not rebuilt_every_pass(day)]
+    if not days:
+        return
+
+    StaleRollupDay.objects.bulk_create(
+        [StaleRollupDay(day=day) for day in days],
+        update_conflicts=True, unique_fields=["day"], update_fields=["marked_at"],
+    )
+
+def day_ranges(days):
+    """Sorted days as (first, last) runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+def rebuild_stale_rollups():
+    """Rebuilds the days marked stale and clears their marks, unless re-marked meanwhile. Returns the days."""
+    started = timezone.now()
+    days = sorted(StaleRollupDay.objects.values_list("day", flat=True))
+    for start_day, end_day in day_ranges(days):
+        rebuild_rollups(start_day, end_day)
+
+    StaleRollupDay.objects.filter(day__in=days, marked_at__lte=started).delete()
+    return days
+
+def subscribed_users():
+    """Members entitled right now; live, since a subscription lapses without any row changing."""
+    return User.objects.filter(is_active=True, role__in=MEMBER_ROLES).filter(entitlement_q("subscription__")).count()
+
+def subscription_trend(start_day, end_day):
+    """Currently entitled subscriptions per month they started in; live for the same reason."""
+    return (
+        Subscription.objects
+        .filter(entitlement_q(), created_at__date__range=(start_day, end_day))
+        .annotate(month=TruncMonth('created_at'))
+        .values('month')
+        .annotate(value=Count('id'))
+        .order_by('month')
+    )
+
+def rollup_totals(*metrics):
+    totals = {metric: Decimal(0) for metric in metrics}
+    for item in DashboardRollup.objects.filter(metric__in=metrics).values('metric').annotate(total=Sum('value')):
+        totals[item['metric']] = item['total']
+    return totals
+
+def rollup_totals_by_dimension(metric, start_day=None, end_day=None):
+    queryset = DashboardRollup.objects.filter(metric=metric)
+    if start_day and end_day:
+        queryset = queryset.filter(day__range=(start_day, end_day))
+
+    return queryset.values('dimension').annotate(total=Sum('value')).order_by('-total')
+
+def monthly_trend(metric, start_day, end_day):
+    return (
+        DashboardRollup.objects
+        .filter(metric=metric, day__range=(start_day, end_day))
+        .annotate(month=TruncMonth('day'))
+        .values('month')
+        .annotate(value=Sum('value'))
+        .order_by('month')
+    )
@@ -0,0 +1,355 @@
+import multiprocessing
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime, time as day_start, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.utils import timezone
+
+from accounts.models import User, PatientProfile, HospitalStaffProfile
+from facility.models import HospitalWard, WardBed
+from facility.services import build_beds, reconcile_bed_counters
+from hospital_ops.models import Appointment, HospitalPatientActivity, refresh_last_completed
+from organizations.models import HospitalProfile, SubscriptionPlan, Subscription, Transaction
+from records.models import SoapNote, DrugRecord, VitalSigns, Admission, CaseNote, DischargeForm
+
+from docuhealth2.utils.generate import reserve_staff_ids
+from docuhealth2.utils.hin import reserve_hins
+
+from .rollups import rebuild_rollups, earliest_day
+
+# Synthetic data at production scale. Hospitals with their wards, beds and staff are created
+# first, in this process; patients and everything recorded about them are then generated in
+# chunks, each chunk one transaction of bulk INSERTs that can run in a worker process. Every
+# hospital and every chunk draws from its own Random(seed, ...) and gets its HINs handed out
+# in chunk order, so the same seed and settings produce the same rows whatever the worker count
+# (only the order of primary keys varies when chunks run in parallel).
+
+EMAIL_DOMAIN = "scale.docuhealth.local"
+DEFAULT_PASSWORD = "scale-password"
+
+# Per hospital, except `hospitals`; `*_per_patient` and ratios apply to each patient
+DEFAULTS = {
+    "hospitals": 10,
+    "wards": 8,
+    "beds_per_ward": 25,
+    "doctors": 30,
+    "nurses": 50,
+    "receptionists": 8,
+    "patients": 10000,
+    "soap_notes_per_patient": 4,
+    "appointments_per_patient": 3,
+    "bed_occupancy": 0.3,
+    "discharged_ratio": 0.05,
+    "subscriber_ratio": 0.3,
+    "history_days": 365,
+}
+
+FIRSTNAMES = ["Ada", "Chinedu", "Funmi", "Ibrahim", "Ngozi", "Tunde", "Amaka", "Emeka", "Halima", "Kemi", "Segun", "Zainab"]
+LASTNAMES = ["Okafor", "Adeyemi", "Bello", "Eze", "Lawal", "Nwosu", "Ogunleye", "Usman", "Afolabi", "Obi", "Musa", "Okeke"]
+STATES = ["Lagos", "Abuja", "Oyo", "Kano", "Rivers", "Enugu"]
+COMPLAINTS = [("Headache", "Migraine"), ("Fever", "Malaria"), ("Cough", "Upper respiratory tract infection"), ("Chest pain", "Hypertension")]
+DRUGS = ["Paracetamol", "Artemether", "Amoxicillin", "Amlodipine", "Ibuprofen"]
+
+# Models whose created_at is generated (spread over `history_days`) rather than stamped now()
+BACKDATED_MODELS = [
+    User, PatientProfile, VitalSigns, SoapNote, DrugRecord, CaseNote, Appointment,
+    HospitalPatientActivity, Transaction, Admission, DischargeForm,
+]
+
+def hospital_email(tag, hospital):
+    return f"{tag}-hospital{hospital}@{EMAIL_DOMAIN}"
+
+def staff_email(tag, hospital, role, number):
+    return f"{tag}-{role}{number}.h{hospital}@{EMAIL_DOMAIN}"
+
+def patient_email(tag, hospital, number):
+    return f"{tag}-patient{number}.h{hospital}@{EMAIL_DOMAIN}"
+
+def hospital_name(index):
+    # Staff IDs are prefixed with the name's first four letters, and must be unique across hospitals
+    letters = ""
+    for _ in range(4):
+        index, digit = divmod(index, 26)
+        letters = chr(ord("A") + digit) + letters
+    return f"{letters.capitalize()} General Hospital"
+
+def person(rng):
+    return {"firstname": rng.choice(FIRSTNAMES), "lastname": rng.choice(LASTNAMES), "gender": rng.choice(["male", "female"])}
+
+def rows_per_patient(config):
+    """Approximate rows one patient brings with them, for sizing a run."""
+    notes = config["soap_notes_per_patient"]
+    return (
+        2                                   # user, profile
+        + notes * 4                         # vitals, SOAP note, two drug records
+        + notes / 3                         # case notes
+        + notes + 1                         # activities
+        + config["appointments_per_patient"]
+        + config["subscriber_ratio"] * 2    # transaction, subscription
+        + config["discharged_ratio"] * 2    # admission, discharge form
+    )
+
+def estimate_rows(config):
+    per_hospital = (
+        1 + 1 + config["wards"] * (1 + config["beds_per_ward"])
+        + (config["doctors"] + config["nurses"] + config["receptionists"]) * 2
+        + config["patients"] * rows_per_patient(config)
+    )
+    return int(config["hospitals"] * per_hospital)
+
+@contextmanager
+def backdated_created_at():
+    """Lets bulk_create keep the created_at values set on the instances instead of stamping now()."""
+    fields = [model._meta.get_field("created_at") for model in BACKDATED_MODELS]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+def between(rng, start, end):
+    return start + timedelta(seconds=rng.randrange(max(int((end - start).total_seconds()), 1)))
+
+def generate(config=None, seed=0, workers=1, chunk_size=1000, batch_size=2000, tag="scale", password=None, pharmacy_id=None, progress=None):
+    """
+    Generates `config` (merged over DEFAULTS) and returns a Counter of rows created per model.
+    `progress(counts, elapsed)` is called after each patient chunk commits.
+    """
+    config = {**DEFAULTS, **(config or {})}
+    password = password or make_password(DEFAULT_PASSWORD)
+    # Anchored to the start of today, so generated history does not depend on the time of day
+    until = timezone.make_aware(datetime.combine(timezone.localdate(), day_start.min))
+    started = time.perf_counter()
+
+    plan, _ = SubscriptionPlan.objects.get_or_create(
+        name=f"Scale plan ({tag})",
+        defaults={"price": 2000, "description": "Synthetic data", "interval": SubscriptionPlan.Intervals.MONTHLY, "role": User.Role.PATIENT},
+    )
+
+    # Names, and so staff ID prefixes, continue after any hospitals already in the database
+    first_name = HospitalProfile.all_objects.count()
+    counts = Counter()
+    hospital_ids, tasks = [], []
+    for index in range(config["hospitals"]):
+        rng = random.Random(f"{seed}:hospital:{index}")
+        hospital, hospital_counts = generate_hospital(index, hospital_name(first_name + index), config, rng, tag, password, batch_size)
+        counts.update(hospital_counts)
+        hospital_ids.append(hospital["hospital_id"])
+
+        chunks = range(0, config["patients"], chunk_size)
+        for chunk, first in enumerate(chunks):
+            count = min(chunk_size, config["patients"] - first)
+            tasks.append({
+                **hospital,
+                "config": config, "seed": seed, "tag": tag, "password": password, "batch_size": batch_size,
+                "until": until, "plan_id": plan.id, "pharmacy_id": pharmacy_id,
+                "chunk": chunk, "first": first, "hins": reserve_hins(count),
+                # Each chunk may only admit patients to its own share of the beds
+                "beds": hospital["beds"][chunk::len(chunks)],
+            })
+
+    for chunk_counts in run_tasks(tasks, workers):
+        counts.update(chunk_counts)
+        if progress:
+            progress(counts, time.perf_counter() - started)
+
+    reconcile_bed_counters(HospitalWard.objects.filter(hospital_id__in=hospital_ids))
+    rebuild_rollups(earliest_day(), timezone.localdate())
+    return counts
+
+def run_tasks(tasks, workers):
+    if workers <= 1:
+        for task in tasks:
+            yield generate_patients(task)
+        return
+
+    # Forked workers must not share this process's connections; each opens its own
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        for future in as_completed([pool.submit(generate_patients, task) for task in tasks]):
+            yield future.result()
+
+def generate_hospital(index, name, config, rng, tag, password, batch_size):
+    """The hospital, its wards and beds, and its staff with staff IDs reserved from StaffCounter, in one transaction."""
+    counts = Counter()
+    with transaction.atomic():
+        user = User.objects.bulk_create([User(email=hospital_email(tag, index), password=password, role=User.Role.HOSPITAL, is_active=True, is_verified=True)])[0]
+        hospital = HospitalProfile.objects.create(user=user, hin=reserve_hins(1)[0], name=name, state=rng.choice(STATES), country="Nigeria")
+
+        wards = HospitalWard.objects.bulk_create([
+            HospitalWard(hospital=hospital, name=f"Ward {number + 1}", total_beds=config["beds_per_ward"], available_bed_count=config["beds_per_ward"])
+            for number in range(config["wards"])
+        ])
+        beds = WardBed.objects.bulk_create([bed for ward in wards for bed in build_beds(ward, 1, config["beds_per_ward"])], batch_size=batch_size)
+
+        staff = {}
+        for role in HospitalStaffProfile.StaffRole.values:
+            count = config[f"{role}s"]
+            users = User.objects.bulk_create([
+                User(email=staff_email(tag, index, role, number), password=password, role=User.Role.HOSPITAL_STAFF, is_active=True, is_verified=True)
+                for number in range(count)
+            ], batch_size=batch_size)
+            staff[role] = HospitalStaffProfile.objects.bulk_create([
+                HospitalStaffProfile(
+                    user=user, hospital=hospital, role=role, staff_id=staff_id, phone_num=f"080{rng.randrange(10 ** 8):08d}",
+                    ward=wards[number % len(wards)] if role == HospitalStaffProfile.StaffRole.NURSE and wards else None,
+                    specialization="General practice" if role == HospitalStaffProfile.StaffRole.DOCTOR else None,
+                    **person(rng),
+                )
+                for number, (user, staff_id) in enumerate(zip(users, reserve_staff_ids(hospital, role, count)))
+            ], batch_size=batch_size)
+            counts[User._meta.label] += count
+            counts[HospitalStaffProfile._meta.label] += count
+
+    counts.update({
+        User._meta.label: 1, HospitalProfile._meta.label: 1,
+        HospitalWard._meta.label: len(wards), WardBed._meta.label: len(beds),
+    })
+    return {
+        "hospital": index,
+        "hospital_id": hospital.id,
+        "wards": [ward.id for ward in wards],
+        "beds": [(bed.id, bed.ward_id) for bed in beds],
+        "doctors": [profile.id for profile in staff["doctor"]],
+        "nurses": [profile.id for profile in staff["nurse"]],
+        "receptionists": [profile.id for profile in staff["receptionist"]],
+    }, counts
+
+def generate_patients(task):
+    """One chunk of a hospital's patients and their records, in one transaction. Returns rows created per model."""
+    config, batch_size, until = task["config"], task["batch_size"], task["until"]
+    rng = random.Random(f"{task['seed']}:patients:{task['hospital']}:{task['chunk']}")
+    history_start = until - timedelta(days=config["history_days"])
+
+    rows = {model: [] for model in (VitalSigns, SoapNote, DrugRecord, CaseNote, Appointment, HospitalPatientActivity, Transaction, Subscription, Admission, DischargeForm)}
+
+    with backdated_created_at(), transaction.atomic():
+        joined = [between(rng, history_start, until) for _ in task["hins"]]
+        users = User.objects.bulk_create([
+            User(
+                email=patient_email(task["tag"], task["hospital"], task["first"] + number), password=task["password"],
+                role=User.Role.PATIENT, is_active=True, is_verified=True, created_at=joined[number],
+            )
+            for number in range(len(task["hins"]))
+        ], batch_size=batch_size)
+        patients = PatientProfile.objects.bulk_create([
+            PatientProfile(
+                user=user, hin=hin, dob=date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 70)),
+                phone_num=f"080{rng.randrange(10 ** 8):08d}", state=rng.choice(STATES), country="Nigeria",
+                nin_verified=True, created_at=user.created_at, **person(rng),
+            )
+            for user, hin in zip(users, task["hins"])
+        ], batch_size=batch_size)
+
+        for patient in patients:
+            add_patient_records(rows, rng, config, task, patient, until)
+
+        # Parents before children: SOAP notes point at vitals, drug records at SOAP notes, discharge forms at admissions
+        for model in (VitalSigns, SoapNote, DrugRecord, CaseNote, Appointment, HospitalPatientActivity, Transaction, Subscription):
+            model.objects.bulk_create(rows[model], batch_size=batch_size)
+
+        admit_to_beds(rows, rng, task, patients, until)
+        Admission.objects.bulk_create(rows[Admission], batch_size=batch_size)
+        DischargeForm.objects.bulk_create(rows[DischargeForm], batch_size=batch_size)
+
+        refresh_last_completed([patient.id for patient in patients])
+
+    counts = Counter({model._meta.label: len(objects) for model, objects in rows.items()})
+    counts.update({User._meta.label: len(users), PatientProfile._meta.label: len(patients)})
+    return counts
+
+def add_patient_records(rows, rng, config, task, patient, until):
+    hospital_id, doctors, nurses, receptionists = task["hospital_id"], task["doctors"], task["nurses"], task["receptionists"]
+
+    for number in range(config["soap_notes_per_patient"]):
+        seen = between(rng, patient.created_at, until)
+        doctor = rng.choice(doctors)
+        complaint, diagnosis = rng.choice(COMPLAINTS)
+        vitals = VitalSigns(
+            hospital_id=hospital_id, patient=patient, staff_id=rng.choice(nurses), created_at=seen,
+            blood_pressure=f"{rng.randint(100, 160)}/{rng.randint(60, 100)}", temp=round(rng.uniform(36.0, 39.5), 1),
+            resp_rate=rng.randint(12, 24), heart_rate=rng.randint(55, 120), height=rng.randint(150, 195), weight=rng.randint(45, 110),
+        )
+        note = SoapNote(
+            patient=patient, staff_id=doctor, hospital_id=hospital_id, vital_signs=vitals, created_at=seen,
+            chief_complaint=complaint, primary_diagnosis=diagnosis, history_of_complain=f"{rng.randint(1, 14)} days",
+            treatment_plan=["Medication", "Review in one week"], care_instructions=["Rest", "Hydration"],
+            investigations=["FBC"], problems_list=[complaint], drug_history_allergies=[],
+        )
+        rows[VitalSigns].append(vitals)
+        rows[SoapNote].append(note)
+        rows[DrugRecord].extend(
+            DrugRecord(
+                soap_note=note, patient=patient, hospital_id=hospital_id, created_at=seen,
+                pharmacy_id=task["pharmacy_id"] if task["pharmacy_id"] and rng.random() < 0.1 else None,
+                name=rng.choice(DRUGS), route="oral", quantity=rng.randint(1, 30),
+                frequency={"value": rng.randint(1, 3), "rate": "daily"}, duration={"value": rng.randint(3, 14), "rate": "days"},
+                allergies=[], upload_source=DrugRecord.UploadSource.SOAPNOTE,
+                status=DrugRecord.Status.COMPLETED if seen < until - timedelta(days=30) else DrugRecord.Status.ONGOING,
+            )
+            for _ in range(2)
+        )
+        if number % 3 == 0:
+            rows[CaseNote].append(CaseNote(patient=patient, staff_id=vitals.staff_id, hospital_id=hospital_id, created_at=seen, observation=["Stable"], care=["Observed"]))
+        rows[HospitalPatientActivity].append(HospitalPatientActivity(hospital_id=hospital_id, staff_id=doctor, patient=patient, action="created_soap_note", created_at=seen))
+
+    for number in range(config["appointments_per_patient"]):
+        booked = between(rng, patient.created_at, until)
+        # Older appointments are completed; the last one is still ahead of the patient, mostly
+        # pending as the doctor and receptionist "upcoming" lists expect, some already confirmed
+        upcoming = number == config["appointments_per_patient"] - 1
+        if upcoming:
+            status = Appointment.Status.PENDING if rng.random() < 0.8 else Appointment.Status.CONFIRMED
+        else:
+            status = Appointment.Status.COMPLETED
+        rows[Appointment].append(Appointment(
+            patient=patient, hospital_id=hospital_id, staff_id=rng.choice(doctors), type="follow-up", created_at=booked,
+            scheduled_time=until + timedelta(days=rng.randint(1, 30), hours=rng.randint(8, 16)) if upcoming else booked + timedelta(days=rng.randint(1, 14)),
+            status=status,
+        ))
+    rows[HospitalPatientActivity].append(HospitalPatientActivity(
+        hospital_id=hospital_id, staff_id=rng.choice(receptionists) if receptionists else None, patient=patient,
+        action="registered_patient", created_at=patient.created_at,
+    ))
+
+    if rng.random() < config["subscriber_ratio"]:
+        paid = between(rng, patient.created_at, until)
+        rows[Transaction].append(Transaction(
+            user_id=patient.user_id, amount=2000, status=Transaction.Status.SUCCESS, created_at=paid,
+            reference=f"{task['tag']}-{task['seed']}-{patient.hin}",
+        ))
+        rows[Subscription].append(Subscription(
+            user_id=patient.user_id, plan_id=task["plan_id"], status=Subscription.SubscriptionStatus.ACTIVE,
+            start_date=paid, end_date=until + timedelta(days=30), last_payment_date=paid,
+        ))
+
+    if rng.random() < config["discharged_ratio"] and task["wards"]:
+        admitted = between(rng, patient.created_at, until)
+        admission = Admission(
+            patient=patient, hospital_id=hospital_id, staff_id=rng.choice(doctors), ward_id=rng.choice(task["wards"]),
+            status=Admission.Status.DISCHARGED, created_at=admitted, admission_date=admitted, discharge_date=admitted + timedelta(days=rng.randint(1, 7)),
+        )
+        rows[Admission].append(admission)
+        rows[DischargeForm].append(DischargeForm(
+            admission=admission, staff_id=admission.staff_id, hospital_id=hospital_id, created_at=admission.discharge_date,
+            chief_complaint=rng.choice(COMPLAINTS)[0], condition_on_discharge="Stable", diagnosis=[rng.choice(COMPLAINTS)[1]],
+            treatment_plan=["Medication"], care_instructions=["Rest"],
+        ))
+
+def admit_to_beds(rows, rng, task, patients, until):
+    """Fills `bed_occupancy` of the chunk's beds with active admissions and marks those beds occupied."""
+    beds = [bed for bed in task["beds"] if rng.random() < task["config"]["bed_occupancy"]][:len(patients)]
+    for (bed_id, ward_id), patient in zip(beds, rng.sample(patients, len(beds))):
+        admitted = until - timedelta(days=rng.randint(0, 10))
+        rows[Admission].append(Admission(
+            patient=patient, hospital_id=task["hospital_id"], staff_id=rng.choice(task["doctors"]), ward_id=ward_id, bed_id=bed_id,
+            status=Admission.Status.ACTIVE, created_at=admitted, admission_date=admitted,
+        ))
+    WardBed.objects.filter(id__in=[bed_id for bed_id, _ in beds]).update(status=WardBed.Status.OCCUPIED)
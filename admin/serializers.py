@@ -2,6 +2,8 @@ from rest_framework import serializers
 from accounts.models import PatientProfile, HospitalStaffProfile
 from organizations.models import HospitalProfile
 
+from docuhealth2.utils.hin import HINField
+
 class SummarySerializer(serializers.Serializer):
     total_users = serializers.IntegerField(help_text="Total active hospitals and patients.")
     total_revenue = serializers.DecimalField(max_digits=12, decimal_places=2, help_text="Sum of all successful transactions.")
@@ -31,6 +33,35 @@ class ChartsSerializer(serializers.Serializer):
 class AdminDashboardSerializer(serializers.Serializer):
     summary = SummarySerializer()
     charts = ChartsSerializer()
+
+class DuplicateQuerySerializer(serializers.Serializer):
+    sql = serializers.CharField(help_text="Statement fingerprint: IN lists and inline numbers collapsed.")
+    repeats = serializers.IntegerField(help_text="Executions beyond the first, summed over requests.")
+
+class ViewQueryStatsSerializer(serializers.Serializer):
+    view = serializers.CharField(help_text="Method, route and view class.")
+    requests = serializers.IntegerField()
+    avg_queries = serializers.FloatField()
+    max_queries = serializers.IntegerField()
+    avg_db_time_ms = serializers.FloatField()
+    max_db_time_ms = serializers.FloatField()
+    requests_with_duplicates = serializers.IntegerField(help_text="Requests that ran some statement more than once.")
+    top_duplicates = DuplicateQuerySerializer(many=True)
+
+class ProviderStatsSerializer(serializers.Serializer):
+    provider = serializers.CharField(help_text="Third-party API, e.g. paystack or korapay.")
+    calls = serializers.IntegerField(help_text="HTTP attempts made, retries included.")
+    errors = serializers.IntegerField(help_text="Attempts that raised or returned 5xx.")
+    retries = serializers.IntegerField()
+    rejected = serializers.IntegerField(help_text="Calls refused without a request while the circuit was open.")
+    avg_ms = serializers.FloatField()
+    max_ms = serializers.FloatField()
+    circuit = serializers.ChoiceField(choices=["closed", "open", "half-open"])
+
+class QueryStatsReportSerializer(serializers.Serializer):
+    since = serializers.DateTimeField(help_text="When this worker process started collecting.")
+    views = ViewQueryStatsSerializer(many=True, help_text="Heaviest views (total queries) first.")
+    providers = ProviderStatsSerializer(many=True, help_text="Outbound calls to each third-party API.")
     
 class PatientInfoSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(read_only=True)
@@ -58,4 +89,4 @@ class HospitalInfoSerializer(serializers.ModelSerializer):
         fields= ["name", "profile_image", "address", "email", "doctors", "other_personnel", "is_active", "hin"]
         
 class DeactivateUsersSerializer(serializers.Serializer):
-    hins = serializers.ListField(child=serializers.CharField(), allow_empty=False, required=True)
\ No newline at end of file
+    hins = serializers.ListField(child=HINField(), allow_empty=False, required=True)
\ No newline at end of file
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_save, post_delete
+
+from accounts.models import User, PatientProfile, SubaccountProfile
+from organizations.models import HospitalProfile, Transaction
+
+from .rollups import mark_stale_days
+
+# Rollups are keyed by created_at day but count mutable state (is_active, state, transaction
+# status, subaccounts). Each change marks the day it is counted on as stale, unless the
+# recent-days pass rebuilds that day anyway (new rows always land there). Bulk .update()
+# calls bypass these signals and mark the days themselves.
+
+# Saves that only touch other fields (e.g. last_login on every sign-in) leave the rollups alone
+COUNTED_FIELDS = {
+    User: {"is_active", "role"},
+    PatientProfile: {"state", "user"},
+    HospitalProfile: {"state", "user"},
+    Transaction: {"status", "amount", "is_deleted"},
+    SubaccountProfile: {"parent", "is_deleted"},
+}
+
+def counted_change(sender, update_fields):
+    return update_fields is None or bool(COUNTED_FIELDS[sender] & set(update_fields))
+
+def row_changed(sender, instance, update_fields=None, **kwargs):
+    if counted_change(sender, update_fields):
+        mark_stale_days([instance.created_at])
+
+def profile_changed(sender, instance, update_fields=None, **kwargs):
+    # Counted on the day the account, not the profile, was created
+    if counted_change(sender, update_fields):
+        mark_stale_days(User.objects.filter(pk=instance.user_id).values_list("created_at", flat=True))
+
+def subaccount_changed(sender, instance, update_fields=None, **kwargs):
+    # Moves the parent between "with" and "without subaccounts"
+    if instance.parent_id and counted_change(sender, update_fields):
+        mark_stale_days(User.objects.filter(patient_profile=instance.parent_id).values_list("created_at", flat=True))
+
+def connect():
+    receivers = {User: row_changed, Transaction: row_changed, PatientProfile: profile_changed, HospitalProfile: profile_changed, SubaccountProfile: subaccount_changed}
+    for name, signal in (("save", post_save), ("delete", post_delete)):
+        for sender, receiver in receivers.items():
+            signal.connect(receiver, sender=sender, dispatch_uid=f"rollups-{sender.__name__}-{name}")
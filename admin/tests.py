@@ -1,3 +1,192 @@
+from datetime import date, datetime, timedelta
+
+from django.apps import apps
+from django.db.models import Max, Q
 from django.test import TestCase
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from accounts.models import User, PatientProfile, SubaccountProfile
+from docuhealth2.utils.http_client import ProviderClient, providers
+from facility.models import HospitalWard, WardBed
+from facility.services import counted_wards, has_drifted
+from hospital_ops.models import Appointment
+from organizations.models import Subscription, SubscriptionPlan, Transaction
+from records.models import Admission
+
+from .models import DashboardRollup, StaleRollupDay
+from .rollups import Metric, day_ranges, rebuild_rollups, rebuild_stale_rollups, subscribed_users
+from .scale_data import generate
+
+LAST_MONTH = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=30), datetime.min.time()))
+
+def patient(email, created_at=LAST_MONTH):
+    user = User.objects.create(email=email, role=User.Role.PATIENT, is_active=True)
+    User.objects.filter(pk=user.pk).update(created_at=created_at)
+    user.refresh_from_db()
+    profile = PatientProfile.objects.create(user=user, firstname="Ada", lastname="Eze", dob=date(1990, 1, 1), gender="female", state="Lagos")
+    return user, profile
+
+def rollup(metric, dimension=""):
+    return sum(DashboardRollup.objects.filter(metric=metric, dimension=dimension).values_list("value", flat=True))
+
+class RollupMaintenanceTests(TestCase):
+    def setUp(self):
+        self.user, self.profile = patient("ada@example.com")
+        rebuild_rollups(LAST_MONTH.date(), timezone.localdate())
+        StaleRollupDay.objects.all().delete()
+
+    def test_deactivation_marks_the_signup_day_and_the_rebuild_drops_the_user(self):
+        self.assertEqual(rollup(Metric.USERS, User.Role.PATIENT), 1)
+
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+
+        self.assertEqual(list(StaleRollupDay.objects.values_list("day", flat=True)), [LAST_MONTH.date()])
+        self.assertEqual(rebuild_stale_rollups(), [LAST_MONTH.date()])
+        self.assertEqual(rollup(Metric.USERS, User.Role.PATIENT), 0)
+        self.assertFalse(StaleRollupDay.objects.exists())
+
+    def test_sign_in_does_not_mark_anything(self):
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=["last_login"])
+
+        self.assertFalse(StaleRollupDay.objects.exists())
+
+    def test_state_change_moves_the_user_between_states(self):
+        self.profile.state = "Oyo"
+        self.profile.save()
+        rebuild_stale_rollups()
+
+        self.assertEqual(rollup(Metric.USERS_BY_STATE, "Lagos"), 0)
+        self.assertEqual(rollup(Metric.USERS_BY_STATE, "Oyo"), 1)
+
+    def test_new_subaccount_moves_the_parent_to_with_subaccounts(self):
+        child = User.objects.create(email="child@example.com", role=User.Role.SUBACCOUNT)
+        SubaccountProfile.objects.create(user=child, parent=self.profile, firstname="Kid", lastname="Eze", dob=date(2015, 1, 1), gender="male")
+        rebuild_stale_rollups()
+
+        self.assertEqual(rollup(Metric.PATIENTS_WITH_SUBACCOUNTS), 1)
+        self.assertEqual(rollup(Metric.PATIENTS_WITHOUT_SUBACCOUNTS), 0)
+
+    def test_transaction_status_change_updates_revenue(self):
+        payment = Transaction.objects.create(user=self.user, amount=2000, reference="ref-1")
+        Transaction.objects.filter(pk=payment.pk).update(created_at=LAST_MONTH)
+        payment.refresh_from_db()
+        rebuild_stale_rollups()
+        self.assertEqual(rollup(Metric.REVENUE), 0)
+
+        payment.status = Transaction.Status.SUCCESS
+        payment.save()
+        rebuild_stale_rollups()
+
+        self.assertEqual(rollup(Metric.REVENUE), 2000)
+
+    def test_bulk_deactivation_marks_the_days_it_changes(self):
+        admin = User.objects.create(email="dh@example.com", role=User.Role.DHADMIN, is_active=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        StaleRollupDay.objects.all().delete()
+
+        response = client.post("/api/admin/patients/deactivate", {"hins": [self.profile.hin]}, format="json")
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(list(StaleRollupDay.objects.values_list("day", flat=True)), [LAST_MONTH.date()])
+        rebuild_stale_rollups()
+        self.assertEqual(rollup(Metric.USERS, User.Role.PATIENT), 0)
+
+    def test_new_rows_leave_the_stale_days_to_the_recent_pass(self):
+        user, _ = patient("femi@example.com", created_at=timezone.now())
+        payment = Transaction.objects.create(user=user, amount=2000, reference="ref-today", status=Transaction.Status.SUCCESS)
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        payment.delete()
+
+        self.assertFalse(StaleRollupDay.objects.exists())
+
+    def test_day_ranges_groups_consecutive_days(self):
+        first = date(2026, 1, 1)
+        days = [first, first + timedelta(days=1), first + timedelta(days=2), first + timedelta(days=5)]
+
+        self.assertEqual(day_ranges(days), [(days[0], days[2]), (days[3], days[3])])
+
+class LiveSubscriptionMetricTests(TestCase):
+    def test_subscribed_users_follows_the_paid_period(self):
+        user, _ = patient("ada@example.com")
+        plan = SubscriptionPlan.objects.create(name="Individual", price=2000, description="Plan", interval=SubscriptionPlan.Intervals.MONTHLY)
+        subscription = Subscription.objects.create(
+            user=user, plan=plan, status=Subscription.SubscriptionStatus.ACTIVE, next_payment_date=timezone.now() + timedelta(days=1),
+        )
+        self.assertEqual(subscribed_users(), 1)
+
+        # Lapses without any write, which a rollup keyed by day could never notice
+        Subscription.objects.filter(pk=subscription.pk).update(next_payment_date=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(subscribed_users(), 0)
+
+class QueryStatsReportTests(TestCase):
+    def setUp(self):
+        self.provider = ProviderClient("test-provider", "http://127.0.0.1:9/")
+        self.addCleanup(providers.pop, "test-provider", None)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(email="dh@example.com", role=User.Role.DHADMIN, is_active=True))
+
+    def test_reports_and_resets_outbound_provider_metrics(self):
+        self.provider.metrics.record(0.25)
+        self.provider.metrics.record(0.75, error=True)
+        self.provider.metrics.record_retry()
+
+        response = self.client.get("/api/admin/query-stats")
+
+        self.assertEqual(response.status_code, 200, response.content)
+        [row] = [row for row in response.data["providers"] if row["provider"] == "test-provider"]
+        self.assertEqual(
+            {key: row[key] for key in ("calls", "errors", "retries", "rejected", "avg_ms", "max_ms", "circuit")},
+            {"calls": 2, "errors": 1, "retries": 1, "rejected": 0, "avg_ms": 500.0, "max_ms": 750.0, "circuit": "closed"},
+        )
+
+        self.assertEqual(self.client.delete("/api/admin/query-stats").status_code, 204)
+        self.assertEqual(self.provider.metrics.snapshot()["calls"], 0)
+
+class ScaleDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.counts = generate({
+            "hospitals": 2, "wards": 2, "beds_per_ward": 4, "doctors": 2, "nurses": 2, "receptionists": 1, "patients": 12,
+            "soap_notes_per_patient": 2, "appointments_per_patient": 3, "bed_occupancy": 0.5, "discharged_ratio": 0.2, "history_days": 30,
+        }, chunk_size=5, password="unusable")
+
+    def test_counts_match_the_rows_created(self):
+        for label, count in self.counts.items():
+            model = apps.get_model(label)
+            self.assertEqual(getattr(model, "all_objects", model.objects).count(), count, label)
+
+    def test_ward_counters_match_the_beds(self):
+        wards = list(counted_wards())
+        self.assertEqual(len(wards), 4)
+        for ward in wards:
+            self.assertFalse(has_drifted(ward), ward.name)
+            self.assertEqual(ward.total_beds, WardBed.objects.filter(ward=ward).count())
+
+        occupied = WardBed.objects.filter(status=WardBed.Status.OCCUPIED).count()
+        self.assertGreater(occupied, 0)
+        self.assertEqual(occupied, Admission.objects.filter(status=Admission.Status.ACTIVE, bed__isnull=False).count())
+        self.assertEqual(sum(ward.occupied_bed_count for ward in HospitalWard.objects.all()), occupied)
+
+    def test_last_completed_at_matches_the_completed_appointments(self):
+        patients = PatientProfile.objects.annotate(
+            latest=Max("appointments__scheduled_time", filter=Q(appointments__status=Appointment.Status.COMPLETED))
+        )
+        self.assertEqual(len(patients), 24)
+        for patient in patients:
+            self.assertIsNotNone(patient.last_completed_at)
+            self.assertEqual(patient.last_completed_at, patient.latest)
+
+        # The upcoming lists only show pending appointments
+        self.assertTrue(Appointment.objects.filter(status=Appointment.Status.PENDING, scheduled_time__gt=timezone.now()).exists())
 
-# Create your tests here.
+    def test_rollups_are_populated(self):
+        self.assertEqual(rollup(Metric.USERS, User.Role.PATIENT), User.objects.filter(role=User.Role.PATIENT, is_active=True).count())
+        self.assertEqual(rollup(Metric.USERS, User.Role.HOSPITAL), 2)
+        self.assertEqual(rollup(Metric.REVENUE), sum(Transaction.objects.filter(status=Transaction.Status.SUCCESS).values_list("amount", flat=True)))
+        self.assertEqual(rollup(Metric.PATIENTS_WITHOUT_SUBACCOUNTS), 24)
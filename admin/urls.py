@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import AdminDashboard, ListUsersView, DeactivateHospitalView, DeactivatePatientsView, ReactivateHospitalView, ReactivatePatientsView
+from .views import AdminDashboard, ListUsersView, DeactivateHospitalView, DeactivatePatientsView, ReactivateHospitalView, ReactivatePatientsView, QueryStatsReportView
 
 urlpatterns = [
     path('/dashboard', AdminDashboard.as_view(), name='admin-dashboard'),
     path('/users/<str:role>', ListUsersView.as_view(), name='list-users'),
+    path('/query-stats', QueryStatsReportView.as_view(), name='query-stats'),
     
     path('/patients/deactivate', DeactivatePatientsView.as_view(), name="deactivate-patients"),
     path('/patients/activate', ReactivatePatientsView.as_view(), name="activate-patients"),
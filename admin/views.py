@@ -3,6 +3,8 @@ from django.db.models import Count, Sum, Q,  Value, F
 from django.db.models.functions import TruncMonth, Coalesce
 from django.utils import timezone
 from django.utils.dateparse import parse_date
+from django.core.cache import cache
+from django.conf import settings
 
 from datetime import timedelta
 
@@ -12,10 +14,15 @@ from rest_framework.response import Response
 
 from organizations.models import Transaction, Subscription, HospitalProfile
 from accounts.models import User, PatientProfile, HospitalStaffProfile, SubaccountProfile
+from accounts.tokens import bump_token_version
 
-from .serializers import AdminDashboardSerializer, PatientInfoSerializer, HospitalInfoSerializer, DeactivateUsersSerializer
+from .rollups import Metric, rollup_totals, rollup_totals_by_dimension, monthly_trend, subscribed_users, subscription_trend, mark_stale_days
+from .serializers import AdminDashboardSerializer, QueryStatsReportSerializer, PatientInfoSerializer, HospitalInfoSerializer, DeactivateUsersSerializer
 
 from docuhealth2.permissions import IsAuthenticatedDHAdmin
+from docuhealth2.pagination import SelectablePagination
+from docuhealth2.querystats import report as query_report
+from docuhealth2.utils.http_client import provider_metrics, reset_provider_metrics
 
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
 
@@ -28,123 +35,64 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
     ],
     responses={200: AdminDashboardSerializer}
 )
-class AdminDashboard(APIView): # TODO: Cache results for efficiency
+class AdminDashboard(APIView):
     permission_classes = [IsAuthenticatedDHAdmin]
     
     @staticmethod
-    def format_trend(queryset):
-        return [{"month": item['month'].strftime('%Y-%m'), "value": item['value']} for item in queryset]
+    def format_trend(queryset, as_int=True):
+        return [{"month": item['month'].strftime('%Y-%m'), "value": int(item['value']) if as_int else item['value']} for item in queryset]
 
     def get(self, request):
         start_date_param = request.query_params.get('start_date') 
         end_date_param = request.query_params.get('end_date')
 
         if not start_date_param:
-            start_date = timezone.now() - timedelta(days=365)
+            start_date = timezone.localdate() - timedelta(days=365)
         else:
             start_date = parse_date(start_date_param)
 
-        end_date = parse_date(end_date_param) if end_date_param else timezone.now()
+        end_date = parse_date(end_date_param) if end_date_param else timezone.localdate()
 
-        date_filter = Q(created_at__range=(start_date, end_date))
-        
-        summary_metrics = User.objects.filter(
-            is_active=True, 
-            role__in=[User.Role.HOSPITAL, User.Role.PATIENT]
-            ).aggregate(
-                total_users=Count('id'),
-                total_hospitals=Count('hospital_profile', distinct=True),
-                total_patients=Count('patient_profile', distinct=True),
-                
-                total_subscribed_users=Count(
-                    'subscription',
-                    filter=Q(subscription__status=Subscription.SubscriptionStatus.ACTIVE), 
-                    distinct=True
-                ), 
-                
-                total_revenue=Sum('transactions__amount'),
-                
-                patients_with_sub=Count(
-                    'id', 
-                    filter=Q(patient_profile__subaccounts__isnull=False),
-                    distinct=True
-                ),
-                
-                patients_without_sub=Count(
-                    'id', 
-                    filter=Q(patient_profile__subaccounts__isnull=True),
-                    distinct=True
-                )
-            )
+        cache_key = f"admin-dashboard:{start_date}:{end_date}"
+        response_data = cache.get(cache_key)
+        if response_data is None:
+            response_data = self.build_dashboard(start_date, end_date)
+            cache.set(cache_key, response_data, settings.ADMIN_DASHBOARD_CACHE_TTL)
 
-        revenue_trend = (
-            Transaction.objects
-            .filter(date_filter)
-            .annotate(month=TruncMonth('created_at'))
-            .values('month')
-            .annotate(value=Sum('amount'))
-            .order_by('month')
-        )
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    def build_dashboard(self, start_date, end_date):
+        totals = rollup_totals(Metric.REVENUE, Metric.PATIENTS_WITH_SUBACCOUNTS, Metric.PATIENTS_WITHOUT_SUBACCOUNTS)
+        users_by_role = {item['dimension']: int(item['total']) for item in rollup_totals_by_dimension(Metric.USERS)}
+        state_trend = rollup_totals_by_dimension(Metric.USERS_BY_STATE, start_date, end_date)
 
-        user_trend = (
-            User.objects.filter(role__in=[User.Role.HOSPITAL, User.Role.PATIENT], is_active=True)
-            .filter(date_filter)
-            .annotate(month=TruncMonth('created_at'))
-            .values('month')
-            .annotate(value=Count('id'))
-            .order_by('month')
-        )
-        
-        state_trend = (
-            User.objects.filter(date_filter, is_active=True, role__in=[User.Role.HOSPITAL, User.Role.PATIENT])
-            .annotate(
-                user_state=Coalesce(
-                    F('patient_profile__state'), 
-                    F('hospital_profile__state'),
-                    Value('Unknown')
-                )
-            )
-            .values('user_state')
-            .annotate(total=Count('id'))
-            .order_by('-total')
-        )
-        
-        subscription_trend = (
-            Subscription.objects
-            .filter(date_filter, status=Subscription.SubscriptionStatus.ACTIVE)
-            .annotate(month=TruncMonth('created_at'))
-            .values('month')
-            .annotate(value=Count('id'))
-            .order_by('month')
-        )
-        
         response_data = {
             "summary": {
-                "total_users": summary_metrics['total_users'],
-                "total_revenue": summary_metrics['total_revenue'] or 0,
-                "total_hospitals": summary_metrics['total_hospitals'],
-                "total_individuals": summary_metrics['total_patients'],
-                "total_subscribed_users": summary_metrics['total_subscribed_users'],
+                "total_users": sum(users_by_role.values()),
+                "total_revenue": totals[Metric.REVENUE],
+                "total_hospitals": users_by_role.get(User.Role.HOSPITAL, 0),
+                "total_individuals": users_by_role.get(User.Role.PATIENT, 0),
+                "total_subscribed_users": subscribed_users(),
             },
             
             "charts": {
-                "revenue_overview": self.format_trend(revenue_trend),
-                "registered_users": self.format_trend(user_trend),
-                "subscribed_users": self.format_trend(subscription_trend),
-                "states": [{"state": item['user_state'], "value": item['total']} for item in state_trend],
+                "revenue_overview": self.format_trend(monthly_trend(Metric.REVENUE, start_date, end_date), as_int=False),
+                "registered_users": self.format_trend(monthly_trend(Metric.USERS, start_date, end_date)),
+                "subscribed_users": self.format_trend(subscription_trend(start_date, end_date)),
+                "states": [{"state": item['dimension'], "value": int(item['total'])} for item in state_trend],
                 "sub_account_stats": [
-                    {"label": "With subaccount", "value": summary_metrics['patients_with_sub']},
-                    {"label": "Without subaccount", "value": summary_metrics['patients_without_sub']},
+                    {"label": "With subaccount", "value": int(totals[Metric.PATIENTS_WITH_SUBACCOUNTS])},
+                    {"label": "Without subaccount", "value": int(totals[Metric.PATIENTS_WITHOUT_SUBACCOUNTS])},
                 ]
             }
         }
 
-        return Response(response_data, status=status.HTTP_200_OK)
-
+        return response_data
 
 @extend_schema(tags=["DH Admin"], summary="Get users by role (patient, hospital)")
 class ListUsersView(generics.ListAPIView):
     permission_classes = [IsAuthenticatedDHAdmin]
+    pagination_class = SelectablePagination
     
     def get_serializer(self, *args, **kwargs):
         role = self.kwargs.get("role")
@@ -199,10 +147,11 @@ class DeactivateHospitalView(generics.GenericAPIView):
         
         all_ids_to_deactivate = set(hospital_user_ids + staff_user_ids)
 
-        updated_count = User.objects.filter(
-            id__in=all_ids_to_deactivate, 
-            is_active=True
-        ).update(is_active=False)
+        users = User.objects.filter(id__in=all_ids_to_deactivate, is_active=True)
+        # A bulk update skips the rollup signals, so mark the affected days here
+        mark_stale_days(users.values_list("created_at", flat=True))
+        updated_count = users.update(is_active=False)
+        bump_token_version(all_ids_to_deactivate)
 
         if updated_count == 0:
             return Response(
@@ -248,10 +197,10 @@ class DeactivatePatientsView(generics.GenericAPIView):
         
         all_ids_to_deactivate = set(patient_user_ids + subaccount_user_ids)
 
-        updated_count = User.objects.filter(
-            id__in=all_ids_to_deactivate, 
-            is_active=True
-        ).update(is_active=False)
+        users = User.objects.filter(id__in=all_ids_to_deactivate, is_active=True)
+        mark_stale_days(users.values_list("created_at", flat=True))
+        updated_count = users.update(is_active=False)
+        bump_token_version(all_ids_to_deactivate)
 
         if updated_count == 0:
             return Response(
@@ -296,10 +245,9 @@ class ReactivateHospitalView(generics.GenericAPIView):
         
         all_ids_to_reactivate = set(hospital_user_ids + staff_user_ids)
 
-        updated_count = User.objects.filter(
-            id__in=all_ids_to_reactivate, 
-            is_active=False
-        ).update(is_active=True)
+        users = User.objects.filter(id__in=all_ids_to_reactivate, is_active=False)
+        mark_stale_days(users.values_list("created_at", flat=True))
+        updated_count = users.update(is_active=True)
 
         return Response(
             {
@@ -338,10 +286,9 @@ class ReactivatePatientsView(generics.GenericAPIView):
         
         all_ids_to_reactivate = set(patient_user_ids + subaccount_user_ids)
 
-        updated_count = User.objects.filter(
-            id__in=all_ids_to_reactivate, 
-            is_active=False
-        ).update(is_active=True)
+        users = User.objects.filter(id__in=all_ids_to_reactivate, is_active=False)
+        mark_stale_days(users.values_list("created_at", flat=True))
+        updated_count = users.update(is_active=True)
 
         return Response(
             {
@@ -349,4 +296,24 @@ class ReactivatePatientsView(generics.GenericAPIView):
                 "total_affected": updated_count
             }, 
             status=status.HTTP_200_OK
-        )
\ No newline at end of file
+        )
+
+@extend_schema(tags=["DH Admin"], summary="Per-view database query counts, repeated statements and third-party API calls")
+class QueryStatsReportView(APIView):
+    """
+    What QueryStatsMiddleware and the outbound provider clients have recorded in the worker
+    process that serves the request (each worker keeps its own). DELETE starts a fresh report.
+    """
+    permission_classes = [IsAuthenticatedDHAdmin]
+    
+    @extend_schema(responses={200: QueryStatsReportSerializer})
+    def get(self, request):
+        report = query_report.snapshot()
+        report["providers"] = [{"provider": name, **metrics} for name, metrics in sorted(provider_metrics().items())]
+        return Response(QueryStatsReportSerializer(report).data, status=status.HTTP_200_OK)
+    
+    @extend_schema(responses={204: None})
+    def delete(self, request):
+        query_report.reset()
+        reset_provider_metrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
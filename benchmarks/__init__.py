@@ -0,0 +1,4 @@
+"""
+Endpoint benchmarks: seeds a scale dataset into a dedicated database and times the hot
+endpoints through the Django test client. Run `python -m benchmarks --help`.
+"""
@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Seeds a scale dataset and reports latency percentiles and query counts for the hot endpoints as JSON.",
+    )
+    parser.add_argument("--scale", default="small", help="Dataset size: small, medium or large")
+    parser.add_argument("--seed", type=int, default=0, help="Same scale and seed, same dataset")
+    parser.add_argument("--hospitals", type=int, help="Override the scale's hospital count")
+    parser.add_argument("--patients", type=int, help="Override the scale's patients per hospital")
+    parser.add_argument("--reuse", action="store_true", help="Benchmark the dataset already in the database instead of reseeding")
+    parser.add_argument("--iterations", type=int, default=30, help="Timed calls per scenario")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed calls per scenario first")
+    parser.add_argument("--only", action="append", default=[], help="Run scenarios whose name starts with this (repeatable)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="A previous report to compare against")
+    parser.add_argument("--max-regression", type=float, help="With --compare, exit 1 if any p50 is slower by more than this percent")
+    return parser.parse_args()
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+    from django.utils import timezone
+
+    from .dataset import SCALES, seed, load_personas
+    from .runner import run, compare
+    from .scenarios import SCENARIOS
+
+    if args.scale not in SCALES:
+        sys.exit(f"Unknown scale {args.scale!r}; choose from {', '.join(SCALES)}")
+    scale = dict(SCALES[args.scale])
+    if args.hospitals:
+        scale["hospitals"] = args.hospitals
+    if args.patients:
+        scale["patients"] = args.patients
+
+    call_command("migrate", interactive=False, verbosity=0)
+    if args.reuse:
+        personas = load_personas()
+    else:
+        call_command("flush", interactive=False, verbosity=0)
+        print(f"Seeding {args.scale} dataset (seed {args.seed}) on {connection.vendor}...", file=sys.stderr)
+        personas = seed(scale, args.seed)
+
+    scenarios = [scenario for scenario in SCENARIOS if not args.only or scenario.name.startswith(tuple(args.only))]
+
+    def progress(name, result):
+        latency = result["latency_ms"]
+        print(f"  {name:<36} p50 {latency['p50']:>9.2f} ms  p95 {latency['p95']:>9.2f} ms  {result['queries']['median']:>4} queries  {result['status_codes']}", file=sys.stderr)
+
+    started_at = timezone.now()
+    results = run(scenarios, personas, args.iterations, args.warmup, on_result=progress)
+
+    report = {
+        "meta": {
+            "started_at": started_at.isoformat(),
+            "commit": git_commit(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "scale": args.scale,
+            "dataset": scale,
+            "seed": args.seed,
+            "reused_dataset": args.reuse,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        print(f"\nAgainst {args.compare} ({baseline['meta'].get('commit')}):", file=sys.stderr)
+        regressed = []
+        for name, p50_old, p50_new, p50_change, p95_old, p95_new, p95_change, queries_old, queries_new in compare(baseline, report):
+            print(
+                f"  {name:<36} p50 {p50_old:>9.2f} -> {p50_new:>9.2f} ms ({p50_change:+.1f}%)  "
+                f"p95 {p95_old:>9.2f} -> {p95_new:>9.2f} ms ({p95_change:+.1f}%)  queries {queries_old} -> {queries_new}",
+                file=sys.stderr,
+            )
+            if args.max_regression is not None and p50_change is not None and p50_change > args.max_regression:
+                regressed.append(name)
+
+        if regressed:
+            sys.exit(f"p50 regressed by more than {args.max_regression}%: {', '.join(regressed)}")
+
+if __name__ == "__main__":
+    main()
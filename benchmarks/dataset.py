@@ -0,0 +1,79 @@
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from accounts.models import User, PatientProfile, HospitalStaffProfile
+from admin.scale_data import generate, hospital_email, staff_email, patient_email
+from facility.models import HospitalWard
+from organizations.models import HospitalProfile, PharmacyPartner, PharmacyProfile, Client
+
+# Every seeded account shares this password, hashed once, so `auth.login` can sign in as any of them
+PASSWORD = "bench-password"
+CLIENT_SECRET = "dh_sk_bench-client-secret"
+EMAIL_DOMAIN = "bench.docuhealth.local"
+# Namespaces the generated hospitals, staff and patients (see admin.scale_data)
+TAG = "bench"
+BATCH_SIZE = 1000
+
+# Per hospital, except `hospitals`
+SCALES = {
+    "small": {"hospitals": 2, "wards": 3, "beds_per_ward": 10, "doctors": 5, "nurses": 6, "receptionists": 2, "patients": 200, "soap_notes_per_patient": 3, "appointments_per_patient": 2},
+    "medium": {"hospitals": 5, "wards": 6, "beds_per_ward": 20, "doctors": 20, "nurses": 30, "receptionists": 5, "patients": 2000, "soap_notes_per_patient": 4, "appointments_per_patient": 3},
+    "large": {"hospitals": 10, "wards": 10, "beds_per_ward": 30, "doctors": 50, "nurses": 80, "receptionists": 10, "patients": 10000, "soap_notes_per_patient": 5, "appointments_per_patient": 4},
+}
+
+def seed(scale, seed=0):
+    """
+    Creates the scale's dataset with the scale data generator and returns the personas the
+    scenarios act as. A (scale, seed) pair always produces the same records.
+    """
+    password = make_password(PASSWORD)
+    with transaction.atomic():
+        pharmacy = seed_platform(password)
+    generate(scale, seed=seed, batch_size=BATCH_SIZE, tag=TAG, password=password, pharmacy_id=pharmacy.id)
+    return load_personas()
+
+def load_personas():
+    """The accounts the scenarios act as, found by their seeded emails: everyone at the first hospital."""
+    hospital = HospitalProfile.objects.select_related("user").get(user__email=hospital_email(TAG, 0))
+    emails = {role: staff_email(TAG, 0, role, 0) for role in HospitalStaffProfile.StaffRole.values}
+    emails.update(dhadmin=f"dhadmin@{EMAIL_DOMAIN}", patient=patient_email(TAG, 0, 0))
+    users = User.objects.in_bulk(emails.values(), field_name="email")
+    patient = users[emails["patient"]]
+    client = Client.objects.get(user__email=f"partner@{EMAIL_DOMAIN}")
+
+    return {
+        "dhadmin": users[emails["dhadmin"]],
+        "hospital_admin": hospital.user,
+        "doctor": users[emails["doctor"]],
+        "nurse": users[emails["nurse"]],
+        "receptionist": users[emails["receptionist"]],
+        "patient": patient,
+        "patient_hin": PatientProfile.objects.values_list("hin", flat=True).get(user=patient),
+        "ward_id": HospitalWard.objects.filter(hospital=hospital).order_by("id").values_list("id", flat=True).first(),
+        "client": {
+            "id": str(client.client_id),
+            "secret": CLIENT_SECRET,
+            "pharm_code": PharmacyProfile.objects.values_list("pharm_code", flat=True).get(user__email=f"pharmacy@{EMAIL_DOMAIN}"),
+        },
+    }
+
+def account(email, role, password):
+    # bulk_create skips UserManager.create(), which would hash the password again
+    return User.objects.bulk_create([User(email=email, password=password, role=role, is_active=True, is_verified=True)])[0]
+
+def seed_platform(password):
+    account(f"dhadmin@{EMAIL_DOMAIN}", User.Role.DHADMIN, password)
+
+    partner_user = account(f"partner@{EMAIL_DOMAIN}", User.Role.PHARMACY_PARTNER, password)
+    partner = PharmacyPartner.objects.create(user=partner_user, name="Bench Partner", address="1 Bench Road", phone="08000000000")
+    client = Client(user=partner_user)
+    client.set_secret(CLIENT_SECRET)
+    client.save()
+
+    pharmacy = PharmacyProfile.objects.create(
+        partner=partner, user=account(f"pharmacy@{EMAIL_DOMAIN}", User.Role.PHARMACY, password),
+        name="Bench Pharmacy", license_no="BENCH-0001", phone="08000000000",
+        status=PharmacyProfile.Status.APPROVED,
+    )
+
+    return pharmacy
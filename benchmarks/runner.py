@@ -0,0 +1,95 @@
+import json
+import statistics
+import time
+from collections import Counter
+
+from django.test import Client
+
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+PERCENTILES = (50, 90, 95, 99)
+
+def auth_headers(scenario, personas, tokens):
+    if scenario.auth is None:
+        return {}
+    if scenario.auth == "client":
+        return {"HTTP_X_CLIENT_ID": personas["client"]["id"], "HTTP_X_CLIENT_SECRET": personas["client"]["secret"]}
+
+    if scenario.auth not in tokens:
+        # Issued the way LoginView issues them, claims included, so read views take the claims path
+        tokens[scenario.auth] = str(CustomTokenObtainPairSerializer.get_token(personas[scenario.auth]).access_token)
+    return {"HTTP_AUTHORIZATION": f"Bearer {tokens[scenario.auth]}"}
+
+def call(client, scenario, path, body, headers):
+    if scenario.prepare:
+        scenario.prepare()
+
+    start = time.perf_counter()
+    response = client.generic(
+        scenario.method, path, data=json.dumps(body) if body is not None else "", content_type="application/json", **headers
+    )
+    elapsed = time.perf_counter() - start
+    # Streaming responses are read out, so their rows count too
+    if response.streaming:
+        b"".join(response.streaming_content)
+        elapsed = time.perf_counter() - start
+    return response, elapsed
+
+def percentile_summary(samples):
+    cuts = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {f"p{p}": round(cuts[p - 1], 3) for p in PERCENTILES}
+
+def run_scenario(client, scenario, personas, tokens, iterations, warmup):
+    path = scenario.path.format(**personas)
+    headers = auth_headers(scenario, personas, tokens)
+
+    for _ in range(warmup):
+        call(client, scenario, path, scenario.body(personas) if scenario.body else None, headers)
+
+    latencies, queries, db_times, statuses = [], [], [], Counter()
+    for _ in range(iterations):
+        response, elapsed = call(client, scenario, path, scenario.body(personas) if scenario.body else None, headers)
+        latencies.append(elapsed * 1000)
+        queries.append(int(response.get("X-DB-Query-Count", 0)))
+        db_times.append(float(response.get("X-DB-Time-Ms", 0)))
+        statuses[response.status_code] += 1
+
+    return {
+        "method": scenario.method,
+        "path": scenario.path,
+        "iterations": iterations,
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "latency_ms": {
+            **percentile_summary(latencies),
+            "mean": round(statistics.fmean(latencies), 3),
+            "min": round(min(latencies), 3),
+            "max": round(max(latencies), 3),
+        },
+        "queries": {"median": statistics.median(queries), "max": max(queries)},
+        "db_time_ms": {"median": round(statistics.median(db_times), 3), "max": round(max(db_times), 3)},
+    }
+
+def run(scenarios, personas, iterations, warmup, on_result=None):
+    client = Client()
+    tokens = {}
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = run_scenario(client, scenario, personas, tokens, iterations, warmup)
+        if on_result:
+            on_result(scenario.name, results[scenario.name])
+    return results
+
+def compare(baseline, current):
+    """Rows of (scenario, p50 before/after/change %, p95 before/after/change %, queries before/after)."""
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        row = [name]
+        for key in ("p50", "p95"):
+            old, new = before["latency_ms"][key], result["latency_ms"][key]
+            row += [old, new, round((new - old) / old * 100, 1) if old else None]
+        row += [before["queries"]["median"], result["queries"]["median"]]
+        rows.append(row)
+    return rows
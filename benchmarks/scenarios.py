@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .dataset import PASSWORD
+
+class Scenario:
+    """
+    One endpoint call. `path` is formatted with the personas (e.g. {patient_hin}); `auth` names
+    the persona whose access token is sent, "client" for pharmacy client headers, or None.
+    """
+
+    def __init__(self, name, method, path, auth=None, body=None, prepare=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.auth = auth
+        self.body = body
+        self.prepare = prepare
+
+def login_body(personas):
+    return {"email": personas["patient"].email, "password": PASSWORD}
+
+def pharmacy_upload_body(personas):
+    return {
+        "pharm_code": personas["client"]["pharm_code"],
+        "patient": personas["patient_hin"],
+        "name": "Paracetamol",
+        "route": "oral",
+        "quantity": 10,
+        "frequency": {"value": 2, "rate": "daily"},
+        "duration": {"value": 5, "rate": "days"},
+        "allergies": [],
+    }
+
+def uncache_admin_dashboard():
+    # The dashboard caches its response; time the build, not the cache hit
+    today = timezone.localdate()
+    cache.delete(f"admin-dashboard:{today - timedelta(days=365)}:{today}")
+
+SCENARIOS = [
+    Scenario("auth.login", "POST", "/api/auth/login", body=login_body),
+
+    Scenario("patient.dashboard", "GET", "/api/patients/dashboard", auth="patient"),
+    Scenario("doctor.dashboard", "GET", "/api/doctors/dashboard", auth="doctor"),
+    Scenario("nurse.dashboard", "GET", "/api/nurses/dashboard", auth="nurse"),
+    Scenario("receptionist.dashboard", "GET", "/api/receptionists/dashboard", auth="receptionist"),
+    Scenario("admin.dashboard", "GET", "/api/admin/dashboard", auth="dhadmin", prepare=uncache_admin_dashboard),
+
+    Scenario("hospital.appointments", "GET", "/api/hospitals/appointments", auth="hospital_admin"),
+    Scenario("doctor.appointments.upcoming", "GET", "/api/doctors/appointments/upcoming", auth="doctor"),
+    Scenario("receptionist.appointments.upcoming", "GET", "/api/receptionists/appointments/upcoming", auth="receptionist"),
+    Scenario("patient.appointments", "GET", "/api/patients/appointments", auth="patient"),
+
+    Scenario("patient.medical_records", "GET", "/api/medical-records/user-records", auth="patient"),
+    Scenario("hospital.medical_records", "GET", "/api/medical-records/user-records", auth="hospital_admin"),
+    Scenario("doctor.patient_records", "GET", "/api/doctors/patient/records/{patient_hin}", auth="doctor"),
+    Scenario("doctor.soap_notes", "GET", "/api/medical-records/soap-note/{patient_hin}", auth="doctor"),
+    Scenario("doctor.timeline", "GET", "/api/medical-records/timeline/{patient_hin}", auth="doctor"),
+
+    Scenario("hospital.wards", "GET", "/api/hospitals/wards", auth="hospital_admin"),
+    Scenario("hospital.ward_beds", "GET", "/api/hospitals/wards/{ward_id}/beds", auth="hospital_admin"),
+
+    Scenario("pharmacy.upload", "POST", "/api/pharmacy/drug-records/upload", auth="client", body=pharmacy_upload_body),
+]
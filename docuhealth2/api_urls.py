@@ -1,17 +1,23 @@
-from django.urls import path
+from django.urls import path, register_converter
 
-from accounts.views import DeactivateTeamMembersView, LoginView, CustomTokenRefreshView, ForgotPassword, VerifyForgotPasswordOTPView, ResetPasswordView, ListUserView, VerifySignupOTPView, UpdatePasswordView, VerifyUserNINView, DoctorDashboardView, TeamMemberCreateView, TeamMemberListView, RemoveTeamMembersView, TeamMemberUpdateRoleView, PatientDashboardView, CreatePatientView, UpdatePatientView, DeletePatientAccountView, ListCreateSubaccountView, UpgradeSubaccountView, ToggleEmergencyView, GeneratePatientIdCard, GenerateSubaccountIdCard, NurseDashboardView, ReceptionistDashboardView, GetPatientDetailsView, GetStaffByRoleView, ReceptionistCreatePatientView, SendEmailOTPView, VerifyEmailOTPView, UpdateProfileView, UpdateHospitalAdminProfileView, RemoveHospitalBrandingView, ResendOTPView
+from docuhealth2.utils.hin import HINConverter
 
-from records.views import MedicalRecordListView, ListUserMedicalrecordsView, RequestVitalSignsView, RetrievePatientInfoView, ListPatientMedicalRecordsView, RequestAdmissionView, ConfirmAdmissionView, ListAdmittedPatientsByStatusView, ListSubaccountMedicalRecordsView, ListAdmissionsView, ListAdmissionRequestsView, ListVitalSignsRequest, ProcessVitalSignsRequestView, UpdatePatientVitalSignsView, CreateCaseNotesView, ListCaseNotesView, ListPatientDrugRecordsView, CreateSoapNoteView, ListPatientSoapNotesView, DischargePatientView, ListPatientDischargeFormsView, CreateSoapNoteAdditionalNotesView, ListPatientVitalSignsView
+from accounts.views import DeactivateTeamMembersView, LoginView, CustomTokenRefreshView, ForgotPassword, VerifyForgotPasswordOTPView, ResetPasswordView, ListUserView, VerifySignupOTPView, UpdatePasswordView, VerifyUserNINView, DoctorDashboardView, TeamMemberCreateView, BulkTeamMemberCreateView, TeamMemberListView, RemoveTeamMembersView, TeamMemberUpdateRoleView, PatientDashboardView, CreatePatientView, UpdatePatientView, DeletePatientAccountView, ListCreateSubaccountView, UpgradeSubaccountView, ToggleEmergencyView, GeneratePatientIdCard, GenerateSubaccountIdCard, NurseDashboardView, ReceptionistDashboardView, GetPatientDetailsView, SearchPatientsView, GetStaffByRoleView, ReceptionistCreatePatientView, ListCreatePatientImportView, RetrievePatientImportView, ListPatientImportErrorsView, SendEmailOTPView, VerifyEmailOTPView, UpdateProfileView, UpdateHospitalAdminProfileView, RemoveHospitalBrandingView, ResendOTPView
+
+from records.views import MedicalRecordListView, ListUserMedicalrecordsView, RequestVitalSignsView, RetrievePatientInfoView, ListPatientMedicalRecordsView, RequestAdmissionView, ConfirmAdmissionView, ListAdmittedPatientsByStatusView, ListSubaccountMedicalRecordsView, ListAdmissionsView, ListAdmissionRequestsView, ListVitalSignsRequest, ProcessVitalSignsRequestView, UpdatePatientVitalSignsView, CreateCaseNotesView, ListCaseNotesView, ListPatientDrugRecordsView, CreateSoapNoteView, ListPatientSoapNotesView, DischargePatientView, ListPatientDischargeFormsView, CreateSoapNoteAdditionalNotesView, PatientTimelineView, ExportPatientRecordsView, ExportPatientChartView, ListPatientVitalSignsView, AttachmentUploadStatusView
 
 from hospital_ops.views import ListAllAppointmentsView, AssignAppointmentToDoctorView, HandOverNurseShiftView, ListPatientAppointmentsView, BookAppointmentView, ListUpcomingAppointmentsView, ListRecentPatientsView, TransferPatientToWardView, ListStaffUpcomingAppointmentsView, ListStaffAppointmentHistoryView
 
 from organizations.views import CreateHospitalView, ListHospitalsView, ListCreateHospitalInquiryView, ListCreateHospitalVerificationRequestView, ApproveVerificationRequestView,  GetHospitalInfo, ListCreateSubscriptionPlanView, CreateSubscriptionView, ListSubscriptionPlansByRoleView
 
+from records.models import SoapNote, DischargeForm
+
 from organizations.webhooks import PaystackWebhookView
 
 from facility.views import ListCreateWardsView, RetrieveUpdateDeleteWardView, ListBedsByWardView
 
+register_converter(HINConverter, 'hin')
+
 auth_urls = [
     path('signup/verify-otp', VerifySignupOTPView.as_view(), name='verify-signup-otp'),
     path('login', LoginView.as_view(), name='user-login'),
@@ -38,10 +44,14 @@ medical_records_urls = [
     path('/all', MedicalRecordListView.as_view(), name='get-medical-records'),
     
     path('/discharge', DischargePatientView.as_view(), name='discharge-patient'),
-    path('/discharge-form/<str:hin>', ListPatientDischargeFormsView.as_view(), name='list-patient-discharge-forms'),
+    path('/discharge-form/<hin:hin>', ListPatientDischargeFormsView.as_view(), name='list-patient-discharge-forms'),
     path('/soap-note/additional-notes', CreateSoapNoteAdditionalNotesView.as_view(), name='create-soap-note-additional-notes'),
     
-    path('/soap-note/<str:hin>', ListPatientSoapNotesView.as_view(), name='list-patient-soap-notes'),
+    path('/discharge-form/<int:pk>/attachments', AttachmentUploadStatusView.as_view(model=DischargeForm), name='discharge-form-attachments-status'),
+    path('/soap-note/<int:pk>/attachments', AttachmentUploadStatusView.as_view(model=SoapNote), name='soap-note-attachments-status'),
+    path('/soap-note/<hin:hin>', ListPatientSoapNotesView.as_view(), name='list-patient-soap-notes'),
+    path('/timeline/<hin:hin>', PatientTimelineView.as_view(), name='patient-timeline'),
+    path('/export/<hin:hin>', ExportPatientChartView.as_view(), name='export-patient-chart'),
     path('/soap-note', CreateSoapNoteView.as_view(), name='create-soap-note'),
 ]
 
@@ -53,8 +63,8 @@ doctor_urls = [
     path('/appointments/upcoming', ListStaffUpcomingAppointmentsView.as_view(), name='appointments'),
     path('/appointments/history', ListStaffAppointmentHistoryView.as_view(), name='appointments'),
     
-    path('/patient/info/<str:hin>', RetrievePatientInfoView.as_view(), name='retrieve-patient-info'),
-    path('/patient/records/<str:hin>', ListPatientMedicalRecordsView.as_view(), name='list-patient-medical-records'),
+    path('/patient/info/<hin:hin>', RetrievePatientInfoView.as_view(), name='retrieve-patient-info'),
+    path('/patient/records/<hin:hin>', ListPatientMedicalRecordsView.as_view(), name='list-patient-medical-records'),
     
     path('/admissions/request', RequestAdmissionView.as_view(), name='request-admission'),
     path('/admissions/<str:admission_id>/confirm', ConfirmAdmissionView.as_view(), name='admission-requests'),
@@ -73,11 +83,16 @@ hospital_urls = [
     path('/remove-branding', RemoveHospitalBrandingView.as_view(), name='remove-branding'),
     
     path('/team-member', TeamMemberCreateView.as_view(), name='create-team-member'),
+    path('/team-members/bulk', BulkTeamMemberCreateView.as_view(), name='bulk-create-team-members'),
     path('/team-members', TeamMemberListView.as_view(), name='list-team-member'),
     path('/team-members/remove', RemoveTeamMembersView.as_view(), name='remove-team-member'),
     path('/team-members/deactivate', DeactivateTeamMembersView.as_view(), name='deactivate-team-member'),
     path('/team-member/<str:staff_id>/update-role', TeamMemberUpdateRoleView.as_view(), name='update-team-member-role'),
     
+    path('/patients/import', ListCreatePatientImportView.as_view(), name='list-create-patient-imports'),
+    path('/patients/import/<int:pk>', RetrievePatientImportView.as_view(), name='retrieve-patient-import'),
+    path('/patients/import/<int:pk>/errors', ListPatientImportErrorsView.as_view(), name='list-patient-import-errors'),
+    
     path('/appointments', ListAllAppointmentsView.as_view(), name='get-appointments'),
     path('/info', GetHospitalInfo.as_view(), name='get-hospital-info'),
     
@@ -97,7 +112,7 @@ nurse_urls = [
     path('/admissions', ListAdmissionsView.as_view(), name='admissions'),
     path('/admissions/requests', ListAdmissionRequestsView.as_view(), name='admission-requests'),
     
-    path('/<str:patient_hin>/vital-signs', ListPatientVitalSignsView.as_view(), name='lsit-patient-vital-signs'),
+    path('/<hin:patient_hin>/vital-signs', ListPatientVitalSignsView.as_view(), name='lsit-patient-vital-signs'),
     path('/vital-signs/requests', ListVitalSignsRequest.as_view(), name='list-vital-signs-requests'),
     path('/vital-signs/process', ProcessVitalSignsRequestView.as_view(), name='process-vital-signs-requests'),
     path('/vital-signs/update', UpdatePatientVitalSignsView.as_view(), name='update-patient-vital-signs'),
@@ -109,7 +124,7 @@ nurse_urls = [
     path('/handover', HandOverNurseShiftView.as_view(), name='handover-nurse-shift'),
     
     path('/case-notes', CreateCaseNotesView.as_view(), name='create-case-notes'),
-    path('/case-notes/patient/<str:hin>', ListCaseNotesView.as_view(), name='list-case-notes-by-patient'),
+    path('/case-notes/patient/<hin:hin>', ListCaseNotesView.as_view(), name='list-case-notes-by-patient'),
     # path('/case-notes/<int:pk>', RetrieveCaseNoteView.as_view(), name='retrieve-case-note'),   
 ]
 
@@ -119,21 +134,26 @@ patient_urls = [
     path('/update', UpdatePatientView.as_view(), name='update-patient'),
     path('/delete', DeletePatientAccountView.as_view(), name='delete-patient'),
     path('/subaccounts', ListCreateSubaccountView.as_view(), name='create-subaccount'),
-    path('/subaccounts/medical-records/<str:hin>', ListSubaccountMedicalRecordsView.as_view(), name='get-subaccount-medical-records'),
+    path('/subaccounts/medical-records/<hin:hin>', ListSubaccountMedicalRecordsView.as_view(), name='get-subaccount-medical-records'),
     path('/subaccounts/upgrade', UpgradeSubaccountView.as_view(), name='upgrade-subaccount'),
     path('/appointments', ListPatientAppointmentsView.as_view(), name='get-appointments'),
     path('/drug-records', ListPatientDrugRecordsView.as_view(), name='get-drug-records'),
+    path('/records/export', ExportPatientRecordsView.as_view(), name='export-patient-records'),
     path('/emergency', ToggleEmergencyView.as_view(), name='toggle-emergency'),
     path('/id-card', GeneratePatientIdCard.as_view(), name='generate-patient-id-card'),
-    path('/subaccounts/id-card/<str:hin>', GenerateSubaccountIdCard.as_view(), name='generate-subaccount-id-card'),
+    path('/subaccounts/id-card/<hin:hin>', GenerateSubaccountIdCard.as_view(), name='generate-subaccount-id-card'),
 ]
 
 receptionist_urls = [
     path('/dashboard', ReceptionistDashboardView.as_view(), name='receptionist-dashboard'),
     
     path('/patient/register', ReceptionistCreatePatientView.as_view(), name='create-patient'),
-    path('/patient/<str:hin>', GetPatientDetailsView.as_view(), name='get-patient-details'),
+    path('/patient/<hin:hin>', GetPatientDetailsView.as_view(), name='get-patient-details'),
     path('/patients/recent', ListRecentPatientsView.as_view(), name='recent-patients'),
+    path('/patients/search', SearchPatientsView.as_view(), name='search-patients'),
+    path('/patients/import', ListCreatePatientImportView.as_view(), name='list-create-patient-imports'),
+    path('/patients/import/<int:pk>', RetrievePatientImportView.as_view(), name='retrieve-patient-import'),
+    path('/patients/import/<int:pk>/errors', ListPatientImportErrorsView.as_view(), name='list-patient-import-errors'),
     
     path('/staff/<str:role>', GetStaffByRoleView.as_view(), name='get-staff-by-role'),
     
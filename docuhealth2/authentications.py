@@ -1,8 +1,119 @@
+import hashlib
+import hmac
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
 from rest_framework.authentication import BaseAuthentication
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
 from django.contrib.auth.hashers import check_password
 from organizations.models import Client
 from accounts.models import User
+from accounts.tokens import current_token_version
+
+from .tenancy import tenant_users, attach_tenant, principal_from_claims
+
+def normalize_client_id(client_id):
+    """Canonical text form of a client ID, so lookups and invalidation agree on the key. None if malformed."""
+    try:
+        return str(uuid.UUID(str(client_id)))
+    except ValueError:
+        return None
+
+def client_fingerprint_cache_key(client_id):
+    return f"auth:client-secret:{client_id}"
+
+def client_fingerprint(client):
+    """Changes whenever the client's secret is rotated."""
+    return hashlib.sha256(client.client_secret_hash.encode()).hexdigest()
+
+class VerifiedClientCache:
+    """
+    Bounded, TTL-evicted LRU of client secrets that recently passed check_password.
+
+    Only a sha256 digest of the secret is kept, never the raw value. Each entry also
+    remembers the fingerprint of the secret hash it was verified against, and a hit is
+    only trusted while the shared Django cache still holds that fingerprint. Saving or
+    deleting the Client (key rotation, deactivation) drops the shared fingerprint, so
+    every worker process stops accepting the old secret on its next request.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(secret):
+        return hashlib.sha256(secret.encode()).digest()
+
+    def get(self, client_id, secret_digest):
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is None:
+                return None
+
+            cached_digest, client, fingerprint, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[client_id]
+                return None
+
+            self._entries.move_to_end(client_id)
+
+        if not hmac.compare_digest(cached_digest, secret_digest):
+            return None
+
+        if cache.get(client_fingerprint_cache_key(client_id)) != fingerprint:
+            with self._lock:
+                self._entries.pop(client_id, None)
+            return None
+        return client
+
+    def set(self, client_id, secret_digest, client):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+
+        fingerprint = client_fingerprint(client)
+        cache.set(client_fingerprint_cache_key(client_id), fingerprint, self.ttl)
+
+        with self._lock:
+            self._entries[client_id] = (secret_digest, client, fingerprint, time.monotonic() + self.ttl)
+            self._entries.move_to_end(client_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, client_id):
+        client_id = normalize_client_id(client_id)
+        if client_id is None:
+            return
+
+        with self._lock:
+            self._entries.pop(client_id, None)
+
+        key = client_fingerprint_cache_key(client_id)
+        # Drop now and again after commit, so a reader that cached the old row in between is evicted
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+verified_client_cache = VerifiedClientCache(
+    ttl=getattr(settings, "CLIENT_AUTH_CACHE_TTL", 60),
+    max_size=getattr(settings, "CLIENT_AUTH_CACHE_SIZE", 1024),
+)
 
 class ClientHeaderAuthentication(BaseAuthentication):
     def authenticate(self, request):
@@ -12,6 +123,15 @@ class ClientHeaderAuthentication(BaseAuthentication):
         if not client_id or not client_secret:
             return None 
 
+        client_id = normalize_client_id(client_id)
+        if client_id is None:
+            raise exceptions.AuthenticationFailed('Invalid Credentials')
+
+        secret_digest = verified_client_cache.digest(client_secret)
+        client = verified_client_cache.get(client_id, secret_digest)
+        if client is not None:
+            return (client.user, client)
+
         try:
             client = Client.objects.select_related('user').get(client_id=client_id, is_active=True)
         except Client.DoesNotExist:
@@ -23,4 +143,79 @@ class ClientHeaderAuthentication(BaseAuthentication):
         if client.user.role != User.Role.PHARMACY_PARTNER:
              raise exceptions.AuthenticationFailed('Not a Partner account')
 
-        return (client.user, client)
\ No newline at end of file
+        verified_client_cache.set(client_id, secret_digest, client)
+        return (client.user, client)
+
+class TenantJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads the user together with their hospital, staff profile,
+    ward and patient profile in one joined query, and attaches the tenant context as
+    request.hospital / request.staff for permissions and views.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            attach_tenant(request, result[0])
+        return result
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = tenant_users().get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+class ClaimsJWTAuthentication(TenantJWTAuthentication):
+    """
+    Skips the user query for read requests to views that set `authenticate_from_claims = True`:
+    request.user, request.hospital and request.staff are built from the access token's
+    claims. Writes, other views, tokens without claims and tokens whose `tv` no longer
+    matches the user's token version take the TenantJWTAuthentication path.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        if self.can_trust_claims(request, validated_token):
+            user = principal_from_claims(validated_token)
+        else:
+            user = self.get_user(validated_token)
+
+        attach_tenant(request, user)
+        return user, validated_token
+
+    def can_trust_claims(self, request, validated_token):
+        if request.method not in SAFE_METHODS:
+            return False
+
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        if not getattr(view, "authenticate_from_claims", False):
+            return False
+
+        if "tv" not in validated_token or "role" not in validated_token:
+            return False
+
+        version = current_token_version(validated_token[api_settings.USER_ID_CLAIM])
+        return version is not None and version == validated_token["tv"]
@@ -0,0 +1,230 @@
+import base64
+import heapq
+import json
+from collections import OrderedDict
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    page_size_query_param = 'size'
+    max_page_size = 100
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Newest-first pages keyed on (created_at, id). The `next` link carries the last row's
+    key, so page 1,000 costs the same index range scan as page 1 and no COUNT(*) is run.
+    Forward-only: there is no `previous` link and no total `count`.
+    """
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    page_size_query_param = 'size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by('-created_at', '-id')
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            # The redundant `created_at <= t` gives the planner a range to seek to in the
+            # (..., created_at, id) index; the OR alone is not sargable on every backend.
+            queryset = queryset.filter(
+                Q(created_at__lte=created_at),
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            created_at = parse_datetime(position["t"])
+            pk = int(position["i"])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+    def encode_cursor(self, row):
+        position = json.dumps({"t": row.created_at.isoformat(), "i": row.pk}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(position.encode("ascii")).decode("ascii").rstrip("=")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor taken from the previous page\'s `next` link.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+class MergedKeysetPagination(KeysetPagination):
+    """
+    KeysetPagination over several querysets at once, e.g. the record types of a patient's
+    timeline. Each source is read with its own keyset range scan, at most one page deep, and
+    the results are k-way merged newest first on (created_at, source, id). Pass a mapping of
+    source name to a `.values()` queryset that includes `id` and `created_at`; each page row
+    is that dict plus `source`. The cursor carries the source name so ties across tables
+    still resume exactly.
+    """
+
+    def paginate_querysets(self, querysets, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        streams = []
+        for source, queryset in sorted(querysets.items()):
+            queryset = queryset.order_by('-created_at', '-id')
+            if position is not None:
+                queryset = self.filter_after(queryset, source, *position)
+            streams.append([{**row, 'source': source} for row in queryset[:self.page_size + 1]])
+
+        merged = heapq.merge(*streams, key=self.sort_key, reverse=True)
+        rows = list(islice(merged, self.page_size + 1))
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    @staticmethod
+    def sort_key(row):
+        return row['created_at'], row['source'], row['id']
+
+    @staticmethod
+    def filter_after(queryset, source, created_at, cursor_source, pk):
+        # Rows with the cursor's timestamp come after it only in sources that sort below it
+        if source < cursor_source:
+            return queryset.filter(created_at__lte=created_at)
+        if source > cursor_source:
+            return queryset.filter(created_at__lt=created_at)
+        return queryset.filter(
+            Q(created_at__lte=created_at),
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            created_at = parse_datetime(position["t"])
+            source = str(position["s"])
+            pk = int(position["i"])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, source, pk
+
+    def encode_cursor(self, row):
+        position = json.dumps({"t": row['created_at'].isoformat(), "s": row['source'], "i": row['id']}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(position.encode("ascii")).decode("ascii").rstrip("=")
+
+class SelectablePagination(pagination.BasePagination):
+    """
+    Page-number pagination unless the view sets `pagination_mode = "cursor"`; a request
+    can override either way with `?pagination=page` or `?pagination=cursor`. Cursor mode
+    requires a model with `created_at` and orders newest first.
+    """
+    mode_query_param = 'pagination'
+    paginators = {
+        'page': PageNumberPagination,
+        'cursor': KeysetPagination,
+    }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        mode = request.query_params.get(self.mode_query_param) or getattr(view, 'pagination_mode', 'page')
+        if mode not in self.paginators:
+            raise NotFound(f"Unknown pagination mode '{mode}'. Use one of: {', '.join(self.paginators)}")
+
+        self.paginator = self.paginators[mode]()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        page_schema = PageNumberPagination().get_paginated_response_schema(schema)
+        page_schema['required'] = ['results']
+        return page_schema
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [{
+            'name': self.mode_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Pagination style: `page` (with count) or `cursor` (constant-time deep pages, no count).',
+            'schema': {'type': 'string', 'enum': list(self.paginators)},
+        }]
+        seen = {parameter['name'] for parameter in parameters}
+        for paginator in self.paginators.values():
+            for parameter in paginator().get_schema_operation_parameters(view):
+                if parameter['name'] not in seen:
+                    seen.add(parameter['name'])
+                    parameters.append(parameter)
+        return parameters
@@ -2,6 +2,8 @@ from rest_framework.permissions import BasePermission
 from accounts.models import User, HospitalStaffProfile
 from organizations.models import Client
 
+from .tenancy import get_tenant
+
 class BaseRolePermission(BasePermission):
     role = None
     require_auth = True  
@@ -29,7 +31,7 @@ class StaffRolePermission(BasePermission):
         if request.user.role != User.Role.HOSPITAL_STAFF:
             return False
         
-        staff_profile = getattr(request.user, "hospital_staff_profile", None)
+        staff_profile = get_tenant(request)[1]
         if not staff_profile:
             return False
         
@@ -37,16 +39,17 @@ class StaffRolePermission(BasePermission):
     
 class StaffSameHospitalPermission(BasePermission):
     def has_object_permission(self, request, view, obj):
-        staff_profile = getattr(request.user, "hospital_staff_profile", None)
+        staff_profile = get_tenant(request)[1]
         if not staff_profile:
             return False
         
-        # Every object we protect **must have a .hospital field**
-        obj_hospital = getattr(obj, "hospital", None)
-        if obj_hospital is None:
+        # Every object we protect **must have a .hospital field**; compare ids so the
+        # object's hospital is never fetched
+        obj_hospital_id = getattr(obj, "hospital_id", None)
+        if obj_hospital_id is None:
             return False
         
-        return obj_hospital == staff_profile.hospital
+        return obj_hospital_id == staff_profile.hospital_id
         
 class IsPatient(BaseRolePermission):
     role = User.Role.PATIENT
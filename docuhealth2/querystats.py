@@ -0,0 +1,157 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+import sentry_sdk
+from sentry_sdk import logger as sentry_logger
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+# Per-request database instrumentation: QueryStatsMiddleware wraps every connection's
+# execute for the length of the request and records how many queries ran, how long they
+# took and which statements repeated (the signature of an N+1). Each request's numbers go
+# to its Sentry transaction, to X-DB-* response headers outside production, and into
+# `report`, which the DH admin query-stats endpoint reads.
+
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACE = re.compile(r"\s+")
+
+def fingerprint(sql):
+    """The statement with IN lists and inline numbers collapsed, so repeats with other parameters match."""
+    return _SPACE.sub(" ", _NUMBER.sub("?", _IN_LIST.sub("(...)", sql))).strip()
+
+class QueryRecorder:
+    """A `connection.execute_wrapper` that counts and times queries on the current thread."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def wrap_connections(self):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+    @property
+    def duplicates(self):
+        """{fingerprint: extra executions} for statements run more than once."""
+        return {sql: count - 1 for sql, count in self.fingerprints.items() if count > 1}
+
+class QueryReport:
+    """Per-view totals since the process started or was last reset. Each worker process keeps its own."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.since = timezone.now()
+
+    def add(self, view, recorder):
+        duplicates = recorder.duplicates
+        with self.lock:
+            stats = self.views.setdefault(view, {
+                "requests": 0, "queries": 0, "max_queries": 0, "db_time": 0.0, "max_db_time": 0.0,
+                "requests_with_duplicates": 0, "duplicates": Counter(),
+            })
+            stats["requests"] += 1
+            stats["queries"] += recorder.count
+            stats["max_queries"] = max(stats["max_queries"], recorder.count)
+            stats["db_time"] += recorder.duration
+            stats["max_db_time"] = max(stats["max_db_time"], recorder.duration)
+            if duplicates:
+                stats["requests_with_duplicates"] += 1
+                stats["duplicates"].update(duplicates)
+                # Keep the worst offenders only, so one chatty view cannot grow the report without bound
+                if len(stats["duplicates"]) > settings.QUERY_STATS_TOP_DUPLICATES * 4:
+                    stats["duplicates"] = Counter(dict(stats["duplicates"].most_common(settings.QUERY_STATS_TOP_DUPLICATES)))
+
+    def snapshot(self):
+        with self.lock:
+            views = [
+                {
+                    "view": view,
+                    "requests": stats["requests"],
+                    "avg_queries": round(stats["queries"] / stats["requests"], 2),
+                    "max_queries": stats["max_queries"],
+                    "avg_db_time_ms": round(stats["db_time"] * 1000 / stats["requests"], 2),
+                    "max_db_time_ms": round(stats["max_db_time"] * 1000, 2),
+                    "requests_with_duplicates": stats["requests_with_duplicates"],
+                    "top_duplicates": [
+                        {"sql": sql, "repeats": repeats}
+                        for sql, repeats in stats["duplicates"].most_common(settings.QUERY_STATS_TOP_DUPLICATES)
+                    ],
+                }
+                for view, stats in self.views.items()
+            ]
+            since = self.since
+
+        views.sort(key=lambda stats: stats["avg_queries"] * stats["requests"], reverse=True)
+        return {"since": since, "views": views}
+
+report = QueryReport()
+
+def view_label(request):
+    match = request.resolver_match
+    view = getattr(match.func, "view_class", match.func)
+    return f"{request.method} /{match.route} ({view.__name__})"
+
+class QueryStatsMiddleware:
+    """
+    Queries a streaming response runs while it is being sent (e.g. chart exports) happen after
+    this returns and are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_STATS_ENABLED:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.wrap_connections():
+            response = self.get_response(request)
+
+        if request.resolver_match is None:
+            return response
+
+        view = view_label(request)
+        report.add(view, recorder)
+
+        repeats = sum(recorder.duplicates.values())
+        span = sentry_sdk.get_current_span()
+        if span is not None:
+            transaction = span.containing_transaction or span
+            transaction.set_data("db.query_count", recorder.count)
+            transaction.set_data("db.time_ms", round(recorder.duration * 1000, 2))
+            transaction.set_data("db.duplicate_queries", repeats)
+
+        if repeats >= settings.QUERY_STATS_DUPLICATE_THRESHOLD:
+            worst, times = max(recorder.fingerprints.items(), key=lambda item: item[1])
+            sentry_logger.warning(f"{view} ran {recorder.count} queries, {repeats} of them repeats; {times}x: {worst[:500]}")
+
+        if settings.QUERY_STATS_HEADERS:
+            response["X-DB-Query-Count"] = recorder.count
+            response["X-DB-Time-Ms"] = f"{recorder.duration * 1000:.2f}"
+            response["X-DB-Duplicate-Queries"] = repeats
+
+        return response
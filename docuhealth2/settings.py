@@ -1,6 +1,7 @@
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 from dotenv import load_dotenv
 import sentry_sdk
 from sentry_sdk.integrations.django import DjangoIntegration
@@ -39,7 +40,8 @@ INSTALLED_APPS = [
     'organizations',
     'hospital_ops',
     'facility',
-    'admin'
+    'admin',
+    'notifications',
 ]
 
 AUTH_USER_MODEL = "accounts.User"
@@ -47,6 +49,7 @@ APPEND_SLASH=False
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware", 
+    'docuhealth2.querystats.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -107,6 +110,22 @@ DATABASES = {
     }
 }
 
+# Shared cache for token versions and dashboards. Without REDIS_URL each worker process
+# keeps its own local-memory cache (and needs the `redis` package when it is set).
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 # if ENVIRONMENT == "development":
 #     DATABASES['default']['OPTIONS']['sslrootcert'] = os.path.join(BASE_DIR, 'root.crt')
 
@@ -140,15 +159,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "docuhealth2.authentications.ClaimsJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly"
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "docuhealth2.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
-    "PAGE_SIZE_QUERY_PARAM": "size",
 }
 
 SIMPLE_JWT = {
@@ -162,6 +180,42 @@ SIMPLE_JWT = {
     "TOKEN_BLACKLIST_ENABLED": True,
 }
 
+# Pharmacy partner API: how long (seconds) a verified client secret is trusted
+# before check_password runs again, and how many clients are kept per process.
+CLIENT_AUTH_CACHE_TTL = int(os.environ.get("CLIENT_AUTH_CACHE_TTL", 60))
+CLIENT_AUTH_CACHE_SIZE = int(os.environ.get("CLIENT_AUTH_CACHE_SIZE", 1024))
+
+# Transactional email is queued in notifications.OutboundEmail and delivered by
+# `manage.py send_queued_emails`. Point EMAIL_TRANSPORT at
+# docuhealth2.utils.email_service.LocalEmailTransport to avoid hitting Brevo locally.
+EMAIL_TRANSPORT = os.environ.get("EMAIL_TRANSPORT", "docuhealth2.utils.email_service.BrevoEmailService")
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 8))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.environ.get("EMAIL_OUTBOX_BACKOFF_SECONDS", 30))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = int(os.environ.get("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", 3600))
+
+# Paystack webhooks are stored in organizations.WebhookEvent and handled by
+# `manage.py process_webhook_events`; a failing event is retried with backoff.
+PAYSTACK_WEBHOOK_MAX_ATTEMPTS = int(os.environ.get("PAYSTACK_WEBHOOK_MAX_ATTEMPTS", 10))
+PAYSTACK_WEBHOOK_BACKOFF_SECONDS = int(os.environ.get("PAYSTACK_WEBHOOK_BACKOFF_SECONDS", 15))
+PAYSTACK_WEBHOOK_MAX_BACKOFF_SECONDS = int(os.environ.get("PAYSTACK_WEBHOOK_MAX_BACKOFF_SECONDS", 3600))
+
+# The admin dashboard reads precomputed rollups (kept current by
+# `manage.py rebuild_dashboard_rollups --loop`) and caches each date range for this many seconds.
+ADMIN_DASHBOARD_CACHE_TTL = int(os.environ.get("ADMIN_DASHBOARD_CACHE_TTL", 60))
+# Each pass of `rebuild_dashboard_rollups` recomputes this many of the most recent days, so
+# changes to rows created within them need no stale-day mark.
+ADMIN_DASHBOARD_RECENT_DAYS = int(os.environ.get("ADMIN_DASHBOARD_RECENT_DAYS", 2))
+
+# How long (seconds) a user's token version is cached. Access tokens whose `tv` claim matches
+# it authenticate without a query on views that opt in; with the local-memory cache a bump
+# reaches other worker processes within this window.
+JWT_TOKEN_VERSION_CACHE_TTL = int(os.environ.get("JWT_TOKEN_VERSION_CACHE_TTL", 60))
+
+# Subscription entitlement (organizations.services.is_entitled): seconds an answer lives in
+# the shared cache, and in each process in front of it. Subscription saves invalidate both.
+ENTITLEMENT_CACHE_TTL = int(os.environ.get("ENTITLEMENT_CACHE_TTL", 300))
+ENTITLEMENT_LOCAL_TTL = int(os.environ.get("ENTITLEMENT_LOCAL_TTL", 5))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Docuhealth API',
     'DESCRIPTION': 'Docuhealth API Documentation',
@@ -209,6 +263,66 @@ DEFAULT_FILE_STORAGE = 'storages.backends.s3.S3Storage'
 SUPABASE_KEY = os.environ.get('SUPABASE_SERVICE_KEY')
 SUPABASE_URL = os.environ.get('SUPABASE_URL')
 SUPABASE_BUCKET_NAME = os.environ.get('SUPABASE_BUCKET_NAME', 'development')
+SUPABASE_UPLOAD_WORKERS = int(os.environ.get('SUPABASE_UPLOAD_WORKERS', 5))
+SUPABASE_UPLOAD_TIMEOUT = int(os.environ.get('SUPABASE_UPLOAD_TIMEOUT', 60))
+# Longest a request waits for an upload worker or a free storage client before giving up
+SUPABASE_UPLOAD_QUEUE_TIMEOUT = int(os.environ.get('SUPABASE_UPLOAD_QUEUE_TIMEOUT', 60))
+
+# Key for the permutation that turns the HIN sequence into HINs (docuhealth2.utils.hin).
+# Changing it after HINs have been issued can produce duplicates: set it once per deployment.
+HIN_PERMUTATION_KEY = os.environ.get('HIN_PERMUTATION_KEY', 'docuhealth-hin-v1')
+
+# Outbound calls to Paystack and Korapay (docuhealth2.utils.http_client): timeouts in seconds,
+# retries for calls that are safe to repeat, and the circuit breaker that fails fast after
+# OUTBOUND_HTTP_FAILURE_THRESHOLD consecutive failures for OUTBOUND_HTTP_RESET_SECONDS.
+OUTBOUND_HTTP_CONNECT_TIMEOUT = float(os.environ.get('OUTBOUND_HTTP_CONNECT_TIMEOUT', 3.05))
+OUTBOUND_HTTP_READ_TIMEOUT = float(os.environ.get('OUTBOUND_HTTP_READ_TIMEOUT', 20))
+OUTBOUND_HTTP_RETRIES = int(os.environ.get('OUTBOUND_HTTP_RETRIES', 2))
+OUTBOUND_HTTP_BACKOFF_SECONDS = float(os.environ.get('OUTBOUND_HTTP_BACKOFF_SECONDS', 0.25))
+OUTBOUND_HTTP_POOL_SIZE = int(os.environ.get('OUTBOUND_HTTP_POOL_SIZE', 10))
+OUTBOUND_HTTP_FAILURE_THRESHOLD = int(os.environ.get('OUTBOUND_HTTP_FAILURE_THRESHOLD', 5))
+OUTBOUND_HTTP_RESET_SECONDS = int(os.environ.get('OUTBOUND_HTTP_RESET_SECONDS', 30))
+
+# "background" commits SOAP notes / discharge forms with pending investigation_docs and
+# uploads them after the response; "inline" uploads before responding. Failed uploads are
+# retried in-process with backoff (the spool dir is local to each machine);
+# `manage.py process_upload_jobs --loop` fails jobs orphaned by a restart.
+ATTACHMENT_UPLOAD_MODE = os.environ.get('ATTACHMENT_UPLOAD_MODE', 'background')
+ATTACHMENT_SPOOL_DIR = os.environ.get('ATTACHMENT_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'docuhealth-attachments'))
+ATTACHMENT_UPLOAD_JOB_WORKERS = int(os.environ.get('ATTACHMENT_UPLOAD_JOB_WORKERS', 2))
+ATTACHMENT_UPLOAD_MAX_ATTEMPTS = int(os.environ.get('ATTACHMENT_UPLOAD_MAX_ATTEMPTS', 3))
+ATTACHMENT_UPLOAD_BACKOFF_SECONDS = int(os.environ.get('ATTACHMENT_UPLOAD_BACKOFF_SECONDS', 30))
+ATTACHMENT_UPLOAD_MAX_BACKOFF_SECONDS = int(os.environ.get('ATTACHMENT_UPLOAD_MAX_BACKOFF_SECONDS', 300))
+
+# Bulk patient imports (accounts.imports): uploads are spooled here and imported in chunks,
+# each committed with the job's progress. A failed job is retried in-process with backoff and
+# continues after its last committed chunk (the spool dir is local to each machine);
+# `manage.py import_patients --resume --loop` fails jobs orphaned by a restart.
+PATIENT_IMPORT_SPOOL_DIR = os.environ.get('PATIENT_IMPORT_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'docuhealth-imports'))
+PATIENT_IMPORT_CHUNK_SIZE = int(os.environ.get('PATIENT_IMPORT_CHUNK_SIZE', 1000))
+PATIENT_IMPORT_JOB_WORKERS = int(os.environ.get('PATIENT_IMPORT_JOB_WORKERS', 1))
+PATIENT_IMPORT_MAX_ATTEMPTS = int(os.environ.get('PATIENT_IMPORT_MAX_ATTEMPTS', 3))
+PATIENT_IMPORT_BACKOFF_SECONDS = int(os.environ.get('PATIENT_IMPORT_BACKOFF_SECONDS', 30))
+PATIENT_IMPORT_MAX_BACKOFF_SECONDS = int(os.environ.get('PATIENT_IMPORT_MAX_BACKOFF_SECONDS', 300))
+PATIENT_IMPORT_OTP_EXPIRY_MINUTES = int(os.environ.get('PATIENT_IMPORT_OTP_EXPIRY_MINUTES', 60 * 24 * 3))
+
+# Bulk team onboarding (accounts.onboarding): the largest batch one request may create, and
+# the threads that hash the batch's passwords in parallel.
+TEAM_ONBOARDING_MAX_MEMBERS = int(os.environ.get('TEAM_ONBOARDING_MAX_MEMBERS', 500))
+TEAM_ONBOARDING_HASH_WORKERS = int(os.environ.get('TEAM_ONBOARDING_HASH_WORKERS', os.cpu_count() or 4))
+
+# Patient chart exports (records.export): rows fetched per server-side cursor round trip, and
+# the approximate size of each write to the streaming response.
+PATIENT_EXPORT_CHUNK_SIZE = int(os.environ.get('PATIENT_EXPORT_CHUNK_SIZE', 500))
+PATIENT_EXPORT_WRITE_SIZE = int(os.environ.get('PATIENT_EXPORT_WRITE_SIZE', 64 * 1024))
+
+# Per-request query instrumentation (docuhealth2.querystats): X-DB-* headers are only sent
+# outside production; requests repeating at least DUPLICATE_THRESHOLD statements log a warning.
+QUERY_STATS_ENABLED = os.environ.get('QUERY_STATS_ENABLED', 'true') == 'true'
+QUERY_STATS_HEADERS = ENVIRONMENT != 'production'
+QUERY_STATS_DUPLICATE_THRESHOLD = int(os.environ.get('QUERY_STATS_DUPLICATE_THRESHOLD', 10))
+QUERY_STATS_TOP_DUPLICATES = int(os.environ.get('QUERY_STATS_TOP_DUPLICATES', 5))
+CORS_EXPOSE_HEADERS = ["X-DB-Query-Count", "X-DB-Time-Ms", "X-DB-Duplicate-Queries"] if QUERY_STATS_HEADERS else []
 
 SENTRY_DSN = os.environ.get('SENTRY_DSN')
 
@@ -0,0 +1,96 @@
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.models import User, HospitalStaffProfile, PatientProfile
+from organizations.models import HospitalProfile
+from facility.models import HospitalWard
+
+# Everything views and permissions read off request.user to find the tenant; loaded
+# with the user in a single joined query by TenantJWTAuthentication.
+TENANT_RELATED = (
+    "hospital_profile",
+    "hospital_staff_profile__hospital",
+    "hospital_staff_profile__ward",
+    "patient_profile",
+)
+
+def tenant_users():
+    return User.objects.select_related(*TENANT_RELATED)
+
+def resolve_tenant(user):
+    """Returns (hospital, staff) for a user: the hospital admin's own profile, or the staff member's hospital."""
+    role = getattr(user, "role", None)
+
+    if role == User.Role.HOSPITAL:
+        return getattr(user, "hospital_profile", None), None
+
+    if role == User.Role.HOSPITAL_STAFF:
+        staff = getattr(user, "hospital_staff_profile", None)
+        return (staff.hospital if staff else None), staff
+
+    return None, None
+
+def attach_tenant(request, user):
+    """
+    Exposes request.hospital / request.staff on the DRF request and the
+    underlying HttpRequest. Both are None for patients, DocuHealth admins and partners.
+    """
+    hospital, staff = resolve_tenant(user)
+
+    for target in (request, getattr(request, "_request", None)):
+        if target is None:
+            continue
+        target.hospital = hospital
+        target.staff = staff
+
+def get_tenant(request):
+    """(hospital, staff) for the request, resolving it here for authenticators other than TenantJWTAuthentication."""
+    if not hasattr(request, "hospital"):
+        attach_tenant(request, request.user)
+    return request.hospital, request.staff
+
+def deferred_instance(model, **values):
+    """A model instance holding only `values`; any other field is loaded from the database on first access."""
+    field_names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+    return model.from_db(None, field_names, [values[name] for name in field_names])
+
+def principal_from_claims(token):
+    """
+    Builds request.user (and the hospital, staff, ward and patient profiles hanging off it)
+    from an access token's claims without touching the database. Only ids, roles and
+    is_active are populated; reading anything else falls back to a query.
+    """
+    user_id = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+    user = deferred_instance(User, id=user_id, role=token["role"], is_active=True, token_version=token["tv"])
+
+    hospital = None
+    if token.get("hospital_id"):
+        hospital = deferred_instance(HospitalProfile, id=token["hospital_id"])
+
+    if token["role"] == User.Role.HOSPITAL and hospital is not None:
+        hospital.user_id = user_id
+        hospital.user = user
+
+    if token["role"] == User.Role.HOSPITAL_STAFF and token.get("staff_profile_id"):
+        staff = deferred_instance(
+            HospitalStaffProfile,
+            id=token["staff_profile_id"],
+            user_id=user_id,
+            hospital_id=token["hospital_id"],
+            ward_id=token.get("ward_id"),
+            role=token["staff_role"],
+        )
+        staff.hospital = hospital
+        staff.ward = deferred_instance(HospitalWard, id=token["ward_id"], hospital_id=token["hospital_id"]) if token.get("ward_id") else None
+        staff.user = user
+
+    if token["role"] == User.Role.PATIENT and token.get("patient_profile_id"):
+        patient = deferred_instance(PatientProfile, id=token["patient_profile_id"], user_id=user_id)
+        patient.user = user
+
+    # Profiles the user does not have are cached as missing, so hasattr() checks stay query-free
+    for relation in TENANT_RELATED:
+        related = User._meta.get_field(relation.split("__")[0])
+        if not related.is_cached(user):
+            related.set_cached_value(user, None)
+
+    return user
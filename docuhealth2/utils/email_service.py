@@ -1,12 +1,15 @@
 from sib_api_v3_sdk import Configuration, ApiClient, TransactionalEmailsApi, SendSmtpEmail
 import os
-from rest_framework.response import Response
-from rest_framework import status
+
+from django.conf import settings
+from django.utils.module_loading import import_string
 
 from dotenv import load_dotenv
 load_dotenv()
 
 class BrevoEmailService:
+    """Delivery backend for the email outbox. Raises on failure so the worker can retry."""
+
     def __init__(self):
         self.configuration = Configuration()
         self.configuration.api_key['api-key'] = os.getenv("BREVO_API_KEY")
@@ -15,7 +18,7 @@ class BrevoEmailService:
     def send(self, subject: str, body: str, recipient: str, is_html=False):
         sender_email="docuhealthservice@gmail.com"
         sender_name="DocuHealth Services"
-        
+
         content_field = "html_content" if is_html else "text_content"
 
         email_data = {
@@ -24,12 +27,40 @@ class BrevoEmailService:
             "subject": subject,
             content_field: body,
         }
-        
+
         email = SendSmtpEmail(**email_data)
-        
-        try:
-            response = self.api_instance.send_transac_email(email)
-        
-        except Exception as e:
-            print(f"Email send failed: {e}")
-            return Response({"detail": str(e), "status": "error"}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return self.api_instance.send_transac_email(email)
+
+class LocalEmailTransport:
+    """Fake transport for local development and tests: keeps sent emails in memory."""
+
+    outbox = []
+
+    def send(self, subject: str, body: str, recipient: str, is_html=False):
+        self.outbox.append({"subject": subject, "body": body, "recipient": recipient, "is_html": is_html})
+
+def get_email_transport():
+    return import_string(settings.EMAIL_TRANSPORT)()
+
+class QueuedEmailService:
+    """
+    Drop-in replacement for calling the transport inline: send() writes an OutboundEmail
+    row in the current transaction and returns immediately. `manage.py send_queued_emails`
+    delivers it.
+    """
+
+    def send(self, subject: str, body: str, recipient: str, is_html=False):
+        from notifications.models import OutboundEmail
+
+        if not recipient:
+            return None
+
+        return OutboundEmail.objects.create(subject=subject, body=body, recipient=recipient, is_html=is_html)
+
+    def send_many(self, emails):
+        from notifications.models import OutboundEmail
+
+        return OutboundEmail.objects.bulk_create(
+            [OutboundEmail(**email) for email in emails if email.get("recipient")],
+            batch_size=500,
+        )
@@ -1,12 +1,7 @@
 import random
-from django.db.models import Max
-import re
-from django.db import connection
-from django.db import transaction
-from django.db.models import F
+import threading
 
-def generate_HIN():
-    return ''.join([str(random.randint(0, 9)) for _ in range(13)])
+from django.db import DEFAULT_DB_ALIAS, connection, connections
 
 def generate_planId():
     return ''.join([str(random.randint(0, 9)) for _ in range(4)])
@@ -30,74 +25,72 @@ ROLE_PREFIX_MAP = {
     "default": "STF",  # fallback
 }
 
-def get_next_staff_seq(hospital_instance, prefix: str) -> int:
+def staff_id_prefix(hospital, role):
+    """<HOSP_ABBR>-<ROLE_ABBR>, e.g. OLVC-DR; the staff ID is this plus a zero-padded sequence number."""
+    clean_name = ''.join(ch for ch in hospital.name.upper() if ch.isalpha())
+    hosp_abbr = (clean_name[:4] if len(clean_name) >= 4 else clean_name).ljust(4, 'X')
+
+    role_prefix = ROLE_PREFIX_MAP.get(role, ROLE_PREFIX_MAP["default"])
+    return f"{hosp_abbr}-{role_prefix}"
+
+_counter_connections = threading.local()
+
+def counter_connection():
     """
-    Fetches the next value from a PostgreSQL sequence specific to the hospital.
-    Creates the sequence if it does not already exist.
+    A second connection to the default database, one per thread, left in autocommit: a
+    statement on it commits at once, whatever transaction the request is in.
     """
-    seq_name = f"staff_id_seq_hosp_{hospital_instance.id}"
-    
-    with connection.cursor() as cursor:
-        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {seq_name} START 1;")
-        
-        cursor.execute(f"SELECT last_value, is_called FROM pg_sequences WHERE schemaname = 'public' AND sequencename = '{seq_name}';")
-        seq_status = cursor.fetchone()
-        
-        if seq_status and not seq_status[1]: 
-            from accounts.models import HospitalStaffProfile
-            
-            latest_id = HospitalStaffProfile.objects.filter(
-                hospital=hospital_instance, 
-                staff_id__startswith=prefix
-            ).aggregate(max_val=Max("staff_id")).get("max_val")
-
-            if latest_id:
-                match = re.search(r'(\d+)$', latest_id)
-                current_max = int(match.group(1)) if match else 0
-                
-                if current_max > 0:
-                    cursor.execute(f"SELECT setval('{seq_name}', {current_max});")
-
-        cursor.execute(f"SELECT nextval('{seq_name}');")
-        return cursor.fetchone()[0]
+    conn = getattr(_counter_connections, "connection", None)
+    if conn is None:
+        conn = _counter_connections.connection = connections.create_connection(DEFAULT_DB_ALIAS)
+    conn.close_if_unusable_or_obsolete()
+    return conn
 
-def generate_staff_id(hospital_instance, role: str = "default") -> str:
+def reserve_staff_ids(hospital, role, count):
     """
-    Generates a unique, human-readable staff ID.
-    Format: <HOSP_ABBR>-<ROLE_ABBR><SEQUENCE>
-    Example: OLVC-DR001
+    `count` consecutive staff IDs for one hospital and role. On PostgreSQL, inside a
+    transaction, the StaffCounter row is bumped on counter_connection(), so its row lock lasts
+    one statement instead of the caller's whole transaction and concurrent creates do not queue
+    on it. Numbers taken by a transaction that then rolls back are not handed back, so IDs can
+    have gaps. The first reservation for a hospital and role creates the counter row in the
+    caller's transaction instead, since the hospital itself may not be committed yet.
     """
-    from accounts.models import HospitalStaffProfile 
+    if count <= 0:
+        return []
 
-    clean_name = ''.join(ch for ch in hospital_instance.name.upper() if ch.isalpha())
-    hosp_abbr = (clean_name[:4] if len(clean_name) >= 4 else clean_name).ljust(4, 'X')
-
-    role_prefix = ROLE_PREFIX_MAP.get(role, ROLE_PREFIX_MAP["default"])
-    
-    # 2. Get the Atomic Sequence Number from DB
-    new_seq_int = get_next_staff_seq(hospital_instance, role_prefix)
-    new_seq_str = str(new_seq_int).zfill(3)
+    last = None
+    if connection.vendor == "postgresql" and connection.in_atomic_block:
+        last = _bump_staff_counter(counter_connection(), hospital, role, count)
+    if last is None:
+        last = _upsert_staff_counter(hospital, role, count)
 
-    return f"{hosp_abbr}-{role_prefix}{new_seq_str}"
+    prefix = staff_id_prefix(hospital, role)
+    return [f"{prefix}{str(value).zfill(3)}" for value in range(last - count + 1, last + 1)]
 
-def get_next_staff_id(hospital, role):
-    clean_name = ''.join(ch for ch in hospital.name.upper() if ch.isalpha())
-    hosp_abbr = (clean_name[:4] if len(clean_name) >= 4 else clean_name).ljust(4, 'X')
-    
-    role_prefix = ROLE_PREFIX_MAP.get(role, ROLE_PREFIX_MAP["default"])
-    
+def _bump_staff_counter(conn, hospital, role, count):
     from accounts.models import StaffCounter
-    
-    with transaction.atomic():
-        counter, _ = StaffCounter.objects.select_for_update().get_or_create(
-            hospital=hospital,
-            role=role,
-            defaults={"current_value": 0}
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {StaffCounter._meta.db_table} SET current_value = current_value + %s "
+            "WHERE hospital_id = %s AND role = %s RETURNING current_value",
+            [count, hospital.id, role],
         )
+        row = cursor.fetchone()
+    return row[0] if row else None
 
-        counter.current_value = F("current_value") + 1
-        counter.save()
-        counter.refresh_from_db()
+def _upsert_staff_counter(hospital, role, count):
+    from accounts.models import StaffCounter
 
-        return f"{hosp_abbr}-{role_prefix}{str(counter.current_value).zfill(3)}"
+    table = StaffCounter._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (hospital_id, role, current_value) VALUES (%s, %s, %s) "
+            f"ON CONFLICT (hospital_id, role) DO UPDATE SET current_value = {table}.current_value + EXCLUDED.current_value "
+            "RETURNING current_value",
+            [hospital.id, role, count],
+        )
+        return cursor.fetchone()[0]
 
+def get_next_staff_id(hospital, role):
+    return reserve_staff_ids(hospital, role, 1)[0]
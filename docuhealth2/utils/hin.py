@@ -0,0 +1,132 @@
+import hashlib
+
+from django.conf import settings
+from django.db import connection
+
+from rest_framework import serializers
+
+# HINs are 13 permuted digits plus a Luhn check digit. Legacy HINs (13 random digits, no
+# check digit) are still accepted everywhere; new ones are never 13 digits long, so the
+# two ranges cannot collide.
+BODY_DIGITS = 13
+HIN_LENGTH = BODY_DIGITS + 1
+LEGACY_HIN_LENGTH = 13
+
+# Postgres sequence shared by patients, subaccounts and hospitals (see accounts migration 0017).
+SEQUENCE_NAME = "hin_seq"
+
+_LEFT_DIGITS = BODY_DIGITS // 2
+_RIGHT_DIGITS = BODY_DIGITS - _LEFT_DIGITS
+_ROUNDS = 8
+
+def _round_value(round_number, value):
+    digest = hashlib.blake2b(
+        f"{round_number}:{value}".encode(), key=settings.HIN_PERMUTATION_KEY.encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+def permute(n):
+    """
+    Keyed bijection on [0, 10**13): an FF1-style Feistel network over the two digit halves,
+    so consecutive sequence values come out scattered but never collide.
+    """
+    left, right = divmod(n, 10 ** _RIGHT_DIGITS)
+    for i in range(_ROUNDS):
+        modulus = 10 ** (_LEFT_DIGITS if i % 2 == 0 else _RIGHT_DIGITS)
+        left, right = right, (left + _round_value(i, right)) % modulus
+    return left * 10 ** _RIGHT_DIGITS + right
+
+def unpermute(n):
+    left, right = divmod(n, 10 ** _RIGHT_DIGITS)
+    for i in reversed(range(_ROUNDS)):
+        modulus = 10 ** (_LEFT_DIGITS if i % 2 == 0 else _RIGHT_DIGITS)
+        left, right = (right - _round_value(i, left)) % modulus, left
+    return left * 10 ** _RIGHT_DIGITS + right
+
+def luhn_check_digit(digits):
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = int(ch)
+        if i % 2 == 0:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return str((10 - total % 10) % 10)
+
+def format_hin(sequence_value):
+    body = str(permute(sequence_value)).zfill(BODY_DIGITS)
+    return body + luhn_check_digit(body)
+
+def is_valid_hin(value):
+    """Shape and check-digit test, done before any HIN reaches a query."""
+    if not isinstance(value, str) or not value.isdigit():
+        return False
+    if len(value) == LEGACY_HIN_LENGTH:
+        return True
+    return len(value) == HIN_LENGTH and luhn_check_digit(value[:-1]) == value[-1]
+
+def _next_values(count):
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [SEQUENCE_NAME, count])
+            return [row[0] for row in cursor.fetchall()]
+
+    # Other backends (local SQLite) have no sequences; a counter row stands in for one.
+    from accounts.models import HINCounter
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {HINCounter._meta.db_table} SET last_value = last_value + %s WHERE id = 1 RETURNING last_value",
+            [count],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        HINCounter.objects.get_or_create(pk=1)
+        return _next_values(count)
+
+    last = row[0]
+    return list(range(last - count + 1, last + 1))
+
+def reserve_hins(count):
+    """A block of `count` unused HINs in one round trip, for bulk registration."""
+    if count <= 0:
+        return []
+    return [format_hin(value) for value in _next_values(count)]
+
+def allocate_hin():
+    return reserve_hins(1)[0]
+
+class HINConverter:
+    """URL converter: a malformed HIN or a bad check digit is a 404 before the view runs."""
+    regex = r"[0-9]{13,14}"
+
+    def to_python(self, value):
+        if not is_valid_hin(value):
+            raise ValueError("Invalid HIN")
+        return value
+
+    def to_url(self, value):
+        return value
+
+class HINField(serializers.CharField):
+    default_error_messages = {"invalid_hin": "Enter a valid HIN."}
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if not is_valid_hin(value):
+            self.fail("invalid_hin")
+        return value
+
+class HINRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField on `hin` that rejects malformed HINs without querying."""
+    default_error_messages = {"invalid_hin": "Enter a valid HIN."}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("slug_field", "hin")
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not is_valid_hin(data):
+            self.fail("invalid_hin")
+        return super().to_internal_value(data)
@@ -0,0 +1,194 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from django.conf import settings
+from sentry_sdk import logger as sentry_logger
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+def never_sent(error):
+    """True when the request failed before a connection was made, so even a POST is safe to resend."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+class ProviderUnavailable(Exception):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for `reset_timeout`
+    seconds. After that a single trial call is let through: success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+class ProviderMetrics:
+    """Per-process call counts and latency for one provider."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.retries = 0
+            self.rejected = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+
+    def record(self, elapsed, error=False):
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_seconds / self.calls * 1000, 1) if self.calls else 0.0,
+                "max_ms": round(self.max_seconds * 1000, 1),
+            }
+
+class ProviderClient:
+    """
+    Outbound HTTP for one third-party API. Calls share a keep-alive connection pool, always
+    have connect and read timeouts, and are retried with jittered exponential backoff when
+    it is safe to: failed connects for any method (nothing reached the provider), and
+    dropped connections, read timeouts, 429 and 5xx only for idempotent calls. A circuit breaker fails fast while
+    the provider is down instead of tying up workers on timeouts.
+    """
+
+    def __init__(self, name, base_url, headers=None, connect_timeout=None, read_timeout=None,
+                 retries=None, backoff=None, pool_size=None, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/") + "/"
+        self.timeout = (
+            connect_timeout or settings.OUTBOUND_HTTP_CONNECT_TIMEOUT,
+            read_timeout or settings.OUTBOUND_HTTP_READ_TIMEOUT,
+        )
+        self.retries = settings.OUTBOUND_HTTP_RETRIES if retries is None else retries
+        self.backoff = settings.OUTBOUND_HTTP_BACKOFF_SECONDS if backoff is None else backoff
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or settings.OUTBOUND_HTTP_POOL_SIZE, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.breaker = CircuitBreaker(
+            failure_threshold or settings.OUTBOUND_HTTP_FAILURE_THRESHOLD,
+            reset_timeout or settings.OUTBOUND_HTTP_RESET_SECONDS,
+        )
+        self.metrics = ProviderMetrics()
+        providers[name] = self
+
+    def request(self, method, path, json=None, idempotent=None, **kwargs):
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        url = self.base_url + path.lstrip("/")
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.metrics.record_rejected()
+                raise ProviderUnavailable(f"{self.name} is unavailable, try again shortly")
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, json=json, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                self.metrics.record(time.perf_counter() - start, error=True)
+                self.breaker.record_failure()
+                retryable = never_sent(e) or (idempotent and isinstance(e, (requests.ConnectionError, requests.Timeout)))
+                if not retryable or attempt >= self.retries:
+                    sentry_logger.error(f"{self.name} {method} {path} failed: {e}")
+                    raise
+            else:
+                failed = response.status_code >= 500
+                self.metrics.record(time.perf_counter() - start, error=failed)
+                if failed:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+
+                if not (idempotent and response.status_code in RETRY_STATUSES) or attempt >= self.retries:
+                    return response
+
+            attempt += 1
+            self.metrics.record_retry()
+            time.sleep(random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, json=None, **kwargs):
+        return self.request("POST", path, json=json, **kwargs)
+
+providers = {}
+
+def provider_metrics():
+    """{provider name: metrics and circuit state} for this process."""
+    return {name: {**client.metrics.snapshot(), "circuit": client.breaker.state} for name, client in providers.items()}
+
+def reset_provider_metrics():
+    for client in providers.values():
+        client.metrics.reset()
@@ -1,27 +1,104 @@
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from django.conf import settings
+import queue
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-bucket_name  = settings.SUPABASE_BUCKET_NAME 
+bucket_name  = settings.SUPABASE_BUCKET_NAME
+
+class UploadTimeout(Exception):
+    """No upload worker or storage client became free within SUPABASE_UPLOAD_QUEUE_TIMEOUT."""
+
+class SupabaseClientPool:
+    """
+    Process-wide pool of Supabase clients. Each client keeps its own keep-alive HTTP
+    connection, so uploads reuse warm TLS sessions instead of handshaking per file.
+    Clients are created lazily, up to `size`; callers wait up to `acquire_timeout`
+    for one to be free.
+    """
+
+    def __init__(self, size, timeout, acquire_timeout):
+        self.size = size
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self) -> Client:
+        options = ClientOptions(storage_client_timeout=self.timeout)
+        return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY, options=options)
+
+    def acquire(self) -> Client:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise UploadTimeout(f"No storage client became free within {self.acquire_timeout}s")
+
+    def release(self, client: Client):
+        self._idle.put(client)
+
+    @contextmanager
+    def client(self):
+        client = self.acquire()
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+client_pool = SupabaseClientPool(
+    size=settings.SUPABASE_UPLOAD_WORKERS, timeout=settings.SUPABASE_UPLOAD_TIMEOUT, acquire_timeout=settings.SUPABASE_UPLOAD_QUEUE_TIMEOUT,
+)
+upload_executor = ThreadPoolExecutor(max_workers=settings.SUPABASE_UPLOAD_WORKERS, thread_name_prefix="supabase-upload")
+
+def file_source(doc):
+    """
+    What to hand the uploader for a Django UploadedFile: the temp file path for files
+    Django already spooled to disk (streamed, never loaded into memory), bytes otherwise.
+    """
+    if hasattr(doc, "temporary_file_path"):
+        return doc.temporary_file_path()
+
+    doc.seek(0)
+    return doc.read()
 
 def upload_file_to_supabase(file_bytes, filename, content_type, folder: str, bucket_name=bucket_name, custom_name: str = None):
     """
     Upload any file to Supabase storage and return the public URL.
 
     Args:
-        file: The uploaded file object (Django InMemoryUploadedFile or similar)
+        file_bytes: File content as bytes, or a path to a file on disk which is streamed
         folder (str): The folder/path in the bucket (e.g., 'hospital_docs', 'avatars', etc.)
         bucket_name (str): The Supabase storage bucket name
         custom_name (str): Optional custom name for the uploaded file (without extension)
 
     Returns:
-        str | Response: The public URL on success, or DRF Response on failure.
+        dict: The uploaded file's id, public url, path, filename and content type.
     """
-    from supabase import create_client
-    thread_supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
     try:
         if not file_bytes:
             raise ValueError("No file provided.")
@@ -32,21 +109,29 @@ def upload_file_to_supabase(file_bytes, filename, content_type, folder: str, buc
         file_name = f"{custom_name or uuid.uuid4().hex}.{file_ext}"
         path = f"{folder}/{file_name}"
 
-        response = thread_supabase.storage.from_(bucket_name).upload(
-            path, 
-            file_bytes,
-            file_options={"content_type": content_type}
-        )
-        print(response)
+        with client_pool.client() as supabase:
+            if isinstance(file_bytes, str):
+                with open(file_bytes, "rb") as file:
+                    supabase.storage.from_(bucket_name).upload(
+                        path,
+                        file,
+                        file_options={"content_type": content_type}
+                    )
+            else:
+                supabase.storage.from_(bucket_name).upload(
+                    path,
+                    file_bytes,
+                    file_options={"content_type": content_type}
+                )
 
-        public_url = thread_supabase.storage.from_(bucket_name).get_public_url(path)
+            public_url = supabase.storage.from_(bucket_name).get_public_url(path)
 
         if not public_url:
             raise Exception("Failed to retrieve public URL from Supabase.")
 
         return {
             "id": str(uuid.uuid4()),
-            "url": public_url, 
+            "url": public_url,
             "path": path,
             "filename": file_name,
             "content_type": content_type,
@@ -54,35 +139,66 @@ def upload_file_to_supabase(file_bytes, filename, content_type, folder: str, buc
 
     except Exception as e:
         raise Exception(f"File upload failed: {str(e)}")
-    
+
 def delete_from_supabase(path: str, bucket_name=bucket_name):
     """
     Deletes a file from Supabase storage using its path.
     """
     try:
         print(f"Deleting {path}")
-        response = supabase.storage.from_(bucket_name).remove([path])
-        return response
+        with client_pool.client() as supabase:
+            return supabase.storage.from_(bucket_name).remove([path])
     except Exception as e:
         print(f"Cleanup failed for {path}: {str(e)}")
         return None
 
+def _delete_if_uploaded(future):
+    if not future.cancelled() and future.exception() is None:
+        delete_from_supabase(future.result()['path'])
+
+class QueuedUpload:
+    """
+    One file handed to upload_executor. Its SUPABASE_UPLOAD_TIMEOUT starts when a worker picks
+    it up, so time spent queued behind other requests' uploads does not count against it; the
+    queue wait itself is bounded by SUPABASE_UPLOAD_QUEUE_TIMEOUT.
+    """
+
+    def __init__(self, source, filename, content_type, folder):
+        self.started = threading.Event()
+        self.started_at = None
+        self.future = upload_executor.submit(self.run, source, filename, content_type, folder)
+
+    def run(self, *args):
+        self.started_at = time.monotonic()
+        self.started.set()
+        return upload_file_to_supabase(*args)
+
+    def result(self):
+        # Each running upload is bounded by the storage client's own timeout, so the queue keeps moving
+        if not self.started.wait(settings.SUPABASE_UPLOAD_QUEUE_TIMEOUT):
+            raise UploadTimeout(f"File upload did not start within {settings.SUPABASE_UPLOAD_QUEUE_TIMEOUT}s")
+        elapsed = time.monotonic() - self.started_at
+        return self.future.result(timeout=max(settings.SUPABASE_UPLOAD_TIMEOUT - elapsed, 0))
+
 def upload_files(documents, folder):
-    files_data = [{"bytes": doc.read(), "name": doc.name, "type": doc.content_type} for doc in documents]
+    uploads = [QueuedUpload(file_source(doc), doc.name, doc.content_type, folder) for doc in documents]
     uploaded_data = []
-    
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [
-            executor.submit(upload_file_to_supabase,  file['bytes'], file['name'], file['type'], folder) for file in files_data
-        ]
-        
-        try:
-            for future in futures:
-                uploaded_data.append(future.result())
-                
-            return uploaded_data
-                
-        except Exception as e:
-            for doc in uploaded_data:
-                delete_from_supabase(doc['path'])
-            raise e
\ No newline at end of file
+
+    try:
+        for upload in uploads:
+            uploaded_data.append(upload.result())
+
+        return uploaded_data
+
+    except Exception as e:
+        for doc in uploaded_data:
+            delete_from_supabase(doc['path'])
+
+        # Uploads still queued are dropped; ones already in flight are removed once they land.
+        for upload in uploads[len(uploaded_data):]:
+            if not upload.future.cancel():
+                upload.future.add_done_callback(_delete_if_uploaded)
+
+        if isinstance(e, FutureTimeoutError):
+            raise Exception(f"File upload timed out after {settings.SUPABASE_UPLOAD_TIMEOUT}s")
+        raise e
@@ -3,7 +3,9 @@ from django.db import transaction
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from rest_framework.pagination import PageNumberPagination
+
+from .pagination import PageNumberPagination
+from .tenancy import get_tenant
 
 from accounts.models import User
 
@@ -17,8 +19,25 @@ class PublicAPIView():
     
 class PaginatedView():
     pagination_class = PageNumberPagination
-    pagination_class.page_size_query_param = 'size'
-    pagination_class.max_page_size = 100
+
+class HospitalScopedMixin():
+    """
+    For views used by hospital admins and staff: `get_hospital()` / `get_staff()` read the
+    request's tenant context and `scope_to_hospital()` narrows a queryset to that hospital.
+    """
+    hospital_field = "hospital"
+
+    def get_hospital(self):
+        return get_tenant(self.request)[0]
+
+    def get_staff(self):
+        return get_tenant(self.request)[1]
+
+    def scope_to_hospital(self, queryset, field=None):
+        hospital = self.get_hospital()
+        if hospital is None:
+            return queryset.none()
+        return queryset.filter(**{field or self.hospital_field: hospital})
     
 class BaseUserCreateView(generics.CreateAPIView):
     
@@ -0,0 +1,61 @@
+import secrets
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from organizations.models import HospitalProfile
+from facility.models import HospitalWard, WardBed
+from facility.serializers import WardSerializer
+from facility.services import provision_ward, resize_ward
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Benchmarks onboarding a hospital\'s wards: per-bed INSERTs vs bulk provisioning, plus a resize'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wards', type=int, default=10, help='Wards to create')
+        parser.add_argument('--beds', type=int, default=100, help='Beds per ward')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['wards'], options['beds'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, wards, beds):
+        user = User.objects.create(email=f"bench-{secrets.token_hex(6)}@docuhealth.local", role=User.Role.HOSPITAL)
+        hospital = HospitalProfile.objects.create(user=user, name="Benchmark Hospital")
+        total = wards * beds
+
+        def legacy():
+            for n in range(wards):
+                ward = HospitalWard.objects.create(name=f"Legacy {n}", hospital=hospital, total_beds=beds)
+                for num in range(1, beds + 1):
+                    WardBed.objects.create(ward=ward, bed_number=num)
+
+        def bulk():
+            for n in range(wards):
+                serializer = WardSerializer(data={"name": f"Bulk {n}", "total_beds": beds})
+                serializer.is_valid(raise_exception=True)
+                provision_ward(serializer, hospital=hospital)
+
+        def resize():
+            for ward in HospitalWard.objects.filter(hospital=hospital, name__startswith="Bulk"):
+                resize_ward(ward, beds * 2)
+                resize_ward(ward, beds)
+
+        for label, fn in (("per-bed INSERTs", legacy), ("bulk provisioning", bulk), ("resize x2 and back", resize)):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                fn()
+                elapsed = time.perf_counter() - start
+            self.stdout.write(f"{label:<20} {total} beds: {elapsed * 1000:,.0f} ms, {len(queries)} queries")
+
+        self.stdout.write(self.style.SUCCESS('Done (all rows rolled back)'))
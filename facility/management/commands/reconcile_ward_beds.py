@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from facility.models import HospitalWard
+from facility.services import reconcile_bed_counters
+
+class Command(BaseCommand):
+    help = "Rebuilds HospitalWard occupancy counters from the wards' beds"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hospital', type=str, help='Only reconcile wards of the hospital with this HIN')
+
+    def handle(self, *args, **options):
+        wards = HospitalWard.objects.all()
+        if options['hospital']:
+            wards = wards.filter(hospital__hin=options['hospital'])
+
+        fixed = reconcile_bed_counters(wards)
+        for ward in fixed:
+            self.stdout.write(f"Fixed counters for ward {ward.id} ({ward.name})")
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(fixed)} wards'))
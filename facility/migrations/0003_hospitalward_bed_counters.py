@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facility', '0002_alter_hospitalward_table_alter_wardbed_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hospitalward',
+            name='available_bed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hospitalward',
+            name='occupied_bed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hospitalward',
+            name='requested_bed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
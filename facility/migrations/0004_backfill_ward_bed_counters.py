@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    HospitalWard = apps.get_model('facility', 'HospitalWard')
+
+    wards = HospitalWard.objects.annotate(
+        available=Count('beds', filter=Q(beds__status='available', beds__is_deleted=False)),
+        requested=Count('beds', filter=Q(beds__status='requested', beds__is_deleted=False)),
+        occupied=Count('beds', filter=Q(beds__status='occupied', beds__is_deleted=False)),
+    )
+    for ward in wards.iterator():
+        HospitalWard.objects.filter(pk=ward.pk).update(
+            available_bed_count=ward.available,
+            requested_bed_count=ward.requested,
+            occupied_bed_count=ward.occupied,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facility', '0003_hospitalward_bed_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F
+
+from rest_framework.exceptions import ValidationError
 
 from docuhealth2.models import BaseModel
 
@@ -9,6 +12,11 @@ class HospitalWard(BaseModel):
     hospital = models.ForeignKey(HospitalProfile, on_delete=models.CASCADE, related_name="wards")
     total_beds = models.IntegerField()
     
+    # Occupancy counters, kept in step with WardBed.set_status(). `manage.py reconcile_ward_beds` rebuilds them.
+    available_bed_count = models.PositiveIntegerField(default=0)
+    requested_bed_count = models.PositiveIntegerField(default=0)
+    occupied_bed_count = models.PositiveIntegerField(default=0)
+    
     def __str__(self):
         return f"Ward {self.name}"
     
@@ -17,7 +25,7 @@ class HospitalWard(BaseModel):
     
     @property
     def available_beds(self):
-        return self.beds.filter(status="available").count()
+        return self.available_bed_count
     
 class WardBed(BaseModel):
     class Status(models.TextChoices):
@@ -37,4 +45,27 @@ class WardBed(BaseModel):
     
     @property
     def is_available(self):
-        return self.status == self.Status.AVAILABLE
\ No newline at end of file
+        return self.status == self.Status.AVAILABLE
+    
+    @staticmethod
+    def counter_field(status):
+        return f"{status}_bed_count"
+    
+    def set_status(self, status):
+        """
+        Moves the bed to `status` and shifts the ward's occupancy counters in the same
+        statement pair. Call inside the caller's transaction.
+        """
+        previous = self.status
+        if previous == status:
+            return
+        
+        updated = WardBed.objects.filter(pk=self.pk, status=previous).update(status=status)
+        if not updated:
+            raise ValidationError({"bed": "Bed status changed while processing this request, please retry."})
+        
+        HospitalWard.all_objects.filter(pk=self.ward_id).update(**{
+            self.counter_field(previous): F(self.counter_field(previous)) - 1,
+            self.counter_field(status): F(self.counter_field(status)) + 1,
+        })
+        self.status = status
\ No newline at end of file
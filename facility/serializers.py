@@ -8,21 +8,27 @@ class WardBedSerializer(serializers.ModelSerializer):
         fields = ['bed_number', 'status', 'id']   
         read_only_fields = ['id']
     
+COUNTER_FIELDS = ['available_bed_count', 'requested_bed_count', 'occupied_bed_count']
+
 class WardSerializer(serializers.ModelSerializer):
     beds = WardBedSerializer(many=True, read_only=True)
-    available_beds = serializers.IntegerField(read_only=True)
+    available_beds = serializers.IntegerField(read_only=True, source="available_bed_count")
+    requested_beds = serializers.IntegerField(read_only=True, source="requested_bed_count")
+    occupied_beds = serializers.IntegerField(read_only=True, source="occupied_bed_count")
     
     class Meta:
         model = HospitalWard
-        exclude = ['is_deleted', 'deleted_at', 'created_at']
+        exclude = ['is_deleted', 'deleted_at', 'created_at', *COUNTER_FIELDS]
         read_only_fields = ['available_beds', 'id', 'hospital']
         
 class WardBasicInfoSerializer(serializers.ModelSerializer):
-    available_beds = serializers.IntegerField(read_only=True)
+    available_beds = serializers.IntegerField(read_only=True, source="available_bed_count")
+    requested_beds = serializers.IntegerField(read_only=True, source="requested_bed_count")
+    occupied_beds = serializers.IntegerField(read_only=True, source="occupied_bed_count")
     
     class Meta:
         model = HospitalWard
-        exclude = ['is_deleted', 'deleted_at', 'created_at']
+        exclude = ['is_deleted', 'deleted_at', 'created_at', *COUNTER_FIELDS]
         read_only_fields = ['available_beds', 'id', 'hospital']
         
 class WardNameSerializer(serializers.ModelSerializer):
@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models import Count, Q, Max, F
+from django.utils import timezone
+
+from rest_framework.exceptions import ValidationError
+
+from .models import HospitalWard, WardBed
+
+def build_beds(ward, first_number, count):
+    return [WardBed(ward=ward, bed_number=number) for number in range(first_number, first_number + count)]
+
+@transaction.atomic
+def provision_ward(serializer, **extra):
+    """Saves a new ward from a validated WardSerializer and creates its beds in one INSERT."""
+    total_beds = serializer.validated_data["total_beds"]
+    if total_beds < 0:
+        raise ValidationError({"total_beds": "Total beds cannot be negative."})
+
+    ward = serializer.save(available_bed_count=total_beds, **extra)
+    WardBed.objects.bulk_create(build_beds(ward, 1, total_beds), batch_size=500)
+    return ward
+
+@transaction.atomic
+def resize_ward(ward, total_beds):
+    """
+    Grows or shrinks a ward to `total_beds`. New beds are numbered after the highest
+    existing one; shrinking soft-deletes the highest-numbered beds and is refused if
+    any of them is requested or occupied.
+    """
+    if total_beds < 0:
+        raise ValidationError({"total_beds": "Total beds cannot be negative."})
+
+    HospitalWard.objects.select_for_update().filter(pk=ward.pk).first()
+    beds = WardBed.objects.filter(ward=ward)
+    current = beds.count()
+
+    if total_beds > current:
+        highest = beds.aggregate(highest=Max('bed_number'))['highest'] or 0
+        WardBed.objects.bulk_create(build_beds(ward, highest + 1, total_beds - current), batch_size=500)
+        HospitalWard.objects.filter(pk=ward.pk).update(
+            available_bed_count=F('available_bed_count') + (total_beds - current)
+        )
+
+    elif total_beds < current:
+        trailing = list(beds.order_by('-bed_number', '-id').values('id', 'bed_number', 'status')[:current - total_beds])
+        in_use = sorted(bed['bed_number'] for bed in trailing if bed['status'] != WardBed.Status.AVAILABLE)
+        if in_use:
+            raise ValidationError({
+                "total_beds": f"Cannot remove beds that are requested or occupied: {', '.join(map(str, in_use))}."
+            })
+
+        WardBed.objects.filter(id__in=[bed['id'] for bed in trailing]).update(is_deleted=True, deleted_at=timezone.now())
+        HospitalWard.objects.filter(pk=ward.pk).update(
+            available_bed_count=F('available_bed_count') - len(trailing)
+        )
+
+    HospitalWard.objects.filter(pk=ward.pk).update(total_beds=total_beds)
+    ward.refresh_from_db()
+    return ward
+
+def counted_wards(queryset=None):
+    """Wards annotated with their actual (non-deleted) bed counts per status."""
+    queryset = queryset if queryset is not None else HospitalWard.objects.all()
+    return queryset.annotate(**{
+        f"actual_{status}": Count('beds', filter=Q(beds__status=status, beds__is_deleted=False))
+        for status in WardBed.Status.values
+    })
+
+def reconcile_bed_counters(queryset=None):
+    """Rewrites the occupancy counters of every ward whose counters drifted. Returns the fixed wards."""
+    fixed = []
+    for ward in counted_wards(queryset).iterator():
+        if not has_drifted(ward):
+            continue
+
+        with transaction.atomic():
+            # Lock the ward and recount so concurrent set_status() calls are not overwritten.
+            HospitalWard.all_objects.select_for_update().filter(pk=ward.pk).first()
+            ward = counted_wards(HospitalWard.all_objects.filter(pk=ward.pk)).get()
+            HospitalWard.all_objects.filter(pk=ward.pk).update(**actual_counters(ward))
+        fixed.append(ward)
+
+    return fixed
+
+def actual_counters(ward):
+    return {WardBed.counter_field(status): getattr(ward, f"actual_{status}") for status in WardBed.Status.values}
+
+def has_drifted(ward):
+    return any(getattr(ward, field) != value for field, value in actual_counters(ward).items())
@@ -1,3 +1,168 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from accounts.models import User, HospitalStaffProfile
+from accounts.serializers import CustomTokenObtainPairSerializer
+from organizations.models import HospitalProfile
+
+from .models import HospitalWard, WardBed
+from .serializers import WardSerializer
+from .services import provision_ward, reconcile_bed_counters, resize_ward
+
+def bearer(user):
+    return f"Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}"
+
+def create_ward(hospital, total_beds, name="Ward A"):
+    serializer = WardSerializer(data={"name": name, "total_beds": total_beds})
+    serializer.is_valid(raise_exception=True)
+    return provision_ward(serializer, hospital=hospital)
+
+def counters(ward):
+    ward.refresh_from_db()
+    return (ward.available_bed_count, ward.requested_bed_count, ward.occupied_bed_count)
+
+def create_hospital():
+    return HospitalProfile.objects.create(
+        user=User.objects.create(email="hospital@docuhealth.local", role=User.Role.HOSPITAL, is_active=True), name="Test Hospital"
+    )
+
+class BedCounterTests(TestCase):
+    def setUp(self):
+        self.ward = create_ward(create_hospital(), 3)
+        self.beds = list(WardBed.objects.filter(ward=self.ward).order_by("bed_number"))
+
+    def test_new_ward_counts_every_bed_available(self):
+        self.assertEqual(counters(self.ward), (3, 0, 0))
+
+    def test_set_status_moves_the_bed_between_counters(self):
+        self.beds[0].set_status(WardBed.Status.REQUESTED)
+        self.assertEqual(counters(self.ward), (2, 1, 0))
+
+        self.beds[0].set_status(WardBed.Status.OCCUPIED)
+        self.beds[1].set_status(WardBed.Status.OCCUPIED)
+        self.assertEqual(counters(self.ward), (1, 0, 2))
+
+        self.beds[0].set_status(WardBed.Status.AVAILABLE)
+        self.assertEqual(counters(self.ward), (2, 0, 1))
+
+    def test_set_status_to_the_current_status_changes_nothing(self):
+        self.beds[0].set_status(WardBed.Status.AVAILABLE)
+
+        self.assertEqual(counters(self.ward), (3, 0, 0))
+
+    def test_set_status_refuses_a_bed_changed_by_someone_else(self):
+        stale = WardBed.objects.get(pk=self.beds[0].pk)
+        self.beds[0].set_status(WardBed.Status.OCCUPIED)
+
+        with self.assertRaises(ValidationError):
+            stale.set_status(WardBed.Status.REQUESTED)
+        self.assertEqual(counters(self.ward), (2, 0, 1))
+
+    def test_reconcile_fixes_drifted_counters_only(self):
+        other = create_ward(self.ward.hospital, 2, name="Ward B")
+        # A bulk update that bypassed set_status()
+        WardBed.objects.filter(pk__in=[self.beds[0].pk, self.beds[1].pk]).update(status=WardBed.Status.OCCUPIED)
+
+        fixed = reconcile_bed_counters()
+
+        self.assertEqual([ward.pk for ward in fixed], [self.ward.pk])
+        self.assertEqual(counters(self.ward), (1, 0, 2))
+        self.assertEqual(counters(other), (2, 0, 0))
+
+    def test_reconcile_ignores_deleted_beds(self):
+        WardBed.objects.filter(pk=self.beds[2].pk).update(is_deleted=True)
+
+        call_command("reconcile_ward_beds", stdout=StringIO())
+
+        self.assertEqual(counters(self.ward), (2, 0, 0))
+        self.assertEqual(reconcile_bed_counters(), [])
+
+class ResizeWardTests(TestCase):
+    def setUp(self):
+        self.ward = create_ward(create_hospital(), 4)
+
+    def bed_numbers(self):
+        return list(WardBed.objects.filter(ward=self.ward).order_by("bed_number").values_list("bed_number", flat=True))
+
+    def test_growing_numbers_new_beds_after_the_highest(self):
+        WardBed.objects.get(ward=self.ward, bed_number=4).set_status(WardBed.Status.OCCUPIED)
+
+        resize_ward(self.ward, 6)
+
+        self.assertEqual(self.bed_numbers(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.ward.total_beds, 6)
+        self.assertEqual(counters(self.ward), (5, 0, 1))
+
+    def test_shrinking_removes_the_highest_numbered_beds(self):
+        resize_ward(self.ward, 2)
+
+        self.assertEqual(self.bed_numbers(), [1, 2])
+        self.assertEqual(WardBed.all_objects.filter(ward=self.ward, is_deleted=True).count(), 2)
+        self.assertEqual(self.ward.total_beds, 2)
+        self.assertEqual(counters(self.ward), (2, 0, 0))
+
+        # Regrowing after a shrink keeps numbers unique among live beds
+        resize_ward(self.ward, 3)
+        self.assertEqual(self.bed_numbers(), [1, 2, 3])
+
+    def test_shrinking_refuses_to_remove_beds_in_use(self):
+        WardBed.objects.get(ward=self.ward, bed_number=3).set_status(WardBed.Status.REQUESTED)
+        WardBed.objects.get(ward=self.ward, bed_number=4).set_status(WardBed.Status.OCCUPIED)
+
+        with self.assertRaisesMessage(ValidationError, "3, 4"):
+            resize_ward(self.ward, 2)
+
+        self.assertEqual(self.bed_numbers(), [1, 2, 3, 4])
+        self.assertEqual(self.ward.total_beds, 4)
+        self.assertEqual(counters(self.ward), (2, 1, 1))
+
+    def test_negative_size_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            resize_ward(self.ward, -1)
+
+class WardPermissionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital = create_hospital()
+        cls.nurse = User.objects.create(email="nurse@docuhealth.local", role=User.Role.HOSPITAL_STAFF, is_active=True)
+        HospitalStaffProfile.objects.create(
+            user=cls.nurse, hospital=cls.hospital, firstname="Test", lastname="Nurse",
+            phone_num="08000000000", role=HospitalStaffProfile.StaffRole.NURSE, gender="female",
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.ward = create_ward(self.hospital, 4)
+        self.url = f"/api/hospitals/wards/{self.ward.id}"
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=bearer(user))
+        return client
+
+    def test_staff_can_view_but_not_change_or_delete_a_ward(self):
+        client = self.client_for(self.nurse)
+
+        self.assertEqual(client.get(self.url).status_code, 200)
+        self.assertEqual(client.patch(self.url, {"total_beds": 10}, format="json").status_code, 403)
+        self.assertEqual(client.delete(self.url).status_code, 403)
+
+        self.ward.refresh_from_db()
+        self.assertEqual((self.ward.total_beds, self.ward.is_deleted), (4, False))
+        self.assertEqual(WardBed.objects.filter(ward=self.ward).count(), 4)
+
+    def test_hospital_admin_can_resize_and_delete_a_ward(self):
+        client = self.client_for(self.hospital.user)
+
+        response = client.patch(self.url, {"total_beds": 6}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(WardBed.objects.filter(ward=self.ward).count(), 6)
+
+        self.assertEqual(client.delete(self.url).status_code, 204)
+        self.assertFalse(HospitalWard.objects.filter(pk=self.ward.pk).exists())
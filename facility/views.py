@@ -1,75 +1,71 @@
+from django.db import transaction
+from django.db.models import Prefetch
+
 from rest_framework import generics
 from rest_framework.exceptions import  ValidationError
+from rest_framework.permissions import SAFE_METHODS
 
 from docuhealth2.permissions import IsAuthenticatedHospitalAdmin, IsAuthenticatedHospitalStaff
+from docuhealth2.views import HospitalScopedMixin
 
 from drf_spectacular.utils import extend_schema
 
 from .models import HospitalWard, WardBed
 from .serializers  import WardSerializer, WardBedSerializer
-
-from accounts.models import User
+from .services import provision_ward, resize_ward
 
 @extend_schema(tags=["Hospital"])
-class ListCreateWardsView(generics.ListCreateAPIView):
+class ListCreateWardsView(HospitalScopedMixin, generics.ListCreateAPIView):
     serializer_class = WardSerializer
     permission_classes = [IsAuthenticatedHospitalAdmin | IsAuthenticatedHospitalStaff]
+    authenticate_from_claims = True
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.role == User.Role.HOSPITAL:
-            hospital = self.request.user.hospital_profile
-        else:
-            hospital = self.request.user.hospital_staff_profile.hospital
-            
-        return HospitalWard.objects.filter(hospital=hospital).order_by('created_at')
+        return self.scope_to_hospital(HospitalWard.objects).prefetch_related(
+            Prefetch("beds", queryset=WardBed.objects.order_by("bed_number"))
+        ).order_by('created_at')
     
     def perform_create(self, serializer):
-        user = self.request.user
-        
-        if user.role == User.Role.HOSPITAL:
-            hospital = self.request.user.hospital_profile
-        else:
-            hospital = self.request.user.hospital_staff_profile.hospital
-            
-        ward = serializer.save(hospital=hospital)
-        
-        for num in range(1, ward.total_beds + 1):
-            WardBed.objects.create(
-                ward=ward,
-                bed_number=str(num)
-            )
+        provision_ward(serializer, hospital=self.get_hospital())
         
 @extend_schema(tags=["Hospital Admin"], summary="Retrieve(get), update(patch) or delete(delete) a specific ward")
-class RetrieveUpdateDeleteWardView(generics.RetrieveUpdateDestroyAPIView):
+class RetrieveUpdateDeleteWardView(HospitalScopedMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = WardSerializer
     permission_classes = [IsAuthenticatedHospitalAdmin | IsAuthenticatedHospitalStaff]
     http_method_names = ["get", "patch", "delete"]
+    lookup_url_kwarg = "ward_id"
+    
+    def get_permissions(self):
+        # Staff can view a ward; only the hospital admin can resize or delete it
+        if self.request.method not in SAFE_METHODS:
+            return [IsAuthenticatedHospitalAdmin()]
+        return super().get_permissions()
     
     def get_queryset(self):
-        return HospitalWard.objects.filter(hospital=self.request.user.hospital_profile)
+        return self.scope_to_hospital(HospitalWard.objects)
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        total_beds = serializer.validated_data.pop("total_beds", None)
+        ward = serializer.save()
+        
+        if total_beds is not None and total_beds != ward.total_beds:
+            resize_ward(ward, total_beds)
 
 @extend_schema(tags=["Hospital"])
-class ListBedsByWardView(generics.ListAPIView):
+class ListBedsByWardView(HospitalScopedMixin, generics.ListAPIView):
     serializer_class = WardBedSerializer
     permission_classes = [IsAuthenticatedHospitalAdmin | IsAuthenticatedHospitalStaff]
+    authenticate_from_claims = True
     pagination_class = None
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.role == User.Role.HOSPITAL:
-            hospital = self.request.user.hospital_profile
-        else:
-            hospital = self.request.user.hospital_staff_profile.hospital
-            
         ward_id = self.kwargs["ward_id"]
         
         if not ward_id:
             raise ValidationError("Ward ID should be provided")
         
-        ward = HospitalWard.objects.filter(id=ward_id, hospital=hospital).first()
+        ward = self.scope_to_hospital(HospitalWard.objects).filter(id=ward_id).first()
         if not ward:
             raise ValidationError("Ward with the provided ID not found")
         
@@ -0,0 +1,98 @@
+import secrets
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User, PatientProfile, HospitalStaffProfile
+from organizations.models import HospitalProfile
+from hospital_ops.models import HospitalPatientActivity
+from hospital_ops.views import ListRecentPatientsView
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Benchmarks ListRecentPatientsView at increasing depths: page-number (OFFSET + COUNT) vs cursor pagination'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Activity rows to seed')
+        parser.add_argument('--size', type=int, default=20, help='Page size')
+        parser.add_argument('--repeat', type=int, default=3, help='Requests per measurement; the fastest is reported')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['size'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, size, repeat):
+        receptionist = self.seed(rows)
+        view = ListRecentPatientsView.as_view()
+        factory = APIRequestFactory()
+
+        def fetch(params):
+            request = factory.get('/api/receptionists/dashboard/patients', params)
+            force_authenticate(request, user=receptionist)
+            best, queries = None, 0
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = view(request)
+                    elapsed = time.perf_counter() - start
+                assert response.status_code == 200, response.data
+                best = elapsed if best is None else min(best, elapsed)
+                queries = len(captured)
+            return best, queries
+
+        last_page = max(rows // size, 1)
+        depths = sorted({1, 10, 100, 1_000, last_page // 2, last_page} & set(range(1, last_page + 1)))
+        activities = HospitalPatientActivity.objects.filter(hospital=receptionist.hospital_staff_profile.hospital).order_by('-created_at', '-id')
+
+        self.stdout.write(f"{rows:,} activity rows, {size} per page")
+        for page in depths:
+            offset_time, offset_queries = fetch({'page': page, 'size': size})
+
+            params = {'pagination': 'cursor', 'size': size}
+            if page > 1:
+                # The cursor a client would hold after walking to this page.
+                boundary = activities[(page - 1) * size - 1]
+                params['cursor'] = ListRecentPatientsView.pagination_class.paginators['cursor']().encode_cursor(boundary)
+            cursor_time, cursor_queries = fetch(params)
+
+            self.stdout.write(
+                f"page {page:>8,}: page-number {offset_time * 1000:8.1f} ms ({offset_queries} queries)   "
+                f"cursor {cursor_time * 1000:8.1f} ms ({cursor_queries} queries)"
+            )
+
+        self.stdout.write(self.style.SUCCESS('Done (all rows rolled back)'))
+
+    def seed(self, rows):
+        tag = secrets.token_hex(6)
+        hospital_user = User.objects.create(email=f"bench-{tag}@docuhealth.local", role=User.Role.HOSPITAL)
+        hospital = HospitalProfile.objects.create(user=hospital_user, name="Benchmark Hospital")
+
+        staff_user = User.objects.create(email=f"bench-{tag}-reception@docuhealth.local", role=User.Role.HOSPITAL_STAFF)
+        staff = HospitalStaffProfile.objects.create(
+            user=staff_user, hospital=hospital, firstname="Bench", lastname="Reception",
+            phone_num="", gender="female", role=HospitalStaffProfile.StaffRole.RECEPTIONIST,
+        )
+
+        patient_user = User.objects.create(email=f"bench-{tag}-patient@docuhealth.local", role=User.Role.PATIENT)
+        patient = PatientProfile.objects.create(user=patient_user, firstname="Bench", lastname="Patient", dob="1990-01-01", gender="male")
+
+        start = time.perf_counter()
+        batch = 10_000
+        for offset in range(0, rows, batch):
+            HospitalPatientActivity.objects.bulk_create(
+                HospitalPatientActivity(hospital=hospital, staff=staff, patient=patient, action="Checked in")
+                for _ in range(min(batch, rows - offset))
+            )
+        self.stdout.write(f"Seeded {rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+        return staff_user
@@ -0,0 +1,94 @@
+import secrets
+from contextlib import nullcontext
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User, HospitalStaffProfile
+from organizations.models import HospitalProfile
+from facility.models import HospitalWard
+from docuhealth2.tenancy import attach_tenant
+
+class Rollback(Exception):
+    pass
+
+class LegacyJWTAuthentication(JWTAuthentication):
+    """The previous behaviour: a bare user row, with profile and hospital fetched lazily on first use."""
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            attach_tenant(request, result[0])
+        return result
+
+StaffRole = HospitalStaffProfile.StaffRole
+
+ENDPOINTS = [
+    ("hospital", "/api/hospitals/appointments"),
+    ("hospital", "/api/hospitals/team-members"),
+    ("hospital", "/api/hospitals/wards"),
+    (StaffRole.RECEPTIONIST, "/api/receptionists/dashboard"),
+    (StaffRole.RECEPTIONIST, "/api/receptionists/patients/recent"),
+    (StaffRole.RECEPTIONIST, "/api/receptionists/appointments/upcoming"),
+    (StaffRole.NURSE, "/api/nurses/dashboard"),
+    (StaffRole.NURSE, "/api/nurses/admissions"),
+    (StaffRole.DOCTOR, "/api/doctors/dashboard"),
+    (StaffRole.DOCTOR, "/api/doctors/appointments/upcoming"),
+]
+
+class Command(BaseCommand):
+    help = 'Counts queries on typical hospital and staff endpoints with lazy tenant lookups vs the joined tenant context'
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run()
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self):
+        users = self.seed()
+        client = Client()
+
+        self.stdout.write(f"{'endpoint':<45} {'lazy':>5} {'joined':>7}")
+        for who, url in ENDPOINTS:
+            headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(users[who])}"}
+            view_class = resolve(url).func.cls
+
+            counts = []
+            for authentication in (LegacyJWTAuthentication, None):
+                patch = mock.patch.object(view_class, "authentication_classes", [authentication]) if authentication else nullcontext()
+                with patch, CaptureQueriesContext(connection) as queries:
+                    response = client.get(url, **headers)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{url} returned {response.status_code}: {response.content[:200]}")
+                counts.append(len(queries))
+
+            self.stdout.write(f"{url:<45} {counts[0]:>5} {counts[1]:>7}")
+
+        self.stdout.write(self.style.SUCCESS('Done (all rows rolled back)'))
+
+    def seed(self):
+        tag = secrets.token_hex(6)
+        hospital_user = User.objects.create(email=f"bench-{tag}@docuhealth.local", role=User.Role.HOSPITAL, is_active=True)
+        hospital = HospitalProfile.objects.create(user=hospital_user, name="Benchmark Hospital")
+        ward = HospitalWard.objects.create(name="Bench Ward", hospital=hospital, total_beds=0)
+
+        users = {"hospital": hospital_user}
+        for role in (StaffRole.RECEPTIONIST, StaffRole.NURSE, StaffRole.DOCTOR):
+            user = User.objects.create(email=f"bench-{tag}-{role}@docuhealth.local", role=User.Role.HOSPITAL_STAFF, is_active=True)
+            HospitalStaffProfile.objects.create(
+                user=user, hospital=hospital, ward=ward if role == StaffRole.NURSE else None,
+                firstname="Bench", lastname=role.label, phone_num="", gender="female", role=role,
+            )
+            users[role] = user
+
+        return users
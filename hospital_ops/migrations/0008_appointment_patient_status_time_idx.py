@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_patientprofile_last_completed_at'),
+        ('hospital_ops', '0007_alter_appointment_discharge_form_and_more'),
+        ('organizations', '0016_alter_hospitalprofile_notification_settings'),
+        ('records', '0016_attachmentuploadjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'status', 'scheduled_time'], name='appointment_patient_db427a_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_last_completed_at(apps, schema_editor):
+    Appointment = apps.get_model('hospital_ops', 'Appointment')
+    PatientProfile = apps.get_model('accounts', 'PatientProfile')
+
+    latest = (
+        Appointment.objects
+        .filter(patient=OuterRef('pk'), status='completed', is_deleted=False)
+        .order_by('-scheduled_time')
+        .values('scheduled_time')[:1]
+    )
+    PatientProfile.objects.update(last_completed_at=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_patientprofile_last_completed_at'),
+        ('hospital_ops', '0008_appointment_patient_status_time_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_last_completed_at, migrations.RunPython.noop),
+    ]
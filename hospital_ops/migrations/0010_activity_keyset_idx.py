@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_patientprofile_last_completed_at'),
+        ('hospital_ops', '0009_backfill_last_completed_at'),
+        ('organizations', '0016_alter_hospitalprofile_notification_settings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hospitalpatientactivity',
+            index=models.Index(fields=['hospital', 'created_at', 'id'], name='hospitals_h_hospita_f1bd56_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_patient_search_indexes'),
+        ('hospital_ops', '0010_activity_keyset_idx'),
+        ('organizations', '0017_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hospitalpatientactivity',
+            index=models.Index(fields=['hospital', 'patient'], name='hospitals_h_hospita_cdc1c1_idx'),
+        ),
+    ]
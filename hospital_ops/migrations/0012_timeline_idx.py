@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_patient_search_indexes'),
+        ('hospital_ops', '0011_activity_hospital_patient_idx'),
+        ('organizations', '0017_webhookevent'),
+        ('records', '0017_vitalsigns_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'created_at', 'id'], name='appointment_patient_e532b0_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Case, When, F, Max, Window, ValueRange, WindowFrameExclusion, OuterRef, Subquery
 
 from docuhealth2.models import BaseModel
 
@@ -18,8 +19,74 @@ class HospitalPatientActivity(BaseModel):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['hospital', 'staff', 'created_at']),
+            models.Index(fields=['hospital', 'created_at', 'id']),
+            models.Index(fields=['hospital', 'patient']),
         ]
         
+def attach_last_visited(appointments):
+    """
+    Sets `last_visited` on each appointment: the latest COMPLETED appointment of the same
+    patient, at any hospital, scheduled strictly before it. Rows scheduled after the patient's
+    `last_completed_at` are answered from that field (when the patient was select_related);
+    the rest take a single window query, so a page costs one query however long it is.
+    """
+    remaining = []
+    for appointment in appointments:
+        appointment.last_visited = None
+        if not appointment.patient_id:
+            continue
+
+        if Appointment.patient.is_cached(appointment):
+            last_completed_at = appointment.patient.last_completed_at
+            if last_completed_at is None:
+                continue
+            if appointment.scheduled_time > last_completed_at:
+                appointment.last_visited = last_completed_at
+                continue
+
+        remaining.append(appointment)
+
+    if not remaining:
+        return
+
+    ids = [appointment.id for appointment in remaining]
+    patient_ids = {appointment.patient_id for appointment in remaining}
+    last_completed = Window(
+        Max(Case(When(status=Appointment.Status.COMPLETED, then=F('scheduled_time')))),
+        partition_by=F('patient_id'),
+        order_by=F('scheduled_time').asc(),
+        frame=ValueRange(start=None, end=0, exclusion=WindowFrameExclusion.GROUP),
+    )
+    windowed = (
+        Appointment.objects
+        .filter(models.Q(status=Appointment.Status.COMPLETED) | models.Q(id__in=ids), patient_id__in=patient_ids)
+        .annotate(last_visited=last_completed, row_id=Window(Max('id'), partition_by=F('id')))
+        # Filtering on a window annotation is applied after the window is computed.
+        .filter(row_id__in=ids)
+        .values_list('id', 'last_visited')
+    )
+    last_visits = dict(windowed)
+
+    for appointment in remaining:
+        appointment.last_visited = last_visits.get(appointment.id)
+
+def refresh_last_completed(patient_ids):
+    """
+    Recomputes PatientProfile.last_completed_at for the given patients in one UPDATE. The value
+    spans every hospital, matching `last_visited`; there is no per-hospital counterpart.
+    """
+    patient_ids = [patient_id for patient_id in patient_ids if patient_id]
+    if not patient_ids:
+        return
+
+    latest = (
+        Appointment.objects
+        .filter(patient=OuterRef('pk'), status=Appointment.Status.COMPLETED)
+        .order_by('-scheduled_time')
+        .values('scheduled_time')[:1]
+    )
+    PatientProfile.all_objects.filter(pk__in=patient_ids).update(last_completed_at=Subquery(latest))
+
 class Appointment(BaseModel):
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
@@ -44,10 +111,34 @@ class Appointment(BaseModel):
     
     class Meta:
         db_table = 'appointments_appointment'
+        indexes = [
+            models.Index(fields=['patient', 'status', 'scheduled_time']),
+            models.Index(fields=['patient', 'created_at', 'id']),
+        ]
         
     def __str__(self):
         return f"Appointment for {self.patient} with {self.staff} at {self.scheduled_time}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded = (instance.__dict__.get('patient_id'), instance.__dict__.get('status'))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        
+        loaded_patient_id, loaded_status = getattr(self, '_loaded', (None, None))
+        if self.Status.COMPLETED in (self.status, loaded_status):
+            refresh_last_completed({self.patient_id, loaded_patient_id})
+        self._loaded = (self.patient_id, self.status)
+        
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        if self.status == self.Status.COMPLETED:
+            refresh_last_completed({self.patient_id})
+        return result
+    
 class HandOverLog(BaseModel):
     from_nurse = models.ForeignKey(HospitalStaffProfile, related_name='handovers_given', on_delete=models.CASCADE)
     to_nurse = models.ForeignKey(HospitalStaffProfile, related_name='handovers_received', on_delete=models.CASCADE)
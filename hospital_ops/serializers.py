@@ -6,15 +6,16 @@ from accounts.models import PatientProfile, HospitalStaffProfile
 from accounts.serializers import PatientFullInfoSerializer, PatientBasicInfoSerializer, HospitalStaffBasicInfoSerializer, HospitalStaffInfoSerilizer
 
 from organizations.serializers import HospitalBasicInfoSerializer
-from organizations.models import HospitalProfile
 
 from facility.models import HospitalWard, WardBed
 
 from records.models import Admission
 # from records.serializers import AdmissionSerializer
 
+from docuhealth2.utils.hin import HINRelatedField
+
 class HospitalAppointmentSerializer(serializers.ModelSerializer):
-    last_visited = serializers.DateTimeField(read_only=True)
+    last_visited = serializers.DateTimeField(read_only=True, default=None)
     staff = HospitalStaffBasicInfoSerializer(read_only=True)
     patient = PatientFullInfoSerializer(read_only=True)
     
@@ -28,7 +29,7 @@ class HospitalAppointmentSerializer(serializers.ModelSerializer):
 class HospitalActivitySerializer(serializers.ModelSerializer):
     staff_id = serializers.SlugRelatedField(slug_field="staff_id", source="staff", queryset=HospitalStaffProfile.objects.all(), write_only=True)
     staff = HospitalStaffBasicInfoSerializer(read_only=True)
-    patient_hin = serializers.SlugRelatedField(slug_field="hin", source="patient", queryset=PatientProfile.objects.all(), write_only=True)
+    patient_hin = HINRelatedField(source="patient", queryset=PatientProfile.objects.all(), write_only=True)
     patient = PatientBasicInfoSerializer(read_only=True)
 
     class Meta:
@@ -42,55 +43,22 @@ class AssignAppointmentToDoctorSerializer(serializers.ModelSerializer):
         model = Appointment
         fields = ['note', 'type', 'scheduled_time', 'doctor_id']
         
-class AppointmentSerializer(serializers.ModelSerializer):
-    last_visited = serializers.SerializerMethodField(read_only=True)
-    
-    staff_info = HospitalStaffBasicInfoSerializer(read_only=True, source="staff")
-    hospital_info  = HospitalBasicInfoSerializer(read_only=True, source="hospital")
-    class Meta:
-        model = Appointment
-        fields = ['id', 'status', 'scheduled_time', 'staff_info', 'hospital_info', 'last_visited']
-        read_only_fields = fields
-        
-    def get_last_visited(self, obj):
-        last_completed_appointment = Appointment.objects.filter(patient=obj.patient, status=Appointment.Status.COMPLETED, scheduled_time__lt=obj.scheduled_time).order_by('-scheduled_time').first()
-        return last_completed_appointment.scheduled_time if last_completed_appointment else None
-    
 class RecordAppointmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = ['type', 'note', 'scheduled_time']
         read_only_fields = ['created_at', 'updated_at', 'id', 'status']
         
-class AppointmentHospitalSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = HospitalProfile
-        fields = ['hin', 'name']
-        
 class AppointmentPatientSerializer(serializers.ModelSerializer):
     class Meta:
         model = PatientProfile
         fields = ['hin', 'firstname', 'lastname', 'gender']
         
-class PatientAppointmentSerializer(serializers.ModelSerializer):
-    last_visited = serializers.SerializerMethodField(read_only=True)
-    staff = HospitalStaffBasicInfoSerializer(read_only=True)
-    hospital = AppointmentHospitalSerializer(read_only=True)
-    
-    class Meta:
-        model = Appointment
-        fields = ['id', 'status', 'scheduled_time', 'staff', 'hospital', 'last_visited']
-        read_only_fields = fields
-        
-    def get_last_visited(self, obj):
-        last_completed_appointment = Appointment.objects.filter(patient=obj.patient, status=Appointment.Status.COMPLETED, scheduled_time__lt=obj.scheduled_time).order_by('-scheduled_time').first()
-        return last_completed_appointment.scheduled_time if last_completed_appointment else None
-    
 class BookAppointmentSerializer(serializers.ModelSerializer):
     staff = serializers.SlugRelatedField(slug_field="staff_id", queryset=HospitalStaffProfile.objects.all(), write_only=True)
     staff_info = HospitalStaffInfoSerilizer(read_only=True, source="staff")
     
-    patient = serializers.SlugRelatedField(slug_field="hin", queryset=PatientProfile.objects.all(), write_only=True)
+    patient = HINRelatedField(queryset=PatientProfile.objects.all(), write_only=True)
     patient_info = PatientBasicInfoSerializer(read_only=True, source="patient")
     
     class Meta:
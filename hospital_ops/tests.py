@@ -1,3 +1,188 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from accounts.models import User, PatientProfile, HospitalStaffProfile
+from accounts.serializers import CustomTokenObtainPairSerializer
+from organizations.models import HospitalProfile
+
+from .models import Appointment, HospitalPatientActivity
+
+PAGE_SIZE = 10
+
+def bearer(user):
+    return f"Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}"
+
+def staff_member(hospital, email, role):
+    return HospitalStaffProfile.objects.create(
+        user=User.objects.create(email=email, role=User.Role.HOSPITAL_STAFF, is_active=True),
+        hospital=hospital, firstname="Test", lastname=role.title(), phone_num="08000000000", role=role, gender="female",
+    )
+
+class AppointmentListQueryCountTests(TestCase):
+    """
+    Each list costs the same handful of queries however many rows are on the page: the
+    COUNT, the page (joined with staff, patient, hospital and their users) and at most
+    one window query for `last_visited`. Authentication comes from the token's claims.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email="hospital@docuhealth.local", role=User.Role.HOSPITAL, is_active=True), name="Test Hospital"
+        )
+        cls.doctor = staff_member(cls.hospital, "doctor@docuhealth.local", HospitalStaffProfile.StaffRole.DOCTOR)
+        cls.receptionist = staff_member(cls.hospital, "receptionist@docuhealth.local", HospitalStaffProfile.StaffRole.RECEPTIONIST)
+
+        now = timezone.now()
+        cls.patients = []
+        for index in range(PAGE_SIZE + 2):
+            patient = PatientProfile.objects.create(
+                user=User.objects.create(email=f"patient-{index}@docuhealth.local", role=User.Role.PATIENT, is_active=True),
+                firstname="Test", lastname=f"Patient {index}", dob=date(1990, 1, 1), gender="male",
+            )
+            cls.patients.append(patient)
+
+            for days, status in ((-30, Appointment.Status.COMPLETED), (-10, Appointment.Status.CANCELLED), (-5, Appointment.Status.COMPLETED), (7, Appointment.Status.PENDING)):
+                Appointment.objects.create(
+                    patient=patient, hospital=cls.hospital, staff=cls.doctor, status=status, scheduled_time=now + timedelta(days=days, minutes=index),
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_page_queries(self, url, user, expected):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=bearer(user))
+        # The first request caches the user's token version
+        client.get(url)
+
+        with self.assertNumQueries(expected):
+            response = client.get(url)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(response.data["results"]), PAGE_SIZE)
+        return response.data["results"]
+
+    def test_hospital_appointments(self):
+        self.assert_page_queries("/api/hospitals/appointments", self.hospital.user, 3)
+
+    def test_doctor_upcoming_appointments(self):
+        # Every upcoming appointment is after the patient's last completed one: no window query
+        results = self.assert_page_queries("/api/doctors/appointments/upcoming", self.doctor.user, 2)
+        self.assertTrue(all(row["last_visited"] is not None for row in results))
+
+    def test_doctor_appointment_history(self):
+        self.assert_page_queries("/api/doctors/appointments/history", self.doctor.user, 3)
+
+    def test_receptionist_upcoming_appointments(self):
+        self.assert_page_queries("/api/receptionists/appointments/upcoming", self.receptionist.user, 2)
+
+    def test_patient_appointments(self):
+        patient = self.patients[0]
+        for days in range(1, PAGE_SIZE):
+            Appointment.objects.create(patient=patient, hospital=self.hospital, staff=self.doctor, scheduled_time=timezone.now() + timedelta(days=days))
+
+        # Newest first, so the page is the upcoming appointments: no window query
+        self.assert_page_queries("/api/patients/appointments", patient.user, 2)
+
+    def test_last_visited_is_the_latest_earlier_completed_appointment(self):
+        results = self.assert_page_queries("/api/hospitals/appointments", self.hospital.user, 3)
+
+        by_id = {appointment.id: appointment for appointment in Appointment.objects.filter(id__in=[row["id"] for row in results])}
+        for row in results:
+            appointment = by_id[row["id"]]
+            earlier = Appointment.objects.filter(
+                patient=appointment.patient, status=Appointment.Status.COMPLETED, scheduled_time__lt=appointment.scheduled_time,
+            ).order_by("-scheduled_time").first()
+            expected = earlier.scheduled_time if earlier else None
+            self.assertEqual(row["last_visited"], expected and expected.isoformat().replace("+00:00", "Z"))
+
+class LastCompletedTests(TestCase):
+    def setUp(self):
+        self.hospitals = [
+            HospitalProfile.objects.create(user=User.objects.create(email=f"hospital-{index}@docuhealth.local", role=User.Role.HOSPITAL), name=f"Hospital {index}")
+            for index in range(2)
+        ]
+        self.patient = PatientProfile.objects.create(
+            user=User.objects.create(email="patient@docuhealth.local", role=User.Role.PATIENT),
+            firstname="Test", lastname="Patient", dob=date(1990, 1, 1), gender="male",
+        )
+        self.now = timezone.now()
+
+    def last_completed_at(self):
+        self.patient.refresh_from_db()
+        return self.patient.last_completed_at
+
+    def test_follows_completed_appointments_at_every_hospital(self):
+        earlier = Appointment.objects.create(patient=self.patient, hospital=self.hospitals[0], scheduled_time=self.now - timedelta(days=9), status=Appointment.Status.COMPLETED)
+        later = Appointment.objects.create(patient=self.patient, hospital=self.hospitals[1], scheduled_time=self.now - timedelta(days=2))
+        self.assertEqual(self.last_completed_at(), earlier.scheduled_time)
+
+        # Completing a visit at another hospital moves the value for both hospitals' lists
+        later.status = Appointment.Status.COMPLETED
+        later.save()
+        self.assertEqual(self.last_completed_at(), later.scheduled_time)
+
+        later.status = Appointment.Status.CANCELLED
+        later.save()
+        self.assertEqual(self.last_completed_at(), earlier.scheduled_time)
+
+        earlier.delete()
+        self.assertIsNone(self.last_completed_at())
+
+class RecentPatientsPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email="hospital@docuhealth.local", role=User.Role.HOSPITAL, is_active=True), name="Test Hospital"
+        )
+        cls.receptionist = staff_member(hospital, "receptionist@docuhealth.local", HospitalStaffProfile.StaffRole.RECEPTIONIST)
+        patient = PatientProfile.objects.create(
+            user=User.objects.create(email="patient@docuhealth.local", role=User.Role.PATIENT, is_active=True),
+            firstname="Test", lastname="Patient", dob=date(1990, 1, 1), gender="male",
+        )
+        activities = [HospitalPatientActivity.objects.create(hospital=hospital, staff=cls.receptionist, patient=patient, action="check_patient_info") for _ in range(7)]
+
+        # Five rows share one timestamp, so pages must break ties on id
+        now = timezone.now()
+        HospitalPatientActivity.objects.filter(id__in=[activity.id for activity in activities[:5]]).update(created_at=now)
+        HospitalPatientActivity.objects.filter(id=activities[5].id).update(created_at=now + timedelta(seconds=1))
+        HospitalPatientActivity.objects.filter(id=activities[6].id).update(created_at=now - timedelta(seconds=1))
+        cls.expected = list(HospitalPatientActivity.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=bearer(self.receptionist.user))
+
+    def get(self, url):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_cursor_pages_resume_exactly_across_tied_timestamps(self):
+        seen, url, pages = [], "/api/receptionists/patients/recent?pagination=cursor&size=2", 0
+        while url:
+            page = self.get(url)
+            self.assertNotIn("count", page)
+            seen.extend(row["id"] for row in page["results"])
+            url, pages = page["next"], pages + 1
+
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 4)
+
+    def test_page_mode_is_the_default_and_can_be_requested(self):
+        for url in ("/api/receptionists/patients/recent?size=3", "/api/receptionists/patients/recent?pagination=page&size=3"):
+            page = self.get(url)
+            self.assertEqual(page["count"], 7)
+            self.assertEqual(len(page["results"]), 3)
+            self.assertEqual(page["results"][0]["id"], self.expected[0])
 
-# Create your tests here.
+    def test_bad_cursor_or_mode_is_a_404(self):
+        for query in ("pagination=cursor&cursor=not-a-cursor", "pagination=cursor&cursor=eyJ0IjoieCJ9", "pagination=sideways"):
+            self.assertEqual(self.api.get(f"/api/receptionists/patients/recent?{query}").status_code, 404, query)
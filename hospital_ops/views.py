@@ -1,102 +1,85 @@
 from django.db import transaction
-from django.db.models import OuterRef, Subquery, Q
+from django.db.models import Q
 from django.utils import timezone
 
 from rest_framework import generics, status
 from rest_framework.response import Response
 
 from docuhealth2.permissions import IsAuthenticatedHospitalAdmin, IsAuthenticatedHospitalStaff, IsAuthenticatedNurse, IsAuthenticatedPatient, IsAuthenticatedReceptionist, IsAuthenticatedDoctor
-from docuhealth2.utils.email_service import BrevoEmailService
+from docuhealth2.utils.email_service import QueuedEmailService
+from docuhealth2.pagination import SelectablePagination
 
-from .models import Appointment, HospitalPatientActivity, HandOverLog
+from .models import Appointment, HospitalPatientActivity, HandOverLog, attach_last_visited
 from .serializers import HospitalAppointmentSerializer, AssignAppointmentToDoctorSerializer, HospitalActivitySerializer, HospitalAppointmentSerializer, BookAppointmentSerializer, HandOverLogSerializer, TransferPatientToWardSerializer
 
 from drf_spectacular.utils import extend_schema
 
-from accounts.models import User
 from records.models import Admission
 from facility.models import WardBed
 
-mailer = BrevoEmailService()
+mailer = QueuedEmailService()
+
+class AppointmentListView(generics.ListAPIView):
+    """Attaches `last_visited` to the fetched page of appointments with one extra query."""
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            attach_last_visited(page)
+        return page
 
 @extend_schema(tags=["Hospital"], summary="List all appointments for the hospital")
-class ListAllAppointmentsView(generics.ListAPIView):
+class ListAllAppointmentsView(AppointmentListView):
     serializer_class = HospitalAppointmentSerializer
     permission_classes = [IsAuthenticatedHospitalAdmin | IsAuthenticatedHospitalStaff]
+    authenticate_from_claims = True
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.role == User.Role.HOSPITAL:
-            hospital = user.hospital_profile
-        else:
-            hospital = user.hospital_staff_profile.hospital
-            
-        last_appointment_subquery = Appointment.objects.filter(
-            patient=OuterRef('patient'),
-            status=Appointment.Status.COMPLETED,    
-            scheduled_time__lt=OuterRef('scheduled_time')
-        ).order_by('-scheduled_time').values('scheduled_time')[:1]
+        hospital = self.request.hospital
             
-        return Appointment.objects.filter(hospital=hospital).select_related('staff', 'patient', 'patient__user', 'hospital').annotate(last_visited=Subquery(last_appointment_subquery)).order_by('scheduled_time')
+        return Appointment.objects.filter(hospital=hospital).select_related('staff', 'patient', 'patient__user', 'hospital', 'hospital__user').order_by('scheduled_time')
         
 @extend_schema(tags=["Nurse", "Doctor"], summary="List upcoming appointments assigned to this staff")
-class ListStaffUpcomingAppointmentsView(generics.ListAPIView):
+class ListStaffUpcomingAppointmentsView(AppointmentListView):
     serializer_class = HospitalAppointmentSerializer
     permission_classes = [IsAuthenticatedNurse | IsAuthenticatedDoctor]
+    authenticate_from_claims = True
 
     def get_queryset(self):
-        user = self.request.user
-        if not hasattr(user, 'hospital_staff_profile'):
+        staff = self.request.staff
+        if staff is None:
             return Appointment.objects.none()
             
-        staff = user.hospital_staff_profile
         now = timezone.now()
         
-        last_appointment_subquery = Appointment.objects.filter(
-            patient=OuterRef('patient'),
-            status=Appointment.Status.COMPLETED,
-            scheduled_time__lt=OuterRef('scheduled_time')
-        ).order_by('-scheduled_time').values('scheduled_time')[:1]
-
         return Appointment.objects.filter(
             staff=staff,
             scheduled_time__gte=now,
             status=Appointment.Status.PENDING
         ).select_related(
-            'staff', 'patient', 'patient__user', 'hospital'
-        ).annotate(
-            last_visited=Subquery(last_appointment_subquery) 
+            'staff', 'patient', 'patient__user', 'hospital', 'hospital__user'
         ).order_by('scheduled_time')
     
 @extend_schema(tags=["Nurse", "Doctor"], summary="List past appointments assigned to this staff")
-class ListStaffAppointmentHistoryView(generics.ListAPIView):
+class ListStaffAppointmentHistoryView(AppointmentListView):
     serializer_class = HospitalAppointmentSerializer
     permission_classes = [IsAuthenticatedNurse | IsAuthenticatedDoctor]
+    authenticate_from_claims = True
 
     def get_queryset(self):
-        user = self.request.user
-        if not hasattr(user, 'hospital_staff_profile'):
+        staff = self.request.staff
+        if staff is None:
             return Appointment.objects.none()
             
-        staff = user.hospital_staff_profile
         now = timezone.now()
 
-        last_appointment_subquery = Appointment.objects.filter(
-            patient=OuterRef('patient'),
-            status=Appointment.Status.COMPLETED,
-            scheduled_time__lt=OuterRef('scheduled_time')
-        ).order_by('-scheduled_time').values('scheduled_time')[:1]
-        
         return Appointment.objects.filter(
             staff=staff
         ).filter(
             Q(scheduled_time__lt=now) | 
             Q(status__in=[Appointment.Status.COMPLETED, Appointment.Status.CANCELLED])
         ).select_related(
-            'staff', 'patient', 'patient__user', 'hospital'
-        ).annotate(
-            last_visited=Subquery(last_appointment_subquery)
+            'staff', 'patient', 'patient__user', 'hospital', 'hospital__user'
         ).order_by('-scheduled_time')
     
 @extend_schema(tags=["Nurse"], summary="Assign appointment to a doctor")
@@ -106,54 +89,46 @@ class AssignAppointmentToDoctorView(generics.UpdateAPIView):
     http_method_names = ['patch']
     
     def get_queryset(self):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         return Appointment.objects.filter(staff=staff, hospital=hospital)
     
 @extend_schema(tags=["Patient"], summary="List appointments for the patient")
-class ListPatientAppointmentsView(generics.ListAPIView):
+class ListPatientAppointmentsView(AppointmentListView):
     serializer_class = HospitalAppointmentSerializer
     permission_classes = [IsAuthenticatedPatient]
+    authenticate_from_claims = True
     
     def get_queryset(self):
         user = self.request.user
         
-        last_appointment_subquery = Appointment.objects.filter(
-            patient=OuterRef('patient'),
-            status=Appointment.Status.COMPLETED,
-            scheduled_time__lt=OuterRef('scheduled_time')
-        ).order_by('-scheduled_time').values('scheduled_time')[:1]
-        
-        return Appointment.objects.filter(patient=user.patient_profile).select_related('staff', 'patient', 'patient__user', 'hospital').annotate(last_visited=Subquery(last_appointment_subquery)).order_by('-scheduled_time')
+        return Appointment.objects.filter(patient=user.patient_profile).select_related('staff', 'patient', 'patient__user', 'hospital', 'hospital__user').order_by('-scheduled_time')
     
 @extend_schema(tags=["Receptionist"], summary="List recent patient activity on receptionist dashboard")
 class ListRecentPatientsView(generics.ListAPIView):
     serializer_class = HospitalActivitySerializer
     permission_classes = [IsAuthenticatedReceptionist]
+    authenticate_from_claims = True
+    pagination_class = SelectablePagination
     
     def get_queryset(self):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         return HospitalPatientActivity.objects.filter(hospital=hospital).select_related("patient", "staff").order_by("-created_at")
     
 @extend_schema(tags=["Receptionist"], summary="List upcoming appointments on receptionist dashboard")
-class ListUpcomingAppointmentsView(generics.ListAPIView):
+class ListUpcomingAppointmentsView(AppointmentListView):
     serializer_class = HospitalAppointmentSerializer
     permission_classes = [IsAuthenticatedReceptionist]
+    authenticate_from_claims = True
     
     def get_queryset(self):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
-        last_appointment_subquery = Appointment.objects.filter(
-            patient=OuterRef('patient'),
-            status=Appointment.Status.COMPLETED,
-            scheduled_time__lt=OuterRef('scheduled_time')
-        ).order_by('-scheduled_time').values('scheduled_time')[:1]
-        
-        return Appointment.objects.filter(hospital=hospital, status="pending").select_related('staff', 'patient', 'patient__user', 'hospital').annotate(last_visited=Subquery(last_appointment_subquery)).order_by("scheduled_time")
+        return Appointment.objects.filter(hospital=hospital, status="pending").select_related('staff', 'patient', 'patient__user', 'hospital', 'hospital__user').order_by("scheduled_time")
     
 @extend_schema(tags=["Receptionist"], summary="Book an appointment for a patient")
 class BookAppointmentView(generics.CreateAPIView):
@@ -162,10 +137,10 @@ class BookAppointmentView(generics.CreateAPIView):
     
     @transaction.atomic
     def perform_create(self, serializer):
-        appointment = serializer.save(hospital=self.request.user.hospital_staff_profile.hospital)
+        appointment = serializer.save(hospital=self.request.hospital)
         
         patient = appointment.patient
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         HospitalPatientActivity.objects.create(patient=patient, staff=staff, hospital=hospital, action="book_appointment")
@@ -182,7 +157,7 @@ class HandOverNurseShiftView(generics.GenericAPIView):
         
         validated_data = serializer.validated_data
         
-        from_nurse = request.user.hospital_staff_profile
+        from_nurse = request.staff
         to_nurse = validated_data['to_nurse']
         
         items_transferred = {"appointments": [], "admissions": []}
@@ -238,11 +213,8 @@ class TransferPatientToWardView(generics.GenericAPIView):
         admission.bed = new_bed
         admission.save(update_fields=["bed"])
         
-        old_bed.status = WardBed.Status.AVAILABLE
-        old_bed.save(update_fields=["status"])
-        
-        new_bed.status = WardBed.Status.OCCUPIED
-        new_bed.save(update_fields=["status"])
+        old_bed.set_status(WardBed.Status.AVAILABLE)
+        new_bed.set_status(WardBed.Status.OCCUPIED)
         
         return Response({"detail": f"Patient transferred to {new_bed.ward.name} ward successfully."}, status=status.HTTP_200_OK)
     
@@ -0,0 +1,98 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from sentry_sdk import logger as sentry_logger
+
+from notifications.models import OutboundEmail
+from docuhealth2.utils.email_service import get_email_transport
+
+# A claimed email that is still "sending" after this long belongs to a crashed worker.
+SENDING_LEASE = timedelta(minutes=5)
+
+class Command(BaseCommand):
+    help = 'Delivers queued outbound emails in batches, retrying failures with exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails claimed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the queue is empty')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait between polls when looping')
+
+    def handle(self, *args, **options):
+        transport = get_email_transport()
+        batch_size = options['batch_size']
+
+        while True:
+            sent, failed = self.drain_batch(transport, batch_size)
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS('Email queue drained'))
+
+    def claim_batch(self, batch_size):
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                OutboundEmail.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=OutboundEmail.Status.PENDING) | Q(status=OutboundEmail.Status.SENDING),
+                    next_attempt_at__lte=now,
+                )
+                .order_by('next_attempt_at', 'id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            OutboundEmail.objects.filter(id__in=ids).update(
+                status=OutboundEmail.Status.SENDING,
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + SENDING_LEASE,
+            )
+
+        return list(OutboundEmail.objects.filter(id__in=ids).order_by('id'))
+
+    def drain_batch(self, transport, batch_size):
+        sent = failed = 0
+
+        for email in self.claim_batch(batch_size):
+            try:
+                transport.send(subject=email.subject, body=email.body, recipient=email.recipient, is_html=email.is_html)
+            except Exception as e:
+                self.schedule_retry(email, e)
+                failed += 1
+                continue
+
+            email.status = OutboundEmail.Status.SENT
+            email.sent_at = timezone.now()
+            email.last_error = ""
+            email.save(update_fields=['status', 'sent_at', 'last_error'])
+            sent += 1
+
+        return sent, failed
+
+    def schedule_retry(self, email, error):
+        email.last_error = str(error)
+
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = OutboundEmail.Status.FAILED
+            sentry_logger.error(f"Email {email.id} to {email.recipient} failed permanently: {error}", extra={
+                "email_id": email.id,
+                "attempts": email.attempts,
+            })
+        else:
+            delay = min(
+                settings.EMAIL_OUTBOX_BACKOFF_SECONDS * (2 ** (email.attempts - 1)),
+                settings.EMAIL_OUTBOX_MAX_BACKOFF_SECONDS,
+            )
+            email.status = OutboundEmail.Status.PENDING
+            email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+        email.save(update_fields=['status', 'last_error', 'next_attempt_at'])
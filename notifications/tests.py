@@ -0,0 +1,136 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from docuhealth2.utils.email_service import LocalEmailTransport, QueuedEmailService
+
+from .models import OutboundEmail
+
+class FailingTransport:
+    def send(self, subject, body, recipient, is_html=False):
+        raise ConnectionError("Brevo unavailable")
+
+def drain():
+    call_command("send_queued_emails", stdout=StringIO())
+
+class QueuedEmailServiceTests(TestCase):
+    def test_send_queues_a_pending_email(self):
+        email = QueuedEmailService().send("Welcome", "<p>Hi</p>", "ada@example.com", is_html=True)
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+        self.assertEqual((email.recipient, email.subject, email.is_html), ("ada@example.com", "Welcome", True))
+        self.assertEqual(email.attempts, 0)
+
+    def test_send_without_recipient_queues_nothing(self):
+        self.assertIsNone(QueuedEmailService().send("Welcome", "Hi", ""))
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_send_many_skips_blank_recipients(self):
+        QueuedEmailService().send_many([
+            {"subject": "Reminder", "body": "Hi", "recipient": "ada@example.com"},
+            {"subject": "Reminder", "body": "Hi", "recipient": ""},
+            {"subject": "Reminder", "body": "Hi", "recipient": "tunde@example.com"},
+        ])
+
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list("recipient", flat=True)),
+            ["ada@example.com", "tunde@example.com"],
+        )
+
+@override_settings(
+    EMAIL_TRANSPORT="docuhealth2.utils.email_service.LocalEmailTransport",
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_BACKOFF_SECONDS=30,
+    EMAIL_OUTBOX_MAX_BACKOFF_SECONDS=45,
+)
+class SendQueuedEmailsTests(TestCase):
+    def setUp(self):
+        LocalEmailTransport.outbox.clear()
+        self.addCleanup(LocalEmailTransport.outbox.clear)
+
+    def queue(self, **extra):
+        return QueuedEmailService().send("Your OTP", "123456", "ada@example.com", **extra)
+
+    def test_delivers_due_emails(self):
+        email = self.queue()
+
+        drain()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.SENT)
+        self.assertEqual(email.attempts, 1)
+        self.assertIsNotNone(email.sent_at)
+        self.assertEqual(LocalEmailTransport.outbox, [
+            {"subject": "Your OTP", "body": "123456", "recipient": "ada@example.com", "is_html": False},
+        ])
+
+    def test_skips_emails_not_yet_due(self):
+        email = self.queue()
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        drain()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(LocalEmailTransport.outbox, [])
+
+    def test_reclaims_emails_left_sending_by_a_crashed_worker(self):
+        email = self.queue()
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            status=OutboundEmail.Status.SENDING, attempts=1, next_attempt_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        drain()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.SENT)
+        self.assertEqual(email.attempts, 2)
+
+    @override_settings(EMAIL_TRANSPORT="notifications.tests.FailingTransport")
+    def test_failures_back_off_exponentially_then_fail(self):
+        email = self.queue()
+
+        # 30s after the first failure, doubled after the second but capped at 45s
+        for attempt, delay in ((1, 30), (2, 45)):
+            before = timezone.now()
+            drain()
+
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+            self.assertEqual(email.attempts, attempt)
+            self.assertEqual(email.last_error, "Brevo unavailable")
+            self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=delay))
+            self.assertLessEqual(email.next_attempt_at, timezone.now() + timedelta(seconds=delay))
+
+            # Not retried before its backoff is up
+            drain()
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, attempt)
+            OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+        with mock.patch("notifications.management.commands.send_queued_emails.sentry_logger") as logger:
+            drain()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.FAILED)
+        self.assertEqual(email.attempts, 3)
+        logger.error.assert_called_once()
+
+    def test_retried_email_is_delivered_once_the_transport_recovers(self):
+        email = self.queue()
+        with override_settings(EMAIL_TRANSPORT="notifications.tests.FailingTransport"):
+            drain()
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+        drain()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.SENT)
+        self.assertEqual(email.attempts, 2)
+        self.assertEqual(email.last_error, "")
+        self.assertEqual(len(LocalEmailTransport.outbox), 1)
@@ -0,0 +1,65 @@
+import secrets
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from accounts.models import User
+from organizations.models import Client
+from docuhealth2.authentications import ClientHeaderAuthentication, verified_client_cache
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Benchmarks ClientHeaderAuthentication with and without the verified-secret cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Authentications per run')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+
+        try:
+            with transaction.atomic():
+                self.run(total)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, total):
+        user = User.objects.create(email=f"bench-{secrets.token_hex(6)}@docuhealth.local", role=User.Role.PHARMACY_PARTNER)
+        raw_secret = f"dh_sk_{secrets.token_urlsafe(32)}"
+        client = Client(user=user)
+        client.set_secret(raw_secret)
+        client.save()
+
+        request = RequestFactory().post(
+            '/api/partners/drug-records',
+            HTTP_X_CLIENT_ID=str(client.client_id),
+            HTTP_X_CLIENT_SECRET=raw_secret,
+        )
+        auth = ClientHeaderAuthentication()
+
+        def uncached():
+            verified_client_cache.clear()
+            auth.authenticate(request)
+
+        def cached():
+            auth.authenticate(request)
+
+        verified_client_cache.clear()
+        before = self.measure(uncached, total)
+        after = self.measure(cached, total)
+        verified_client_cache.clear()
+
+        self.stdout.write(f"check_password every request: {before:,.1f} req/s")
+        self.stdout.write(f"verified-secret cache:        {after:,.1f} req/s")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {after / before:,.1f}x over {total} requests"))
+
+    def measure(self, fn, total):
+        start = time.perf_counter()
+        for _ in range(total):
+            fn()
+        return total / (time.perf_counter() - start)
@@ -0,0 +1,123 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from organizations.models import WebhookEvent
+from organizations.webhookshandlers import dispatch_event
+
+from sentry_sdk import logger as sentry_logger
+
+# A claimed event still "processing" after this long belongs to a crashed worker.
+PROCESSING_LEASE = timedelta(minutes=5)
+
+Status = WebhookEvent.Status
+
+class Command(BaseCommand):
+    help = 'Processes stored Paystack webhook events, in arrival order per customer, retrying failures with exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Events claimed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the queue is empty')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait between polls when looping')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        while True:
+            processed, failed = self.drain_batch(batch_size)
+            if processed or failed:
+                self.stdout.write(f"Processed {processed}, failed {failed}")
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS('Webhook queue drained'))
+
+    def claim_batch(self, batch_size):
+        """
+        Claims due events whose customer has no earlier event still pending or in flight, so
+        a customer's events are handled one at a time and in the order Paystack sent them.
+        An event that has failed permanently no longer holds back the ones after it.
+        """
+        now = timezone.now()
+        earlier_unfinished = WebhookEvent.objects.filter(
+            customer_code=OuterRef('customer_code'),
+            id__lt=OuterRef('id'),
+            status__in=[Status.PENDING, Status.PROCESSING],
+        )
+
+        with transaction.atomic():
+            ids = list(
+                WebhookEvent.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=Status.PENDING) | Q(status=Status.PROCESSING),
+                    Q(customer_code="") | ~Exists(earlier_unfinished),
+                    next_attempt_at__lte=now,
+                )
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            WebhookEvent.objects.filter(id__in=ids).update(
+                status=Status.PROCESSING,
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + PROCESSING_LEASE,
+            )
+
+        return list(WebhookEvent.objects.filter(id__in=ids).order_by('id'))
+
+    def drain_batch(self, batch_size):
+        processed = failed = 0
+
+        for event in self.claim_batch(batch_size):
+            try:
+                dispatch_event(event)
+            except ObjectDoesNotExist as e:
+                # The user, subscription or plan is missing: retrying cannot help, and would
+                # hold back the customer's later events through every backoff round
+                self.fail(event, e)
+                failed += 1
+                continue
+            except Exception as e:
+                self.schedule_retry(event, e)
+                failed += 1
+                continue
+
+            event.status = Status.PROCESSED
+            event.processed_at = timezone.now()
+            event.last_error = ""
+            event.save(update_fields=['status', 'processed_at', 'last_error'])
+            processed += 1
+
+        return processed, failed
+
+    def schedule_retry(self, event, error):
+        if event.attempts >= settings.PAYSTACK_WEBHOOK_MAX_ATTEMPTS:
+            self.fail(event, error)
+            return
+
+        delay = min(
+            settings.PAYSTACK_WEBHOOK_BACKOFF_SECONDS * (2 ** (event.attempts - 1)),
+            settings.PAYSTACK_WEBHOOK_MAX_BACKOFF_SECONDS,
+        )
+        event.status = Status.PENDING
+        event.last_error = str(error)
+        event.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        event.save(update_fields=['status', 'last_error', 'next_attempt_at'])
+
+    def fail(self, event, error):
+        event.status = Status.FAILED
+        event.last_error = str(error)
+        event.save(update_fields=['status', 'last_error'])
+        sentry_logger.error(f"Webhook event {event.id} ({event.event_type}) failed permanently: {error}", extra={
+            "event_id": event.id,
+            "attempts": event.attempts,
+        })
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0017_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookevent',
+            name='progress',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -8,7 +8,7 @@ import secrets
 import hashlib
 import uuid
 
-from docuhealth2.utils.generate import generate_HIN
+from docuhealth2.utils.hin import allocate_hin
 from docuhealth2.models import BaseModel
 
 from accounts.models import User
@@ -38,12 +38,8 @@ class HospitalProfile(BaseModel):
     notification_settings = models.JSONField(default=default_notification_settings)
     
     def save(self, *args, **kwargs):
-        if not self.hin:  
-            while True:
-                new_hin = generate_HIN()
-                if not HospitalProfile.all_objects.filter(hin=new_hin).exists():
-                    self.hin = new_hin
-                    break
+        if not self.hin:
+            self.hin = allocate_hin()
         super().save(*args, **kwargs)
         
     class Meta:
@@ -193,6 +189,18 @@ class Subscription(BaseModel):
     def __str__(self):
         return f"{self.user.email} - {self.plan.name}"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidate_entitlement()
+        
+    def delete(self, *args, **kwargs):
+        self.invalidate_entitlement()
+        return super().delete(*args, **kwargs)
+    
+    def invalidate_entitlement(self):
+        from .services import invalidate_entitlement
+        invalidate_entitlement(self.user_id)
+    
 class Transaction(BaseModel):
     class Status(models.TextChoices):
         SUCCESS = 'success', 'Success'
@@ -205,7 +213,40 @@ class Transaction(BaseModel):
     amount = models.DecimalField(decimal_places=2, max_digits=20)
     reference = models.CharField(max_length=255, unique=True)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
-    
+
+class WebhookEvent(BaseModel):
+    """
+    A Paystack delivery, stored as received and processed later by `manage.py process_webhook_events`.
+    Paystack resends the same body on retries, so the body's sha256 is the dedupe key.
+    """
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        PROCESSED = "processed", "Processed"
+        FAILED = "failed", "Failed"
+
+    payload_hash = models.CharField(max_length=64, unique=True)
+    event_type = models.CharField(max_length=100)
+    customer_code = models.CharField(max_length=200, blank=True, default="")
+    payload = models.JSONField()
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # Steps a handler has finished, so a retried event does not repeat outbound calls
+    progress = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"{self.event_type} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+            models.Index(fields=["customer_code", "status"]),
+        ]
+
 class PaystackCustomer(BaseModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="paystack_customer")
     customer_code = models.CharField(max_length=200, blank=True, null=True)
@@ -272,6 +313,18 @@ class Client(BaseModel):
 
     def set_secret(self, raw_secret):
         self.client_secret_hash = make_password(raw_secret)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidate_auth_cache()
+
+    def delete(self, *args, **kwargs):
+        self.invalidate_auth_cache()
+        return super().delete(*args, **kwargs)
+
+    def invalidate_auth_cache(self):
+        from docuhealth2.authentications import verified_client_cache
+        verified_client_cache.invalidate(self.client_id)
         
 # class PharmacyPartnerClient(BaseModel):
 #     partner = models.OneToOneField(PharmacyPartner, on_delete=models.CASCADE, related_name="client")
@@ -1,8 +1,9 @@
 import os
-import requests
 from dotenv import load_dotenv
 from sentry_sdk import logger as sentry_logger
 
+from docuhealth2.utils.http_client import ProviderClient
+
 load_dotenv()
 
 paystack_key = os.getenv('PAYSTACK_LIVE_SECRET_KEY')
@@ -14,8 +15,10 @@ headers = {
 
 base_url = "https://api.paystack.co/"
 
+paystack = ProviderClient("paystack", base_url, headers=headers)
+
 def send_paystack_request(method, url, payload=None):
-        response = requests.request(method, f'{base_url}{url}', json=payload, headers=headers)
+        response = paystack.request(method, url, json=payload)
         return response
     
 def create_plan(payload):
@@ -65,6 +68,6 @@ def deactivate_paystack_subscription(sub_code):
         return True
     
     sentry_logger.error(f"Failed to disable subscription", extra={"sub_code": sub_code}, exc_info=True)
-    # raise Exception(f"Paystack error: {response_data.get('message', 'Failed to disable subscription')}")
+    raise Exception(f"Paystack error: {response_data.get('message', 'Failed to disable subscription')}")
 
     
\ No newline at end of file
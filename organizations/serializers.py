@@ -8,6 +8,7 @@ from .models import HospitalProfile, HospitalInquiry, HospitalVerificationReques
 
 from docuhealth2.mixins import StrictFieldsMixin
 
+from .services import is_hospital_entitled
 from .requests import create_plan
 
 class HospitalProfileSerializer(serializers.ModelSerializer):
@@ -21,7 +22,7 @@ class HospitalProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['hin']
         
     def get_is_subscribed(self, obj):
-        return Subscription.objects.filter(user=obj.user, status=Subscription.SubscriptionStatus.ACTIVE).exists()
+        return is_hospital_entitled(obj)
     
     def get_theme(self, obj):
         return {
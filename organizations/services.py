@@ -0,0 +1,101 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q, BooleanField, ExpressionWrapper
+from django.utils import timezone
+
+from .models import Subscription
+
+Status = Subscription.SubscriptionStatus
+
+# The per-process layer is flushed wholesale when it grows past this many users.
+LOCAL_MAX_ENTRIES = 10_000
+
+def entitlement_q(prefix=""):
+    """
+    What "subscribed" means everywhere: an active subscription whose paid period has not run
+    out (or has no end date yet), or a past-due one still inside its paid period while
+    Paystack retries the charge. `prefix` lets other models filter through a relation,
+    e.g. entitlement_q("subscription__") on User.
+    """
+    now = timezone.now()
+    field = lambda name: f"{prefix}{name}"
+
+    return (
+        Q(**{field("status"): Status.ACTIVE})
+        & (Q(**{field("next_payment_date__isnull"): True}) | Q(**{field("next_payment_date__gte"): now}))
+    ) | Q(**{field("status"): Status.PAST_DUE, field("next_payment_date__gte"): now})
+
+def entitlement_cache_key(user_id):
+    return f"entitlement:user:{user_id}"
+
+class EntitlementCache:
+    """
+    Two levels: a per-process dict with a few seconds' TTL in front of the shared Django cache.
+    Entries also carry the moment the answer stops being true (the end of the paid period),
+    so an expiring subscription flips without waiting for a webhook or the TTL.
+    """
+
+    def __init__(self):
+        self._local = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.time()
+        with self._lock:
+            entry = self._local.get(user_id)
+        if entry is not None and entry[1] > now and entry[2] > time.monotonic():
+            return entry[0]
+
+        entry = cache.get(entitlement_cache_key(user_id))
+        if entry is None or entry[1] <= now:
+            entry = self.load(user_id)
+            ttl = min(settings.ENTITLEMENT_CACHE_TTL, max(int(entry[1] - now), 1))
+            cache.set(entitlement_cache_key(user_id), entry, ttl)
+
+        with self._lock:
+            if len(self._local) >= LOCAL_MAX_ENTRIES:
+                self._local.clear()
+            self._local[user_id] = (entry[0], entry[1], time.monotonic() + settings.ENTITLEMENT_LOCAL_TTL)
+        return entry[0]
+
+    def load(self, user_id):
+        """(entitled, valid_until as a unix timestamp) from the database."""
+        subscription = (
+            Subscription.objects.filter(user_id=user_id)
+            .annotate(entitled=ExpressionWrapper(entitlement_q(), output_field=BooleanField()))
+            .values("entitled", "next_payment_date")
+            .first()
+        )
+        entitled = bool(subscription and subscription["entitled"])
+
+        valid_until = time.time() + settings.ENTITLEMENT_CACHE_TTL
+        if entitled and subscription["next_payment_date"] is not None:
+            valid_until = min(valid_until, subscription["next_payment_date"].timestamp())
+        return entitled, valid_until
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._local.pop(user_id, None)
+        cache.delete(entitlement_cache_key(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+entitlement_cache = EntitlementCache()
+
+def is_entitled(user_id):
+    return entitlement_cache.get(user_id) if user_id else False
+
+def is_hospital_entitled(hospital):
+    """Hospital staff inherit their hospital's subscription, which belongs to the hospital admin user."""
+    return is_entitled(hospital.user_id) if hospital else False
+
+def invalidate_entitlement(user_id):
+    # Again after commit, so a concurrent reader cannot re-cache the pre-commit row
+    entitlement_cache.invalidate(user_id)
+    transaction.on_commit(lambda: entitlement_cache.invalidate(user_id))
@@ -1,3 +1,355 @@
-from django.test import TestCase
+import json
+import socket
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from accounts.models import User
+from docuhealth2.authentications import ClientHeaderAuthentication, VerifiedClientCache, verified_client_cache
+from docuhealth2.utils.http_client import ProviderClient, ProviderUnavailable, providers
+
+from .models import Client, Subscription, SubscriptionPlan, WebhookEvent
+from .services import entitlement_cache, entitlement_q, is_entitled
+
+def webhook_event(event_type, customer_code, **data):
+    payload = {"event": event_type, "data": {"customer": {"customer_code": customer_code}, **data}}
+    return WebhookEvent.objects.create(
+        payload_hash=f"{event_type}-{WebhookEvent.objects.count()}", event_type=event_type, customer_code=customer_code, payload=payload,
+    )
+
+def process_events():
+    call_command("process_webhook_events", stdout=StringIO())
+
+@override_settings(PAYSTACK_WEBHOOK_MAX_ATTEMPTS=5, PAYSTACK_WEBHOOK_BACKOFF_SECONDS=0, PAYSTACK_WEBHOOK_MAX_BACKOFF_SECONDS=0)
+class ProcessWebhookEventsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="ada@example.com", role=User.Role.PATIENT, paystack_cus_code="CUS_ada")
+        self.plan = SubscriptionPlan.objects.create(name="Individual", price=2000, description="Plan", interval=SubscriptionPlan.Intervals.MONTHLY, paystack_plan_code="PLN_new")
+        self.subscription = Subscription.objects.create(user=self.user, plan=self.plan, paystack_subscription_code="SUB_old")
+
+    def subscription_create(self):
+        return webhook_event(
+            "subscription.create", "CUS_ada", subscription_code="SUB_new", plan={"plan_code": "PLN_new"},
+            next_payment_date="2026-11-18T00:00:00Z", authorization={"authorization_code": "AUTH_1"},
+        )
+
+    def test_missing_customer_fails_at_once_without_holding_back_later_events(self):
+        unknown = webhook_event("subscription.disable", "CUS_unknown")
+        missing_plan = webhook_event("subscription.create", "CUS_ada", subscription_code="SUB_new", plan={"plan_code": "PLN_gone"})
+        later = webhook_event("subscription.disable", "CUS_ada")
+
+        process_events()
+
+        for event in (unknown, missing_plan, later):
+            event.refresh_from_db()
+        self.assertEqual((unknown.status, unknown.attempts), (WebhookEvent.Status.FAILED, 1))
+        self.assertEqual((missing_plan.status, missing_plan.attempts), (WebhookEvent.Status.FAILED, 1))
+        self.assertEqual(later.status, WebhookEvent.Status.PROCESSED)
+
+    def test_subscription_create_disables_the_replaced_subscription(self):
+        event = self.subscription_create()
+
+        with mock.patch("organizations.webhookshandlers.deactivate_paystack_subscription") as deactivate:
+            process_events()
+
+        deactivate.assert_called_once_with("SUB_old")
+        event.refresh_from_db()
+        self.subscription.refresh_from_db()
+        self.assertEqual(event.status, WebhookEvent.Status.PROCESSED)
+        self.assertEqual(self.subscription.paystack_subscription_code, "SUB_new")
+        self.assertEqual(self.subscription.status, Subscription.SubscriptionStatus.ACTIVE)
+
+    def test_retried_subscription_create_still_disables_the_replaced_subscription_once(self):
+        event = self.subscription_create()
+
+        with mock.patch("organizations.webhookshandlers.deactivate_paystack_subscription", side_effect=[Exception("Paystack error: timeout"), True]) as deactivate:
+            process_events()
+
+        # The first pass switched the subscription; the retry found SUB_new already stored
+        self.assertEqual([call.args for call in deactivate.call_args_list], [("SUB_old",), ("SUB_old",)])
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (WebhookEvent.Status.PROCESSED, 2))
+
+        # Re-running a finished event makes no second outbound call
+        with mock.patch("organizations.webhookshandlers.deactivate_paystack_subscription") as deactivate:
+            WebhookEvent.objects.filter(pk=event.pk).update(status=WebhookEvent.Status.PENDING)
+            process_events()
+        deactivate.assert_not_called()
+
+    @override_settings(PAYSTACK_WEBHOOK_MAX_ATTEMPTS=2)
+    def test_other_errors_are_retried_until_max_attempts(self):
+        event = self.subscription_create()
+
+        with mock.patch("organizations.webhookshandlers.deactivate_paystack_subscription", side_effect=Exception("Paystack error: timeout")), \
+                mock.patch("organizations.management.commands.process_webhook_events.sentry_logger") as logger:
+            process_events()
+
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (WebhookEvent.Status.FAILED, 2))
+        self.assertIn("timeout", event.last_error)
+        logger.error.assert_called_once()
+
+class EntitlementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        entitlement_cache.clear()
+        self.addCleanup(entitlement_cache.clear)
+        self.plan = SubscriptionPlan.objects.create(name="Individual", price=2000, description="Plan", interval=SubscriptionPlan.Intervals.MONTHLY)
+
+    def subscriber(self, name, status, next_payment_date):
+        user = User.objects.create(email=f"{name}@example.com", role=User.Role.PATIENT, paystack_cus_code=f"CUS_{name}")
+        Subscription.objects.create(user=user, plan=self.plan, status=status, next_payment_date=next_payment_date)
+        return user
+
+    def test_entitlement_q_covers_the_paid_period_and_the_past_due_grace(self):
+        now = timezone.now()
+        Status = Subscription.SubscriptionStatus
+        entitled = {
+            self.subscriber("active", Status.ACTIVE, now + timedelta(days=3)),
+            self.subscriber("open_ended", Status.ACTIVE, None),
+            self.subscriber("retrying", Status.PAST_DUE, now + timedelta(days=1)),
+        }
+        self.subscriber("lapsed", Status.ACTIVE, now - timedelta(days=1))
+        self.subscriber("overdue", Status.PAST_DUE, now - timedelta(days=1))
+        self.subscriber("cancelled", Status.INACTIVE, now + timedelta(days=3))
+
+        self.assertEqual(set(User.objects.filter(entitlement_q("subscription__"))), entitled)
+        self.assertEqual({subscription.user for subscription in Subscription.objects.filter(entitlement_q())}, entitled)
+        self.assertEqual({user for user in User.objects.all() if is_entitled(user.id)}, entitled)
+
+    def test_cached_answer_flips_when_the_paid_period_ends(self):
+        ends = timezone.now() + timedelta(hours=1)
+        user = self.subscriber("ada", Subscription.SubscriptionStatus.PAST_DUE, ends)
+        self.assertTrue(is_entitled(user.id))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(is_entitled(user.id))
+
+        # No webhook and no write: only the clock moves past the end of the paid period
+        later = ends + timedelta(seconds=1)
+        with mock.patch("organizations.services.time.time", return_value=later.timestamp()), \
+                mock.patch("organizations.services.timezone.now", return_value=later):
+            self.assertFalse(is_entitled(user.id))
+
+    def test_webhook_invalidates_the_cached_answer(self):
+        user = self.subscriber("ada", Subscription.SubscriptionStatus.ACTIVE, timezone.now() + timedelta(days=30))
+        self.assertTrue(is_entitled(user.id))
+
+        webhook_event("subscription.disable", "CUS_ada")
+        process_events()
+
+        self.assertFalse(is_entitled(user.id))
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for Paystack/Korapay. /ok answers at once, /slow sleeps past the read timeout,
+    /down always returns 503 and /flaky returns 503 for the first two calls of each test.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    flaky_calls = 0
+    client_ports = set()
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.respond()
+
+    def respond(self):
+        FakeProviderHandler.client_ports.add(self.client_address[1])
+
+        status = 200
+        if self.path == "/slow":
+            time.sleep(0.5)
+        elif self.path == "/down":
+            status = 503
+        elif self.path == "/flaky":
+            FakeProviderHandler.flaky_calls += 1
+            status = 503 if FakeProviderHandler.flaky_calls <= 2 else 200
+
+        body = json.dumps({"status": status == 200, "message": "ok", "data": {}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class FakeProviderServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that hit their read timeout hang up before /slow replies
+        pass
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class ProviderClientTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeProviderServer(("127.0.0.1", 0), FakeProviderHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        FakeProviderHandler.flaky_calls = 0
+        FakeProviderHandler.client_ports = set()
+
+    def provider(self, base_url=None, **kwargs):
+        name = f"test-{self._testMethodName}"
+        self.addCleanup(providers.pop, name, None)
+        return ProviderClient(name, base_url or self.base_url, backoff=0.01, **kwargs)
+
+    def test_calls_reuse_one_keep_alive_connection(self):
+        client = self.provider(retries=0)
+
+        for _ in range(5):
+            self.assertEqual(client.post("ok", json={"id": "1"}).status_code, 200)
+
+        self.assertEqual(len(FakeProviderHandler.client_ports), 1)
+        self.assertEqual(client.metrics.snapshot()["calls"], 5)
+
+    def test_idempotent_call_is_retried_through_503s(self):
+        client = self.provider(retries=2)
+
+        response = client.get("flaky")
+
+        self.assertEqual(response.status_code, 200)
+        metrics = client.metrics.snapshot()
+        self.assertEqual((metrics["calls"], metrics["errors"], metrics["retries"]), (3, 2, 2))
+
+    def test_post_is_not_retried_after_reaching_the_provider(self):
+        client = self.provider(retries=2)
+
+        response = client.post("flaky", json={})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(client.metrics.snapshot()["retries"], 0)
+
+    def test_post_is_retried_when_the_connection_was_never_made(self):
+        client = self.provider(base_url=f"http://127.0.0.1:{unused_port()}/", retries=2, failure_threshold=10)
+
+        with self.assertRaises(requests.ConnectionError):
+            client.post("ok", json={})
+
+        self.assertEqual(client.metrics.snapshot()["retries"], 2)
+
+    def test_read_timeout_is_enforced(self):
+        client = self.provider(read_timeout=0.1, retries=0)
+
+        start = time.perf_counter()
+        with self.assertRaises(requests.Timeout):
+            client.get("slow")
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_circuit_opens_fails_fast_and_closes_after_a_good_trial_call(self):
+        client = self.provider(retries=0, failure_threshold=3, reset_timeout=0.1)
+
+        for _ in range(3):
+            self.assertEqual(client.post("down", json={}).status_code, 503)
+        self.assertEqual(client.breaker.state, "open")
+
+        with self.assertRaises(ProviderUnavailable):
+            client.post("ok", json={})
+        self.assertEqual(client.metrics.snapshot()["rejected"], 1)
+
+        time.sleep(0.15)
+        self.assertEqual(client.breaker.state, "half-open")
+        self.assertEqual(client.post("ok", json={}).status_code, 200)
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_failed_trial_call_opens_the_circuit_again(self):
+        client = self.provider(retries=0, failure_threshold=1, reset_timeout=0.1)
+
+        client.post("down", json={})
+        time.sleep(0.15)
+        self.assertEqual(client.breaker.state, "half-open")
+
+        client.post("down", json={})
+
+        self.assertEqual(client.breaker.state, "open")
+        with self.assertRaises(ProviderUnavailable):
+            client.post("ok", json={})
+
+class ClientHeaderAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        verified_client_cache.clear()
+        self.addCleanup(verified_client_cache.clear)
+
+        self.client_record = Client(user=User.objects.create(email="partner@example.com", role=User.Role.PHARMACY_PARTNER, is_active=True))
+        self.client_record.set_secret("dh_sk_old")
+        self.client_record.save()
+
+    def authenticate(self, secret, client_id=None):
+        request = RequestFactory().get("/", HTTP_X_CLIENT_ID=client_id or str(self.client_record.client_id), HTTP_X_CLIENT_SECRET=secret)
+        return ClientHeaderAuthentication().authenticate(request)
+
+    def rotate(self):
+        self.client_record.set_secret("dh_sk_new")
+        self.client_record.save(update_fields=["client_secret_hash"])
+
+    def test_verified_secret_is_served_from_the_cache(self):
+        self.authenticate("dh_sk_old")
+
+        with self.assertNumQueries(0):
+            user, client = self.authenticate("dh_sk_old")
+
+        self.assertEqual((user.pk, client.pk), (self.client_record.user_id, self.client_record.pk))
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate("dh_sk_wrong")
+
+    def test_rotation_in_another_worker_rejects_the_old_secret(self):
+        other_worker = VerifiedClientCache(ttl=60, max_size=10)
+        with mock.patch("docuhealth2.authentications.verified_client_cache", other_worker):
+            self.authenticate("dh_sk_old")
+
+        # Only this process's cache is told about the rotation
+        self.rotate()
+
+        with mock.patch("docuhealth2.authentications.verified_client_cache", other_worker):
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate("dh_sk_old")
+            self.assertEqual(self.authenticate("dh_sk_new")[1].pk, self.client_record.pk)
+
+    def test_deactivated_client_is_rejected(self):
+        self.authenticate("dh_sk_old")
+
+        self.client_record.is_active = False
+        self.client_record.save(update_fields=["is_active"])
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate("dh_sk_old")
+
+    def test_non_canonical_client_id_shares_the_cache_entry(self):
+        upper_case_id = str(self.client_record.client_id).upper()
+        self.authenticate("dh_sk_old", client_id=upper_case_id)
+
+        self.rotate()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate("dh_sk_old", client_id=upper_case_id)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate("dh_sk_old", client_id="not-a-client-id")
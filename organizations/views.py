@@ -10,7 +10,7 @@ from rest_framework.parsers import MultiPartParser, FormParser
 
 from docuhealth2.views import PublicGenericAPIView, BaseUserCreateView
 from docuhealth2.utils.supabase import delete_from_supabase, upload_files
-from docuhealth2.utils.email_service import BrevoEmailService
+from docuhealth2.utils.email_service import QueuedEmailService
 from docuhealth2.authentications import ClientHeaderAuthentication
 from docuhealth2.permissions import IsAuthenticatedHospitalAdmin, IsAuthenticatedHospitalStaff, IsAuthenticatedPatient, IsAuthenticatedPharmacyPartner
 
@@ -19,6 +19,7 @@ from .serializers import CreateHospitalSerializer, HospitalInquirySerializer, Ho
 from .models import HospitalInquiry, HospitalVerificationRequest, VerificationToken, HospitalProfile, SubscriptionPlan, PharmacyProfile, Client
 
 from .requests import create_customer, initialize_transaction
+from .services import invalidate_entitlement
 
 from accounts.models import User
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
@@ -29,7 +30,7 @@ import secrets
 from organizations.models import Subscription
 
 
-mailer = BrevoEmailService()
+mailer = QueuedEmailService()
 
 @extend_schema(tags=["Hospital Onboarding"])  
 class CreateHospitalView(PublicGenericAPIView, BaseUserCreateView):
@@ -226,16 +227,19 @@ class CreateSubscriptionView(generics.CreateAPIView):
         paystack_cus_code = user.paystack_cus_code
         email = user.email
         
-        if not paystack_cus_code:
+        is_new_customer = not paystack_cus_code
+        if is_new_customer:
             paystack_cus_code = create_customer({"email": email})
         
         with transaction.atomic():
             subscription = serializer.save()
         
-            if not paystack_cus_code:
+            if is_new_customer:
                 user.paystack_cus_code = paystack_cus_code
                 user.save(update_fields=['paystack_cus_code'])
             
+            invalidate_entitlement(user.id)
+            
         transaction_payload = {
             "email": email,
             "amount": plan.price * 100,
@@ -615,7 +619,7 @@ class RotatePharmacyCodeView(generics.GenericAPIView):
         
         mailer.send(
             subject="Pharmacy Code Rotation",
-            html_content=pharmacy_html_content,
+            body=pharmacy_html_content,
             recipient=pharmacy.user.email,
             is_html=True
         )
@@ -10,54 +10,47 @@ import json
 
 from drf_spectacular.utils import extend_schema
 
-from .webhookshandlers import handle_subscription_create, handle_charge_success, handle_invoice_create, handle_payment_failed, handle_invoice_update, handle_not_renew, handle_disable
+from .models import WebhookEvent
 
 
 PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_LIVE_SECRET_KEY")
 
 @extend_schema(tags=["Subscriptions"])
 class PaystackWebhookView(APIView):
-    authentication_classes = []  
+    """
+    Verifies and stores the event, then acknowledges it. The handlers in webhookshandlers.py
+    run later in `manage.py process_webhook_events`, so Paystack never waits on them.
+    """
+    authentication_classes = []
     permission_classes = [AllowAny]
-    
+
     def post(self, request, *args, **kwargs):
         payload = request.body
-        signature = request.headers.get('x-paystack-signature')
-        
+        signature = request.headers.get('x-paystack-signature') or ""
+
         hashed = hmac.new(
             PAYSTACK_SECRET_KEY.encode(),
             msg=payload,
             digestmod=hashlib.sha512
         ).hexdigest()
-        
-        if hashed != signature:
+
+        if not hmac.compare_digest(hashed, signature):
             return Response({"detail": "Invalid signature"}, status=403)
-        
+
         event = json.loads(payload)
-        event_type = event.get("event")
-        data = event.get("data", {})
-        
-        sentry_logger.info(f"Received event: {event_type}", extra={"data": data})
-        
-        if event_type == "subscription.create":
-            handle_subscription_create(data)
-            
-        elif event_type == "charge.success":
-            handle_charge_success(data)
-            
-        elif event_type == "invoice.create":
-            handle_invoice_create(data)
-            
-        elif event_type == "invoice.update":
-            handle_invoice_update(data)
-            
-        elif event_type == "invoice.payment_failed":
-            handle_payment_failed(data)
-            
-        elif event_type == "subscription.not_renew":
-            handle_not_renew(data)
-            
-        elif event_type == "subscription.disable":
-            handle_disable(data)
+        event_type = event.get("event", "")
+        data = event.get("data") or {}
+
+        # A redelivered event hits the unique payload_hash and is dropped without an error
+        WebhookEvent.objects.bulk_create([
+            WebhookEvent(
+                payload_hash=hashlib.sha256(payload).hexdigest(),
+                event_type=event_type,
+                customer_code=(data.get("customer") or {}).get("customer_code") or "",
+                payload=event,
+            )
+        ], ignore_conflicts=True)
+
+        sentry_logger.info(f"Queued event: {event_type}")
 
         return Response({"status": "ok"}, status=200)
@@ -7,7 +7,12 @@ from accounts.models import User
 
 from sentry_sdk import logger as sentry_logger
 
-def handle_subscription_create(data):
+def handle_subscription_create(data, event):
+    """
+    Safe to re-run for the same event: the subscription update is a plain overwrite, and the
+    replaced Paystack subscription is recorded on the event in the same transaction, so a
+    retry after a failed disable call still knows which one to disable, and does it once.
+    """
     sentry_logger.info("Creating subscription", extra={"data": data})
     try:
         with transaction.atomic():
@@ -16,6 +21,10 @@ def handle_subscription_create(data):
             subscription = Subscription.objects.get(user=user)
             
             old_sub_code = subscription.paystack_subscription_code
+            if old_sub_code and old_sub_code != data.get("subscription_code"):
+                event.progress["replaced_subscription_code"] = old_sub_code
+                event.save(update_fields=['progress'])
+            
             new_plan_code = data.get("plan", {}).get("plan_code")
             
             subscription.plan = SubscriptionPlan.objects.get(paystack_plan_code=new_plan_code)
@@ -31,13 +40,18 @@ def handle_subscription_create(data):
                 "paystack_code": paystack_cus_code
             })
             
-        if old_sub_code and old_sub_code != subscription.paystack_subscription_code:
-            deactivate_paystack_subscription(old_sub_code)
+        replaced_sub_code = event.progress.get("replaced_subscription_code")
+        if replaced_sub_code and not event.progress.get("replaced_subscription_disabled"):
+            deactivate_paystack_subscription(replaced_sub_code)
+            event.progress["replaced_subscription_disabled"] = True
+            event.save(update_fields=['progress'])
         
     except (User.DoesNotExist, Subscription.DoesNotExist) as e:
         sentry_logger.error(f"Subscription creation failed: User/Sub not found for code {paystack_cus_code}", exc_info=True)
+        raise
     except Exception as e:
         sentry_logger.error(f"Subscription creation failed: {e}", exc_info=True)                                                            
+        raise
     
 def handle_charge_success(data):
     try:
@@ -46,7 +60,7 @@ def handle_charge_success(data):
             user = User.objects.get(paystack_cus_code=paystack_cus_code)
             subscription = Subscription.objects.select_for_update().get(user=user)
             
-            subscription.status = Subscription.SubscriptionStatus.ACTIVEz
+            subscription.status = Subscription.SubscriptionStatus.ACTIVE
             subscription.last_payment_date = parse_datetime(data.get("paid_at"))
             subscription.save(update_fields=['status', 'last_payment_date'])
             
@@ -61,8 +75,10 @@ def handle_charge_success(data):
             
     except (User.DoesNotExist, Subscription.DoesNotExist) as e:
         sentry_logger.error(f"Charge success failed: User/Sub not found for code {paystack_cus_code}", exc_info=True)
+        raise
     except Exception as e:
         sentry_logger.error(f"Charge success failed: {e}", exc_info=True)
+        raise
     
 def handle_invoice_create(data):
     # TODO: Send notifications
@@ -86,8 +102,10 @@ def handle_invoice_update(data):
         
     except (User.DoesNotExist, Subscription.DoesNotExist) as e:
         sentry_logger.error(f"Invoice update failed: User/Sub not found for code {paystack_cus_code}", exc_info=True)
+        raise
     except Exception as e:
         sentry_logger.error(f"Invoice update failed: {e}", exc_info=True)
+        raise
     
 def handle_payment_failed(data):
     try:
@@ -105,8 +123,10 @@ def handle_payment_failed(data):
     
     except (User.DoesNotExist, Subscription.DoesNotExist) as e:
         sentry_logger.error(f"Payment failed handler error: User/Sub not found for code {paystack_cus_code}", exc_info=True)
+        raise
     except Exception as e:
         sentry_logger.error(f"Payment failed handler error : {e}", exc_info=True)
+        raise
     
 def handle_not_renew(data):
     try:
@@ -124,8 +144,10 @@ def handle_not_renew(data):
     
     except (User.DoesNotExist, Subscription.DoesNotExist) as e:
         sentry_logger.error(f"Sub Not renew handler error: User/Sub not found for code {paystack_cus_code}", exc_info=True)
+        raise
     except Exception as e:
         sentry_logger.error(f"Sub Not renew handler error : {e}", exc_info=True)
+        raise
     
 def handle_disable(data):
     try:
@@ -143,8 +165,37 @@ def handle_disable(data):
         
     except (User.DoesNotExist, Subscription.DoesNotExist) as e:
         sentry_logger.error(f"Sub disable handler error: User/Sub not found for code {paystack_cus_code}", exc_info=True)
+        raise
     except Exception as e:
         sentry_logger.error(f"Sub disable handler error : {e}", exc_info=True)
-    
-    
-    
+        raise
+
+HANDLERS = {
+    "subscription.create": handle_subscription_create,
+    "charge.success": handle_charge_success,
+    "invoice.create": handle_invoice_create,
+    "invoice.update": handle_invoice_update,
+    "invoice.payment_failed": handle_payment_failed,
+    "subscription.not_renew": handle_not_renew,
+    "subscription.disable": handle_disable,
+}
+
+# Handlers that record their progress on the WebhookEvent, to skip finished steps on a retry
+EVENT_HANDLERS = {"subscription.create"}
+
+def dispatch_event(event):
+    """
+    Runs the handler for a stored WebhookEvent. Handlers raise on failure so the worker
+    retries them; a missing user, subscription or plan (ObjectDoesNotExist) is not retried.
+    """
+    event_type = event.payload.get("event")
+    handler = HANDLERS.get(event_type)
+    if handler is None:
+        sentry_logger.info(f"Ignoring unhandled event: {event_type}")
+        return
+
+    data = event.payload.get("data") or {}
+    if event_type in EVENT_HANDLERS:
+        handler(data, event)
+    else:
+        handler(data)
@@ -0,0 +1,212 @@
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.db.models import F
+
+from sentry_sdk import logger as sentry_logger
+
+from docuhealth2.utils.supabase import upload_files, delete_from_supabase, QueuedUpload
+
+from .models import AttachmentUploadJob
+
+job_executor = ThreadPoolExecutor(max_workers=settings.ATTACHMENT_UPLOAD_JOB_WORKERS, thread_name_prefix="attachment-job")
+
+class AttachmentStatus:
+    PENDING = "pending"
+    UPLOADED = "uploaded"
+    FAILED = "failed"
+
+def stage_attachments(documents, folder):
+    if settings.ATTACHMENT_UPLOAD_MODE == "inline":
+        return InlineAttachments(documents, folder)
+    return BackgroundAttachments(documents, folder)
+
+class InlineAttachments:
+    """Uploads during the request, as before. `entries` already hold the final URLs."""
+
+    def __init__(self, documents, folder):
+        self.entries = [
+            {**doc, "status": AttachmentStatus.UPLOADED}
+            for doc in (upload_files(documents, folder) if documents else [])
+        ]
+
+    def queue(self, **owner):
+        return None
+
+    def discard(self):
+        for doc in self.entries:
+            delete_from_supabase(doc['path'])
+
+class BackgroundAttachments:
+    """
+    Spools the request's files to local disk and returns "pending" entries for
+    investigation_docs. queue() records an AttachmentUploadJob in the caller's
+    transaction; it is handed to the job executor once that transaction commits.
+    """
+
+    def __init__(self, documents, folder):
+        self.folder = folder
+        self.entries = []
+        self.files = []
+
+        os.makedirs(settings.ATTACHMENT_SPOOL_DIR, exist_ok=True)
+        try:
+            for doc in documents:
+                self.add(doc)
+        except Exception:
+            self.discard()
+            raise
+
+    def add(self, doc):
+        entry_id = str(uuid.uuid4())
+        fd, spool_path = tempfile.mkstemp(prefix=f"{entry_id}-", dir=settings.ATTACHMENT_SPOOL_DIR)
+        with os.fdopen(fd, "wb") as spool:
+            for chunk in doc.chunks():
+                spool.write(chunk)
+
+        self.files.append({"id": entry_id, "spool_path": spool_path, "name": doc.name, "content_type": doc.content_type})
+        self.entries.append({
+            "id": entry_id,
+            "url": None,
+            "path": None,
+            "filename": doc.name,
+            "content_type": doc.content_type,
+            "status": AttachmentStatus.PENDING,
+        })
+
+    def queue(self, **owner):
+        if not self.files:
+            return None
+
+        job = AttachmentUploadJob.objects.create(folder=self.folder, files=self.files, **owner)
+        transaction.on_commit(lambda: job_executor.submit(run_upload_job, job.id))
+        return job
+
+    def discard(self):
+        for file in self.files:
+            remove_spooled(file)
+
+def remove_spooled(file):
+    try:
+        os.remove(file["spool_path"])
+    except FileNotFoundError:
+        pass
+
+def run_upload_job(job_id):
+    """
+    Uploads a job's spooled files and patches the owner's investigation_docs. Safe to call from
+    any thread. The spool files only exist on the machine that took the request, so failures are
+    retried here, in-process, rather than by another worker.
+    """
+    try:
+        claimed = AttachmentUploadJob.objects.filter(id=job_id, status=AttachmentUploadJob.Status.PENDING).update(
+            status=AttachmentUploadJob.Status.PROCESSING, attempts=F("attempts") + 1
+        )
+        if not claimed:
+            return
+
+        job = AttachmentUploadJob.objects.select_related("soap_note", "discharge_form").get(id=job_id)
+
+        missing = [file["name"] for file in job.files if not os.path.exists(file["spool_path"])]
+        if missing:
+            # Lost with a restarted machine; retrying cannot bring them back
+            abandon_upload_job(job, f"Spooled files are gone: {', '.join(missing)}")
+            return
+
+        uploads = {
+            file["id"]: QueuedUpload(file["spool_path"], file["name"], file["content_type"], job.folder)
+            for file in job.files
+        }
+        uploaded, errors = {}, []
+        for entry_id, upload in uploads.items():
+            try:
+                uploaded[entry_id] = upload.result()
+            except Exception as e:
+                errors.append(str(e))
+
+        if errors:
+            for doc in uploaded.values():
+                delete_from_supabase(doc['path'])
+            fail_upload_job(job, "; ".join(errors))
+            return
+
+        patch_investigation_docs(job, {
+            entry_id: {**doc, "id": entry_id, "status": AttachmentStatus.UPLOADED}
+            for entry_id, doc in uploaded.items()
+        })
+        job.status = AttachmentUploadJob.Status.COMPLETED
+        job.last_error = ""
+        job.save(update_fields=["status", "last_error", "updated_at"])
+
+        for file in job.files:
+            remove_spooled(file)
+
+    except Exception as e:
+        sentry_logger.error(f"Attachment upload job {job_id} crashed: {e}")
+        job = AttachmentUploadJob.objects.filter(id=job_id, status=AttachmentUploadJob.Status.PROCESSING).first()
+        if job is not None:
+            fail_upload_job(job, str(e))
+    finally:
+        close_old_connections()
+
+def retry_delay(attempts):
+    return min(settings.ATTACHMENT_UPLOAD_BACKOFF_SECONDS * (2 ** (attempts - 1)), settings.ATTACHMENT_UPLOAD_MAX_BACKOFF_SECONDS)
+
+def fail_upload_job(job, error):
+    """Schedules another attempt after a backoff, or gives up once ATTACHMENT_UPLOAD_MAX_ATTEMPTS is reached."""
+    if job.attempts >= settings.ATTACHMENT_UPLOAD_MAX_ATTEMPTS:
+        abandon_upload_job(job, error)
+        return
+
+    job.last_error = error
+    job.status = AttachmentUploadJob.Status.PENDING
+    job.save(update_fields=["status", "last_error", "updated_at"])
+
+    timer = threading.Timer(retry_delay(job.attempts), job_executor.submit, args=(run_upload_job, job.id))
+    timer.daemon = True
+    timer.start()
+
+def abandon_upload_job(job, error):
+    """Marks the job and its investigation_docs entries failed and drops the spooled files."""
+    patch_investigation_docs(job, {
+        file["id"]: {"status": AttachmentStatus.FAILED, "error": error}
+        for file in job.files
+    }, merge=True)
+    job.last_error = error
+    job.status = AttachmentUploadJob.Status.FAILED
+    job.save(update_fields=["status", "last_error", "updated_at"])
+    sentry_logger.error(f"Attachment upload job {job.id} failed: {error}")
+
+    for file in job.files:
+        remove_spooled(file)
+
+def patch_investigation_docs(job, updates, merge=False):
+    owner = job.owner
+    if owner is None:
+        return
+
+    with transaction.atomic():
+        owner = type(owner).all_objects.select_for_update().get(pk=owner.pk)
+        docs = []
+        for entry in owner.investigation_docs or []:
+            update = updates.get(entry.get("id"))
+            if update is None:
+                docs.append(entry)
+            else:
+                docs.append({**entry, **update} if merge else update)
+
+        owner.investigation_docs = docs
+        owner.save(update_fields=["investigation_docs"])
+
+def attachments_status(docs):
+    statuses = {doc.get("status", AttachmentStatus.UPLOADED) for doc in docs or []}
+    if AttachmentStatus.FAILED in statuses:
+        return AttachmentStatus.FAILED
+    if AttachmentStatus.PENDING in statuses:
+        return AttachmentStatus.PENDING
+    return AttachmentStatus.UPLOADED
@@ -0,0 +1,125 @@
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from hospital_ops.models import Appointment
+from accounts.serializers import PatientFullInfoSerializer
+
+from .models import SoapNote, CaseNote, VitalSigns, DischargeForm, DrugRecord, Admission
+from .summaries import soap_note_rows, render_soap_notes
+
+# A patient's whole chart, streamed: every record type is read with `.iterator()` (a server-side
+# cursor on Postgres) in PATIENT_EXPORT_CHUNK_SIZE rows, and each entry is encoded and handed to the
+# response as soon as it is read, so memory stays flat however long the chart is.
+
+FORMATS = ("ndjson", "fhir")
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "fhir": "application/fhir+json"}
+
+# Entry type: (model, path from the model to the patient, FHIR resource type)
+EXPORT_SOURCES = {
+    "case_note": (CaseNote, "patient", "ClinicalImpression"),
+    "vital_signs": (VitalSigns, "patient", "Observation"),
+    "drug_record": (DrugRecord, "patient", "MedicationStatement"),
+    "admission": (Admission, "patient", "Encounter"),
+    "discharge_form": (DischargeForm, "admission__patient", "Composition"),
+    "appointment": (Appointment, "patient", "Appointment"),
+}
+RESOURCE_TYPES = {
+    "patient": "Patient",
+    "soap_note": "Composition",
+    "attachment": "DocumentReference",
+    **{source: resource_type for source, (_, _, resource_type) in EXPORT_SOURCES.items()},
+}
+# Owners of investigation_docs, whose entries are exported once more as attachment links
+ATTACHMENT_OWNERS = {"soap_note": (SoapNote, "patient"), "discharge_form": (DischargeForm, "admission__patient")}
+
+EXCLUDED_FIELDS = {"is_deleted", "deleted_at"}
+
+def export_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if field.name not in EXCLUDED_FIELDS]
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+def export_entries(patient, hospital=None):
+    """
+    Yields (type, id, data) for the patient's profile and every record in their chart, oldest
+    first within each type. With `hospital`, only what that hospital recorded is included.
+    """
+    chunk_size = settings.PATIENT_EXPORT_CHUNK_SIZE
+    scope = {"hospital": hospital} if hospital is not None else {}
+
+    yield "patient", patient.hin, PatientFullInfoSerializer(patient).data
+
+    # SOAP notes come out exactly as the SOAP note endpoints show them, nested drug records,
+    # additional notes and appointment included (three queries per chunk)
+    soap_notes = SoapNote.objects.filter(patient=patient, **scope).order_by("created_at", "id")
+    for rows in _chunks(soap_note_rows(soap_notes).iterator(chunk_size=chunk_size), chunk_size):
+        for note in render_soap_notes(rows):
+            yield "soap_note", note["id"], note
+
+    for source, (model, patient_path, _) in EXPORT_SOURCES.items():
+        records = model.objects.filter(**{patient_path: patient}, **scope).order_by("created_at", "id")
+        for row in records.values(*export_fields(model)).iterator(chunk_size=chunk_size):
+            yield source, row["id"], row
+
+    for source, (model, patient_path) in ATTACHMENT_OWNERS.items():
+        owners = model.objects.filter(**{patient_path: patient}, **scope).exclude(investigation_docs=[]).order_by("created_at", "id")
+        for row in owners.values("id", "created_at", "investigation_docs").iterator(chunk_size=chunk_size):
+            for index, doc in enumerate(row["investigation_docs"] or []):
+                yield "attachment", doc.get("id") or f"{source}-{row['id']}-{index}", {
+                    "source": source,
+                    "source_id": row["id"],
+                    "created_at": row["created_at"],
+                    "url": doc.get("url"),
+                    "filename": doc.get("filename"),
+                    "content_type": doc.get("content_type"),
+                    "status": doc.get("status"),
+                }
+
+def _dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(",", ":"))
+
+def ndjson_lines(entries):
+    """One {"type", "id", "data"} object per line."""
+    for source, entry_id, data in entries:
+        yield _dumps({"type": source, "id": entry_id, "data": data}) + "\n"
+
+def fhir_bundle(entries):
+    """
+    A FHIR-style `collection` Bundle: each entry's resource is the record's own fields plus
+    `resourceType` and `id`. The Bundle's JSON is written piece by piece as entries arrive.
+    """
+    yield _dumps({"resourceType": "Bundle", "type": "collection", "timestamp": timezone.now()})[:-1] + ',"entry":['
+    separator = ""
+    for source, entry_id, data in entries:
+        resource = {**data, "resourceType": RESOURCE_TYPES[source], "id": str(entry_id)}
+        yield separator + _dumps({"fullUrl": f"urn:docuhealth:{source}:{entry_id}", "resource": resource})
+        separator = ","
+    yield "]}"
+
+def buffered(pieces, size=None):
+    """Joins small encoded pieces into writes of about `size` characters."""
+    size = size or settings.PATIENT_EXPORT_WRITE_SIZE
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+def export_response(patient, output, hospital=None):
+    encode = ndjson_lines if output == "ndjson" else fhir_bundle
+    response = StreamingHttpResponse(buffered(encode(export_entries(patient, hospital))), content_type=CONTENT_TYPES[output])
+    extension = "ndjson" if output == "ndjson" else "json"
+    response["Content-Disposition"] = f'attachment; filename="{patient.hin}-records.{extension}"'
+    return response
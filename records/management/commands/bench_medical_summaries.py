@@ -0,0 +1,112 @@
+import secrets
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User, PatientProfile, HospitalStaffProfile
+from hospital_ops.models import Appointment
+from organizations.models import HospitalProfile
+from records.models import SoapNote, SoapNoteAdditionalNotes, DrugRecord, VitalSigns
+from records.serializers import MedicalSummarySerializer, SoapNoteSerializer
+from records.summaries import medical_summary_rows, render_medical_summaries, soap_note_rows, render_soap_notes, fetch_related
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Times the values()-based medical summary and SOAP note renderers against the serializers (records.tests checks they match byte for byte)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=100, help='SOAP notes on the page')
+        parser.add_argument('--repeat', type=int, default=20, help='Renders timed per path')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['records'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, records):
+        tag = secrets.token_hex(4)
+        hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email=f"bench-{tag}-hospital@docuhealth.local", role=User.Role.HOSPITAL), name="Bench Hospital"
+        )
+        doctor = HospitalStaffProfile.objects.create(
+            user=User.objects.create(email=f"bench-{tag}-doctor@docuhealth.local", role=User.Role.HOSPITAL_STAFF),
+            hospital=hospital, firstname="Bench", lastname="Doctor", phone_num="08000000000", role="doctor", gender="female",
+        )
+        patient = PatientProfile.objects.create(
+            user=User.objects.create(email=f"bench-{tag}-patient@docuhealth.local", role=User.Role.PATIENT),
+            firstname="Bench", lastname="Patient", dob=date(1990, 1, 1), gender="male",
+        )
+
+        for i in range(records):
+            vitals = VitalSigns.objects.create(patient=patient, staff=doctor, hospital=hospital, blood_pressure="120/80", temp=36.8, heart_rate=72)
+            note = SoapNote.objects.create(
+                patient=patient, staff=doctor, hospital=hospital, vital_signs=vitals if i % 4 else None,
+                chief_complaint="Headache", primary_diagnosis="Migraine", treatment_plan=["Rest", "Hydration"],
+                care_instructions=["Avoid screens"], investigations=["FBC"], problems_list=["Recurrent headaches"],
+                investigation_docs=[{"url": "https://example.com/scan.pdf", "status": "uploaded"}],
+            )
+            DrugRecord.objects.bulk_create([
+                DrugRecord(
+                    soap_note=note, patient=patient, hospital=hospital, name=name, route="oral", quantity=10,
+                    frequency={"value": 2, "rate": "daily"}, duration={"value": 5, "rate": "days"}, allergies=["penicillin"],
+                    upload_source=DrugRecord.UploadSource.SOAPNOTE,
+                )
+                for name in ("Paracetamol", "Ibuprofen")
+            ])
+            if i % 2:
+                Appointment.objects.create(patient=patient, staff=doctor, hospital=hospital, soap_note=note, type="follow-up", scheduled_time=timezone.now() + timedelta(days=7))
+            if i % 3 == 0:
+                SoapNoteAdditionalNotes.objects.create(soap_note=note, note="Patient called back, feeling better")
+
+        return SoapNote.objects.filter(patient=patient).order_by('-created_at', '-id')
+
+    def run(self, records, repeat):
+        queryset = self.seed(records)
+        instances = queryset.select_related(
+            "patient", "staff", "hospital", "hospital__user", "vital_signs", "appointment", "referred_docuhealth_hosp"
+        ).prefetch_related(
+            Prefetch("drug_records", queryset=DrugRecord.objects.order_by("id")),
+            Prefetch("additional_notes", queryset=SoapNoteAdditionalNotes.objects.order_by("id")),
+        )
+        renderer = JSONRenderer()
+
+        paths = (
+            ("MedicalSummarySerializer", MedicalSummarySerializer, medical_summary_rows, render_medical_summaries),
+            ("SoapNoteSerializer", SoapNoteSerializer, soap_note_rows, render_soap_notes),
+        )
+        for label, serializer_class, to_rows, render in paths:
+            size = len(renderer.render(render(list(to_rows(queryset)))))
+            self.stdout.write(f"{label}: {records} records ({size:,} bytes)")
+
+            # "render only" starts from everything already fetched: prefetched instances vs rows and related dicts
+            fetched = list(instances)
+            rows = list(to_rows(queryset))
+            related = fetch_related(rows)
+            for scope, serializer_run, fast_run in (
+                ("render only ", lambda: serializer_class(fetched, many=True).data, lambda: render(rows, related)),
+                ("fetch+render", lambda: serializer_class(list(instances.all()), many=True).data, lambda: render(list(to_rows(queryset)))),
+            ):
+                slow = self.timed(serializer_run, repeat)
+                fast = self.timed(fast_run, repeat)
+                self.stdout.write(f"  {scope}: serializer {slow * 1000:.2f} ms, fast path {fast * 1000:.2f} ms ({slow / fast:.1f}x)")
+
+        self.stdout.write(self.style.SUCCESS('Done (all rows rolled back)'))
+
+    @staticmethod
+    def timed(fn, repeat):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat
@@ -0,0 +1,52 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from records.models import AttachmentUploadJob
+from records.attachments import run_upload_job
+
+# Jobs are retried in-process by the machine that spooled their files, within a few minutes
+# (ATTACHMENT_UPLOAD_MAX_BACKOFF_SECONDS). One untouched for this long lost that machine.
+STALE_AFTER = timedelta(minutes=15)
+
+class Command(BaseCommand):
+    help = (
+        'Sweeps attachment upload jobs orphaned by a restart: each is run once more, which '
+        'uploads it if its spooled files are on this machine and marks it failed otherwise'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping instead of exiting')
+        parser.add_argument('--sleep', type=float, default=60.0, help='Seconds between sweeps when looping')
+
+    def handle(self, *args, **options):
+        while True:
+            self.sweep()
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+    def sweep(self):
+        stale = AttachmentUploadJob.objects.filter(
+            Q(status=AttachmentUploadJob.Status.PROCESSING) | Q(status=AttachmentUploadJob.Status.PENDING),
+            updated_at__lt=timezone.now() - STALE_AFTER,
+        )
+        stale.filter(status=AttachmentUploadJob.Status.PROCESSING).update(status=AttachmentUploadJob.Status.PENDING)
+
+        job_ids = list(stale.order_by('created_at').values_list('id', flat=True))
+        if not job_ids:
+            return
+
+        for job_id in job_ids:
+            run_upload_job(job_id)
+
+        counts = {
+            job_status: AttachmentUploadJob.objects.filter(id__in=job_ids, status=job_status).count()
+            for job_status in (AttachmentUploadJob.Status.COMPLETED, AttachmentUploadJob.Status.PENDING, AttachmentUploadJob.Status.FAILED)
+        }
+        self.stdout.write(self.style.SUCCESS(
+            f"Swept {len(job_ids)} stale jobs: {counts['completed']} completed, {counts['pending']} pending retry, {counts['failed']} failed"
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0015_rename_investigations_docs_soapnote_investigation_docs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentUploadJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('folder', models.CharField(max_length=100)),
+                ('files', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('discharge_form', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='upload_jobs', to='records.dischargeform')),
+                ('soap_note', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='upload_jobs', to='records.soapnote')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='records_att_status_1c76f7_idx')],
+            },
+        ),
+    ]
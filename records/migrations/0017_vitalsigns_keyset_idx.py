@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_patientprofile_last_completed_at'),
+        ('organizations', '0016_alter_hospitalprofile_notification_settings'),
+        ('records', '0016_attachmentuploadjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vitalsigns',
+            index=models.Index(fields=['patient', 'created_at', 'id'], name='hospitals_v_patient_c4aaf5_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_patient_search_indexes'),
+        ('facility', '0004_backfill_ward_bed_counters'),
+        ('organizations', '0017_webhookevent'),
+        ('records', '0017_vitalsigns_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(fields=['patient', 'created_at', 'id'], name='hospitals_a_patient_e1b27b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='casenote',
+            index=models.Index(fields=['patient', 'created_at', 'id'], name='records_cas_patient_bbfbad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='drugrecord',
+            index=models.Index(fields=['patient', 'created_at', 'id'], name='medicalreco_patient_572acb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='soapnote',
+            index=models.Index(fields=['patient', 'created_at', 'id'], name='records_soa_patient_745ecc_idx'),
+        ),
+    ]
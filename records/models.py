@@ -25,6 +25,9 @@ class VitalSigns(BaseModel):
     
     class Meta:
         db_table = "hospitals_vitalsigns"
+        indexes = [
+            models.Index(fields=['patient', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Vital Signs for {self.patient.full_name} by {self.staff.full_name} ({self.staff.role})"
@@ -118,6 +121,9 @@ class Admission(BaseModel):
     
     class Meta:
         db_table = 'hospitals_admission'
+        indexes = [
+            models.Index(fields=['patient', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Admission for {self.patient.full_name} at {self.hospital.name}"
@@ -133,6 +139,11 @@ class CaseNote(BaseModel):
     abnormalities = models.JSONField(default=list, blank=True, null=True)
     follow_up = models.JSONField(default=list, blank=True, null=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'created_at', 'id']),
+        ]
+    
     def __str__(self):
         return f"Case Note for {self.patient.full_name} by {self.staff.full_name}"
     
@@ -168,6 +179,11 @@ class SoapNote(BaseModel):
     referred_hosp = models.TextField(blank=True, null=True)
     patient_education = models.TextField(blank=True, null=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'created_at', 'id']),
+        ]
+    
     def __str__(self):
         return f"SOAP Note for {self.patient.full_name} by {self.staff.full_name}"
     
@@ -234,7 +250,39 @@ class DrugRecord(BaseModel):
     
     class Meta:
         db_table = 'medicalrecords_drugrecord'
+        indexes = [
+            models.Index(fields=['patient', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return self.name
-     
\ No newline at end of file
+     
+class AttachmentUploadJob(BaseModel):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    soap_note = models.ForeignKey(SoapNote, on_delete=models.CASCADE, related_name='upload_jobs', blank=True, null=True)
+    discharge_form = models.ForeignKey(DischargeForm, on_delete=models.CASCADE, related_name='upload_jobs', blank=True, null=True)
+
+    folder = models.CharField(max_length=100)
+    files = models.JSONField(default=list)
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "updated_at"]),
+        ]
+
+    @property
+    def owner(self):
+        return self.soap_note or self.discharge_form
+
+    def __str__(self):
+        return f"Upload job {self.id} ({self.status})"
@@ -8,7 +8,7 @@ from accounts.models import PatientProfile, SubaccountProfile, HospitalStaffProf
 from accounts.serializers import PatientFullInfoSerializer, PatientBasicInfoSerializer, HospitalStaffInfoSerilizer, HospitalStaffBasicInfoSerializer
 
 from hospital_ops.models import Appointment
-from hospital_ops.serializers import AppointmentSerializer, RecordAppointmentSerializer
+from hospital_ops.serializers import RecordAppointmentSerializer
 
 from organizations.serializers import HospitalBasicInfoSerializer
 from organizations.models import HospitalProfile, PharmacyProfile
@@ -17,6 +17,9 @@ from facility.models import HospitalWard, WardBed
 from facility.serializers import WardBedSerializer, WardNameSerializer
 
 from docuhealth2.mixins import MultipartJsonMixin
+from docuhealth2.utils.hin import HINRelatedField
+
+from .timeline import TIMELINE_SOURCES
 
 
 class ValueRateSerializer(serializers.Serializer):
@@ -24,7 +27,7 @@ class ValueRateSerializer(serializers.Serializer):
     rate = serializers.CharField()
     
 class VitalSignsRequestSerializer(serializers.ModelSerializer):
-    patient_hin = serializers.SlugRelatedField(slug_field="hin", source="patient", queryset=PatientProfile.objects.all(), write_only=True)
+    patient_hin = HINRelatedField(source="patient", queryset=PatientProfile.objects.all(), write_only=True)
     patient = PatientFullInfoSerializer(read_only=True)
     
     staff_id = serializers.SlugRelatedField(slug_field="staff_id", source="staff", queryset=HospitalStaffProfile.objects.filter(role=HospitalStaffProfile.StaffRole.NURSE), write_only=True)
@@ -62,7 +65,7 @@ class VitalSignsViaRequestSerializer(serializers.ModelSerializer):
         return validated_data
 
 class VitalSignsSerializer(serializers.ModelSerializer):
-    patient = serializers.SlugRelatedField(slug_field="hin", queryset=PatientProfile.objects.all(), write_only=True)
+    patient = HINRelatedField(queryset=PatientProfile.objects.all(), write_only=True)
     patient_info = PatientBasicInfoSerializer(read_only=True, source="patient")
     
     staff = serializers.SlugRelatedField(slug_field="staff_id", queryset=HospitalStaffProfile.objects.all(), write_only=True)
@@ -95,7 +98,7 @@ class ClientDrugRecordSerializer(serializers.ModelSerializer):
     frequency = ValueRateSerializer()
     duration = ValueRateSerializer()
     allergies = serializers.ListField(child=serializers.CharField())
-    patient = serializers.SlugRelatedField(slug_field='hin', queryset=PatientProfile.objects.all(), required=True)
+    patient = HINRelatedField(queryset=PatientProfile.objects.all(), required=True)
     
     class Meta:
         model = DrugRecord
@@ -199,7 +202,7 @@ class MedRecordAppointmentSerializer(serializers.ModelSerializer):
 #         return medical_record
     
 class AdmissionSerializer(serializers.ModelSerializer):
-    patient_hin = serializers.SlugRelatedField(slug_field="hin", source="patient", queryset=PatientProfile.objects.all(), write_only=True)
+    patient_hin = HINRelatedField(source="patient", queryset=PatientProfile.objects.all(), write_only=True)
     patient = PatientFullInfoSerializer(read_only=True)
     
     staff_id = serializers.SlugRelatedField(slug_field="staff_id", source="staff", queryset=HospitalStaffProfile.objects.all(), write_only=True)
@@ -255,8 +258,15 @@ class ConfirmAdmissionSerializer(serializers.Serializer):
         
         return  super().validate(attrs)
     
+class TimelineEntrySerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=list(TIMELINE_SOURCES))
+    id = serializers.IntegerField()
+    created_at = serializers.DateTimeField()
+    staff = serializers.DictField(allow_null=True)
+    data = serializers.DictField(help_text="The entry type's own fields")
+    
 class CaseNoteSerializer(serializers.ModelSerializer):
-    patient = serializers.SlugRelatedField(slug_field="hin", queryset=PatientProfile.objects.all(), write_only=True)
+    patient = HINRelatedField(queryset=PatientProfile.objects.all(), write_only=True)
     patient_info = PatientBasicInfoSerializer(read_only=True, source="patient")
     
     staff_info = HospitalStaffBasicInfoSerializer(read_only=True, source="staff")
@@ -287,7 +297,7 @@ class SoapNoteAdditionalNotesSerializer(serializers.ModelSerializer):
         
 
 class SoapNoteSerializer(MultipartJsonMixin, serializers.ModelSerializer):
-    patient = serializers.SlugRelatedField(slug_field="hin", queryset=PatientProfile.objects.all(), write_only=True)
+    patient = HINRelatedField(queryset=PatientProfile.objects.all(), write_only=True)
     patient_info = PatientBasicInfoSerializer(read_only=True, source="patient")
     
     staff_info = HospitalStaffBasicInfoSerializer(read_only=True, source="staff")
@@ -308,7 +318,7 @@ class SoapNoteSerializer(MultipartJsonMixin, serializers.ModelSerializer):
     bedside_tests = serializers.ListField(child=serializers.CharField(), required=False)
     treatment_plan = serializers.ListField(child=serializers.CharField(), required=False)
     
-    referred_docuhealth_hosp = serializers.SlugRelatedField(slug_field="hin", queryset=HospitalProfile.objects.all(), required=False, allow_null=True)
+    referred_docuhealth_hosp = HINRelatedField(queryset=HospitalProfile.objects.all(), required=False, allow_null=True)
     
     additional_notes = SoapNoteAdditionalNotesSerializer(many=True, required=False, read_only=True)
     
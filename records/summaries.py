@@ -0,0 +1,196 @@
+from collections import defaultdict
+
+from rest_framework import serializers
+
+from hospital_ops.models import Appointment
+
+from .models import DrugRecord, SoapNoteAdditionalNotes
+
+# Read-only fast path for MedicalSummarySerializer and SoapNoteSerializer: rows come from
+# `.values()` and nested records from one query per relation, then are turned into the same
+# JSON the serializers produce without running DRF's per-field machinery for every row.
+# `manage.py bench_medical_summaries` checks the output is byte-identical to the serializers'.
+
+# Shared field instances, so datetimes get exactly the serializers' formatting and timezone
+_datetime = serializers.DateTimeField()
+_date = serializers.DateField()
+
+PATIENT_VALUES = ["patient__hin", "patient__firstname", "patient__lastname", "patient__gender", "patient__dob"]
+STAFF_VALUES = ["staff_id", "staff__staff_id", "staff__firstname", "staff__lastname", "staff__role", "staff__specialization"]
+HOSPITAL_VALUES = ["hospital_id", "hospital__hin", "hospital__name", "hospital__user__email"]
+VITAL_SIGNS_VALUES = [
+    "vital_signs_id", "vital_signs__blood_pressure", "vital_signs__temp", "vital_signs__resp_rate",
+    "vital_signs__height", "vital_signs__weight", "vital_signs__heart_rate",
+]
+
+SUMMARY_VALUES = [
+    "id", "created_at", "chief_complaint", "primary_diagnosis", "treatment_plan", "care_instructions", "investigation_docs",
+    *PATIENT_VALUES, *STAFF_VALUES, *HOSPITAL_VALUES, *VITAL_SIGNS_VALUES,
+]
+
+SOAP_NOTE_VALUES = SUMMARY_VALUES + [
+    "drug_history_allergies", "investigations", "problems_list", "general_exam", "systemic_exam", "bedside_tests",
+    "referred_docuhealth_hosp__hin", "history_of_complain", "past_med_history", "family_history", "social_history",
+    "other_history", "review", "differential_diagnosis", "referred_hosp", "patient_education",
+]
+
+def _str(value):
+    return None if value is None else str(value)
+
+def _float(value):
+    return None if value is None else float(value)
+
+def _str_list(value):
+    return None if value is None else [None if item is None else str(item) for item in value]
+
+def _value_rate(value):
+    return None if value is None else {"value": _float(value["value"]), "rate": _str(value["rate"])}
+
+def medical_summary_rows(queryset):
+    return queryset.prefetch_related(None).values(*SUMMARY_VALUES)
+
+def soap_note_rows(queryset):
+    return queryset.prefetch_related(None).values(*SOAP_NOTE_VALUES)
+
+def _patient_info(row):
+    return {
+        "hin": _str(row["patient__hin"]),
+        "firstname": _str(row["patient__firstname"]),
+        "lastname": _str(row["patient__lastname"]),
+        "gender": row["patient__gender"],
+        "dob": _date.to_representation(row["patient__dob"]),
+    }
+
+def _staff_info(row):
+    if row["staff_id"] is None:
+        return None
+    return {
+        "staff_id": _str(row["staff__staff_id"]),
+        "firstname": _str(row["staff__firstname"]),
+        "lastname": _str(row["staff__lastname"]),
+        "role": row["staff__role"],
+        "specialization": _str(row["staff__specialization"]),
+    }
+
+def _hospital_info(row):
+    if row["hospital_id"] is None:
+        return None
+    return {"hin": _str(row["hospital__hin"]), "name": _str(row["hospital__name"]), "email": _str(row["hospital__user__email"])}
+
+def _vital_signs_info(row):
+    if row["vital_signs_id"] is None:
+        return None
+    return {
+        "blood_pressure": _str(row["vital_signs__blood_pressure"]),
+        "temp": _float(row["vital_signs__temp"]),
+        "resp_rate": _float(row["vital_signs__resp_rate"]),
+        "height": _float(row["vital_signs__height"]),
+        "weight": _float(row["vital_signs__weight"]),
+        "heart_rate": _float(row["vital_signs__heart_rate"]),
+    }
+
+def fetch_related(rows):
+    """Drug records, additional notes and appointments of the page, one query each."""
+    ids = [row["id"] for row in rows]
+    drug_records, additional_notes = defaultdict(list), defaultdict(list)
+
+    for drug in DrugRecord.objects.filter(soap_note_id__in=ids).order_by("id").values(
+        "soap_note_id", "name", "route", "quantity", "frequency", "duration", "allergies"
+    ):
+        drug_records[drug["soap_note_id"]].append({
+            "name": _str(drug["name"]),
+            "route": _str(drug["route"]),
+            "quantity": _float(drug["quantity"]),
+            "frequency": _value_rate(drug["frequency"]),
+            "duration": _value_rate(drug["duration"]),
+            "allergies": _str_list(drug["allergies"]),
+        })
+
+    for note in SoapNoteAdditionalNotes.objects.filter(soap_note_id__in=ids).order_by("id").values("soap_note_id", "note", "id", "created_at"):
+        additional_notes[note["soap_note_id"]].append({
+            "note": _str(note["note"]),
+            "id": note["id"],
+            "created_at": _datetime.to_representation(note["created_at"]),
+        })
+
+    # The reverse one-to-one accessor reads through the base manager, so soft-deleted appointments show too
+    appointments = {
+        appointment["soap_note_id"]: {
+            "type": _str(appointment["type"]),
+            "note": _str(appointment["note"]),
+            "scheduled_time": _datetime.to_representation(appointment["scheduled_time"]),
+        }
+        for appointment in Appointment.all_objects.filter(soap_note_id__in=ids).values("soap_note_id", "type", "note", "scheduled_time")
+    }
+    return drug_records, additional_notes, appointments
+
+def render_medical_summaries(rows, related=None):
+    """Same output as MedicalSummarySerializer(soap_notes, many=True).data for `medical_summary_rows()`."""
+    drug_records, additional_notes, appointments = related or fetch_related(rows)
+    return [
+        {
+            "patient_info": _patient_info(row),
+            "staff_info": _staff_info(row),
+            "vital_signs_info": _vital_signs_info(row),
+            "chief_complaint": _str(row["chief_complaint"]),
+            "primary_diagnosis": _str(row["primary_diagnosis"]),
+            "treatment_plan": row["treatment_plan"],
+            "care_instructions": row["care_instructions"],
+            "drug_records": drug_records[row["id"]],
+            "investigation_docs": row["investigation_docs"],
+            "appointment": appointments.get(row["id"]),
+            "hospital_info": _hospital_info(row),
+            "created_at": _datetime.to_representation(row["created_at"]),
+            "id": row["id"],
+            "additional_notes": additional_notes[row["id"]],
+        }
+        for row in rows
+    ]
+
+def render_soap_notes(rows, related=None):
+    """Same output as SoapNoteSerializer(soap_notes, many=True).data for `soap_note_rows()`."""
+    drug_records, additional_notes, appointments = related or fetch_related(rows)
+    return [
+        {
+            "id": row["id"],
+            "patient_info": _patient_info(row),
+            "staff_info": _staff_info(row),
+            "hospital_info": _hospital_info(row),
+            "vital_signs_info": _vital_signs_info(row),
+            "appointment": appointments.get(row["id"]),
+            "drug_records": drug_records[row["id"]],
+            "drug_history_allergies": _str_list(row["drug_history_allergies"]),
+            "investigations": _str_list(row["investigations"]),
+            "problems_list": _str_list(row["problems_list"]),
+            "care_instructions": _str_list(row["care_instructions"]),
+            "general_exam": _str_list(row["general_exam"]),
+            "systemic_exam": _str_list(row["systemic_exam"]),
+            "bedside_tests": _str_list(row["bedside_tests"]),
+            "treatment_plan": _str_list(row["treatment_plan"]),
+            "referred_docuhealth_hosp": row["referred_docuhealth_hosp__hin"],
+            "additional_notes": additional_notes[row["id"]],
+            "created_at": _datetime.to_representation(row["created_at"]),
+            "chief_complaint": _str(row["chief_complaint"]),
+            "history_of_complain": _str(row["history_of_complain"]),
+            "past_med_history": _str(row["past_med_history"]),
+            "family_history": _str(row["family_history"]),
+            "social_history": _str(row["social_history"]),
+            "other_history": _str(row["other_history"]),
+            "review": _str(row["review"]),
+            "investigation_docs": row["investigation_docs"],
+            "primary_diagnosis": _str(row["primary_diagnosis"]),
+            "differential_diagnosis": _str(row["differential_diagnosis"]),
+            "referred_hosp": _str(row["referred_hosp"]),
+            "patient_education": _str(row["patient_education"]),
+            "staff": row["staff_id"],
+            "hospital": row["hospital_id"],
+        }
+        for row in rows
+    ]
+
+class MedicalSummaryListMixin:
+    """For ListAPIViews of SoapNotes rendered as medical summaries: pages `.values()` rows instead of instances."""
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(medical_summary_rows(self.get_queryset()))
+        return self.get_paginated_response(render_medical_summaries(page))
@@ -1,3 +1,359 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Prefetch
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from django.core.cache import cache
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import User, PatientProfile, HospitalStaffProfile
+from accounts.serializers import CustomTokenObtainPairSerializer
+from docuhealth2.utils.supabase import QueuedUpload, SupabaseClientPool, UploadTimeout, upload_files
+from hospital_ops.models import Appointment
+from organizations.models import HospitalProfile
+
+from .attachments import AttachmentStatus, run_upload_job
+from .export import export_entries
+from .models import AttachmentUploadJob, SoapNote, SoapNoteAdditionalNotes, DrugRecord, VitalSigns
+from .serializers import MedicalSummarySerializer, SoapNoteSerializer
+from .summaries import medical_summary_rows, render_medical_summaries, soap_note_rows, render_soap_notes
+
+def create_clinic(tag="records"):
+    hospital = HospitalProfile.objects.create(
+        user=User.objects.create(email=f"{tag}-hospital@docuhealth.local", role=User.Role.HOSPITAL), name="Test Hospital"
+    )
+    doctor = HospitalStaffProfile.objects.create(
+        user=User.objects.create(email=f"{tag}-doctor@docuhealth.local", role=User.Role.HOSPITAL_STAFF),
+        hospital=hospital, firstname="Test", lastname="Doctor", phone_num="08000000000", role="doctor", gender="female",
+    )
+    patient = PatientProfile.objects.create(
+        user=User.objects.create(email=f"{tag}-patient@docuhealth.local", role=User.Role.PATIENT),
+        firstname="Test", lastname="Patient", dob=date(1990, 1, 1), gender="male",
+    )
+    return hospital, doctor, patient
+
+class FakeUpload:
+    def __init__(self, source, filename, content_type, folder):
+        self.filename = filename
+        self.folder = folder
+
+    def result(self):
+        return {"url": f"https://storage.example/{self.folder}/{self.filename}", "path": f"{self.folder}/{self.filename}", "filename": self.filename, "content_type": "application/pdf"}
+
+class FailingUpload(FakeUpload):
+    def result(self):
+        raise Exception("File upload failed: 503")
+
+@override_settings(ATTACHMENT_UPLOAD_MAX_ATTEMPTS=2, ATTACHMENT_UPLOAD_BACKOFF_SECONDS=30, ATTACHMENT_UPLOAD_MAX_BACKOFF_SECONDS=300)
+class UploadJobTests(TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir, ignore_errors=True)
+
+        hospital, doctor, patient = create_clinic()
+        self.spool_path = os.path.join(self.spool_dir, "scan.pdf")
+        with open(self.spool_path, "wb") as spool:
+            spool.write(b"%PDF-1.4")
+
+        self.note = SoapNote.objects.create(
+            patient=patient, staff=doctor, hospital=hospital, chief_complaint="Headache", primary_diagnosis="Migraine",
+            investigation_docs=[{"id": "doc-1", "url": None, "path": None, "filename": "scan.pdf", "content_type": "application/pdf", "status": AttachmentStatus.PENDING}],
+        )
+        self.job = AttachmentUploadJob.objects.create(
+            soap_note=self.note, folder="soapnote_investigations",
+            files=[{"id": "doc-1", "spool_path": self.spool_path, "name": "scan.pdf", "content_type": "application/pdf"}],
+        )
+
+        timer = mock.patch("records.attachments.threading.Timer")
+        self.timer = timer.start()
+        self.addCleanup(timer.stop)
+
+    def run_job(self, upload=FakeUpload):
+        with mock.patch("records.attachments.QueuedUpload", upload), mock.patch("records.attachments.delete_from_supabase"):
+            run_upload_job(self.job.id)
+        self.job.refresh_from_db()
+        self.note.refresh_from_db()
+
+    def test_uploads_files_and_patches_the_owner(self):
+        self.run_job()
+
+        self.assertEqual(self.job.status, AttachmentUploadJob.Status.COMPLETED)
+        self.assertEqual(self.job.attempts, 1)
+        [doc] = self.note.investigation_docs
+        self.assertEqual((doc["id"], doc["status"], doc["path"]), ("doc-1", AttachmentStatus.UPLOADED, "soapnote_investigations/scan.pdf"))
+        self.assertFalse(os.path.exists(self.spool_path))
+
+    def test_failed_upload_is_retried_in_process_after_a_backoff(self):
+        self.run_job(FailingUpload)
+
+        self.assertEqual(self.job.status, AttachmentUploadJob.Status.PENDING)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertIn("503", self.job.last_error)
+        self.assertEqual(self.timer.call_args.args[0], 30)
+        self.timer.return_value.start.assert_called_once()
+        self.assertTrue(os.path.exists(self.spool_path))
+
+    def test_gives_up_after_max_attempts(self):
+        self.run_job(FailingUpload)
+        self.run_job(FailingUpload)
+
+        self.assertEqual(self.job.status, AttachmentUploadJob.Status.FAILED)
+        self.assertEqual(self.job.attempts, 2)
+        self.assertEqual(self.note.investigation_docs[0]["status"], AttachmentStatus.FAILED)
+        self.assertEqual(self.timer.call_count, 1)
+        self.assertFalse(os.path.exists(self.spool_path))
+
+    def test_crashed_job_keeps_its_attempt_and_is_retried(self):
+        with mock.patch("records.attachments.patch_investigation_docs", side_effect=[RuntimeError("database went away")]):
+            self.run_job()
+
+        self.assertEqual(self.job.status, AttachmentUploadJob.Status.PENDING)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertEqual(self.job.last_error, "database went away")
+        self.timer.return_value.start.assert_called_once()
+
+    def test_missing_spool_file_fails_without_retrying(self):
+        os.remove(self.spool_path)
+
+        self.run_job()
+
+        self.assertEqual(self.job.status, AttachmentUploadJob.Status.FAILED)
+        self.assertIn("scan.pdf", self.job.last_error)
+        self.assertEqual(self.note.investigation_docs[0]["status"], AttachmentStatus.FAILED)
+        self.timer.assert_not_called()
+
+    def test_sweep_fails_jobs_orphaned_by_a_restart(self):
+        os.remove(self.spool_path)
+        fresh = AttachmentUploadJob.objects.create(soap_note=self.note, folder="soapnote_investigations", files=[])
+        AttachmentUploadJob.objects.filter(id=self.job.id).update(
+            status=AttachmentUploadJob.Status.PROCESSING, updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        call_command("process_upload_jobs", stdout=StringIO())
+
+        self.job.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(self.job.status, AttachmentUploadJob.Status.FAILED)
+        self.assertEqual(fresh.status, AttachmentUploadJob.Status.PENDING)
+
+class StorageWaitTests(SimpleTestCase):
+    def setUp(self):
+        # One upload worker, held busy until the test lets it go
+        self.release = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(self.release.set)
+        self.executor.submit(self.release.wait)
+
+        patches = (
+            mock.patch("docuhealth2.utils.supabase.upload_executor", self.executor),
+            mock.patch("docuhealth2.utils.supabase.upload_file_to_supabase", side_effect=lambda source, name, *args: {"path": f"docs/{name}"}),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_exhausted_pool_gives_up_after_the_acquire_timeout(self):
+        pool = SupabaseClientPool(size=1, timeout=5, acquire_timeout=0.05)
+        with mock.patch.object(pool, "_create", return_value="client"):
+            with pool.client():
+                with self.assertRaises(UploadTimeout):
+                    pool.acquire()
+
+            self.assertEqual(pool.acquire(), "client")
+
+    @override_settings(SUPABASE_UPLOAD_QUEUE_TIMEOUT=0.05)
+    def test_queued_upload_gives_up_when_no_worker_picks_it_up(self):
+        start = time.perf_counter()
+        with self.assertRaises(UploadTimeout):
+            upload_files([SimpleUploadedFile("scan.pdf", b"%PDF-1.4", content_type="application/pdf")], "docs")
+        self.assertLess(time.perf_counter() - start, 1)
+
+    @override_settings(SUPABASE_UPLOAD_QUEUE_TIMEOUT=0.05)
+    def test_timed_out_upload_is_dropped_from_the_queue(self):
+        upload = QueuedUpload(b"%PDF-1.4", "scan.pdf", "application/pdf", "docs")
+
+        with self.assertRaises(UploadTimeout):
+            upload.result()
+        self.assertTrue(upload.future.cancel())
+
+    @override_settings(SUPABASE_UPLOAD_TIMEOUT=0.05)
+    def test_upload_timeout_runs_from_when_the_upload_starts(self):
+        upload = QueuedUpload(b"%PDF-1.4", "scan.pdf", "application/pdf", "docs")
+        time.sleep(0.1)
+        self.release.set()
+
+        self.assertEqual(upload.result(), {"path": "docs/scan.pdf"})
+
+class MedicalSummaryRenderingTests(TestCase):
+    """The values()-based renderers in summaries.py must produce the serializers' JSON byte for byte."""
+
+    @classmethod
+    def setUpTestData(cls):
+        hospital, doctor, patient = create_clinic("summaries")
+        referral = HospitalProfile.objects.create(
+            user=User.objects.create(email="summaries-referral@docuhealth.local", role=User.Role.HOSPITAL), name="Referral Hospital"
+        )
+
+        for i in range(12):
+            vitals = VitalSigns.objects.create(patient=patient, staff=doctor, hospital=hospital, blood_pressure="120/80", temp=36.8, heart_rate=72)
+            note = SoapNote.objects.create(
+                patient=patient, staff=doctor if i % 5 else None, hospital=hospital, vital_signs=vitals if i % 4 else None,
+                chief_complaint="Headache", primary_diagnosis="Migraine", treatment_plan=["Rest", "Hydration"],
+                care_instructions=["Avoid screens"], investigations=["FBC"], problems_list=["Recurrent headaches"],
+                investigation_docs=[{"url": "https://example.com/scan.pdf", "status": "uploaded"}],
+                referred_docuhealth_hosp=referral if i % 6 == 0 else None, referred_hosp="General Hospital" if i % 6 == 1 else None,
+            )
+            DrugRecord.objects.bulk_create([
+                DrugRecord(
+                    soap_note=note, patient=patient, hospital=hospital, name=name, route="oral", quantity=10,
+                    frequency={"value": 2, "rate": "daily"}, duration={"value": 5, "rate": "days"}, allergies=["penicillin"],
+                    upload_source=DrugRecord.UploadSource.SOAPNOTE,
+                )
+                for name in ("Paracetamol", "Ibuprofen")[:i % 3]
+            ])
+            if i % 2:
+                Appointment.objects.create(patient=patient, staff=doctor, hospital=hospital, soap_note=note, type="follow-up", scheduled_time=timezone.now() + timedelta(days=7))
+            if i % 3 == 0:
+                SoapNoteAdditionalNotes.objects.create(soap_note=note, note="Patient called back, feeling better")
+
+        cls.queryset = SoapNote.objects.filter(patient=patient).order_by("-created_at", "-id")
+
+    def assert_renders_like(self, serializer_class, to_rows, render):
+        instances = self.queryset.select_related(
+            "patient", "staff", "hospital", "hospital__user", "vital_signs", "appointment", "referred_docuhealth_hosp"
+        ).prefetch_related(
+            Prefetch("drug_records", queryset=DrugRecord.objects.order_by("id")),
+            Prefetch("additional_notes", queryset=SoapNoteAdditionalNotes.objects.order_by("id")),
+        )
+        renderer = JSONRenderer()
+
+        expected = renderer.render(serializer_class(list(instances), many=True).data)
+        actual = renderer.render(render(list(to_rows(self.queryset))))
+
+        self.assertEqual(actual, expected)
+
+    def test_medical_summaries_match_the_serializer(self):
+        self.assert_renders_like(MedicalSummarySerializer, medical_summary_rows, render_medical_summaries)
+
+    def test_soap_notes_match_the_serializer(self):
+        self.assert_renders_like(SoapNoteSerializer, soap_note_rows, render_soap_notes)
+
+class PatientTimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital, cls.doctor, cls.patient = create_clinic("timeline")
+        cls.doctor.user.is_active = True
+        cls.doctor.user.save(update_fields=["is_active"])
+        other_hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email="timeline-other@docuhealth.local", role=User.Role.HOSPITAL), name="Other Hospital"
+        )
+
+        now = timezone.now()
+        created = []
+        for _ in range(3):
+            created.append(SoapNote.objects.create(patient=cls.patient, staff=cls.doctor, hospital=cls.hospital, chief_complaint="Headache", primary_diagnosis="Migraine"))
+            created.append(VitalSigns.objects.create(patient=cls.patient, staff=cls.doctor, hospital=cls.hospital, temp=36.8))
+            created.append(Appointment.objects.create(patient=cls.patient, staff=cls.doctor, hospital=cls.hospital, scheduled_time=now))
+        # Same patient at another hospital: not on this hospital's chart
+        VitalSigns.objects.create(patient=cls.patient, hospital=other_hospital, temp=37.5)
+
+        # Most rows share one timestamp across three tables, so pages must break ties on type and id
+        for row, offset in zip(created, (0, 0, 0, 0, 0, 0, -1, -1, -1)):
+            type(row).objects.filter(pk=row.pk).update(created_at=now + timedelta(seconds=offset))
+
+        sources = {SoapNote: "soap_note", VitalSigns: "vital_signs", Appointment: "appointment"}
+        rows = [(type(row).objects.values_list("created_at", flat=True).get(pk=row.pk), sources[type(row)], row.pk) for row in created]
+        cls.expected = [(source, pk) for _, source, pk in sorted(rows, reverse=True)]
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {CustomTokenObtainPairSerializer.get_token(self.doctor.user).access_token}")
+        self.url = f"/api/medical-records/timeline/{self.patient.hin}"
+
+    def walk(self, size):
+        seen, url = [], f"{self.url}?size={size}"
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            seen.extend((entry["type"], entry["id"]) for entry in response.data["results"])
+            url = response.data["next"]
+        return seen
+
+    def test_pages_resume_exactly_across_tables_with_tied_timestamps(self):
+        for size in (1, 2, 4, 20):
+            self.assertEqual(self.walk(size), self.expected, f"size={size}")
+
+    def test_bad_cursor_is_a_404(self):
+        for cursor in ("not-a-cursor", "eyJ0IjoieCJ9"):
+            self.assertEqual(self.api.get(f"{self.url}?cursor={cursor}").status_code, 404, cursor)
+
+class PatientExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital, cls.doctor, cls.patient = create_clinic("export")
+        cls.doctor.user.is_active = True
+        cls.doctor.user.save(update_fields=["is_active"])
+        other_hospital = HospitalProfile.objects.create(
+            user=User.objects.create(email="export-other@docuhealth.local", role=User.Role.HOSPITAL), name="Other Hospital"
+        )
+
+        cls.note = SoapNote.objects.create(
+            patient=cls.patient, staff=cls.doctor, hospital=cls.hospital, chief_complaint="Headache", primary_diagnosis="Migraine",
+            investigation_docs=[{"id": "doc-1", "url": "https://storage.example/scan.pdf", "filename": "scan.pdf", "content_type": "application/pdf", "status": AttachmentStatus.UPLOADED}],
+        )
+        cls.vitals = VitalSigns.objects.create(patient=cls.patient, staff=cls.doctor, hospital=cls.hospital, temp=36.8)
+        cls.appointment = Appointment.objects.create(patient=cls.patient, staff=cls.doctor, hospital=cls.hospital, scheduled_time=timezone.now())
+        cls.elsewhere = VitalSigns.objects.create(patient=cls.patient, hospital=other_hospital, temp=37.5)
+
+    def export(self, query=""):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f"Bearer {CustomTokenObtainPairSerializer.get_token(self.doctor.user).access_token}")
+        response = api.get(f"/api/medical-records/export/{self.patient.hin}{query}")
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_ndjson_export_is_scoped_to_the_hospital(self):
+        response, body = self.export()
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        entries = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(entries[0]["type"], "patient")
+        self.assertEqual(
+            {(entry["type"], entry["id"]) for entry in entries[1:]},
+            {("soap_note", self.note.id), ("vital_signs", self.vitals.id), ("appointment", self.appointment.id), ("attachment", "doc-1")},
+        )
+        attachment = next(entry["data"] for entry in entries if entry["type"] == "attachment")
+        self.assertEqual((attachment["source"], attachment["source_id"], attachment["url"]), ("soap_note", self.note.id, "https://storage.example/scan.pdf"))
+
+    def test_fhir_export_is_one_bundle(self):
+        response, body = self.export("?output=fhir")
+
+        self.assertEqual(response["Content-Type"], "application/fhir+json")
+        bundle = json.loads(body)
+        self.assertEqual((bundle["resourceType"], bundle["type"]), ("Bundle", "collection"))
+        resources = {(entry["resource"]["resourceType"], entry["resource"]["id"]) for entry in bundle["entry"]}
+        self.assertEqual(resources, {
+            ("Patient", self.patient.hin), ("Composition", str(self.note.id)), ("Observation", str(self.vitals.id)),
+            ("Appointment", str(self.appointment.id)), ("DocumentReference", "doc-1"),
+        })
+
+    def test_unscoped_export_covers_every_hospital(self):
+        vitals = {entry_id for source, entry_id, _ in export_entries(self.patient) if source == "vital_signs"}
+
+        self.assertEqual(vitals, {self.vitals.id, self.elsewhere.id})
@@ -0,0 +1,45 @@
+from django.db.models import F
+
+from hospital_ops.models import Appointment
+
+from .models import SoapNote, CaseNote, VitalSigns, DischargeForm, DrugRecord, Admission
+
+STAFF_FIELDS = {
+    "staff_firstname": F("staff__firstname"),
+    "staff_lastname": F("staff__lastname"),
+    "staff_role": F("staff__role"),
+}
+
+# Entry type: (model, path from the model to the patient, fields the entry carries)
+TIMELINE_SOURCES = {
+    "soap_note": (SoapNote, "patient", ["chief_complaint", "primary_diagnosis", "differential_diagnosis", "treatment_plan", "care_instructions"]),
+    "case_note": (CaseNote, "patient", ["observation", "care", "response", "abnormalities", "follow_up"]),
+    "vital_signs": (VitalSigns, "patient", ["blood_pressure", "temp", "resp_rate", "height", "weight", "heart_rate"]),
+    "discharge_form": (DischargeForm, "admission__patient", ["admission_id", "chief_complaint", "condition_on_discharge", "diagnosis"]),
+    "drug_record": (DrugRecord, "patient", ["name", "route", "quantity", "frequency", "duration", "status"]),
+    "admission": (Admission, "patient", ["status", "ward_id", "bed_id", "admission_date", "discharge_date"]),
+    "appointment": (Appointment, "patient", ["type", "status", "scheduled_time", "note"]),
+}
+
+def timeline_querysets(patient, hospital):
+    """One `.values()` queryset per entry type, limited to what the patient's chart at `hospital` shows."""
+    querysets = {}
+    for source, (model, patient_path, fields) in TIMELINE_SOURCES.items():
+        # Drug records carry no staff member
+        staff_fields = STAFF_FIELDS if any(field.name == "staff" for field in model._meta.fields) else {}
+        querysets[source] = model.objects.filter(**{patient_path: patient}, hospital=hospital).values("id", "created_at", *fields, **staff_fields)
+    return querysets
+
+def timeline_entry(row):
+    """Shapes a merged row into {type, id, created_at, staff, data}."""
+    row = dict(row)
+    source = row.pop("source")
+    firstname, lastname, role = (row.pop(key, None) for key in STAFF_FIELDS)
+
+    return {
+        "type": source,
+        "id": row.pop("id"),
+        "created_at": row.pop("created_at"),
+        "staff": {"name": f"{firstname} {lastname}", "role": role} if firstname is not None else None,
+        "data": row,
+    }
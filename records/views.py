@@ -15,10 +15,15 @@ from drf_spectacular.types import OpenApiTypes
 
 from docuhealth2.permissions import IsAuthenticatedHospitalAdmin, IsAuthenticatedNurse, IsAuthenticatedDoctor, IsAuthenticatedHospitalStaff, IsAuthenticatedReceptionist, IsAuthenticatedPatient
 from docuhealth2.authentications import ClientHeaderAuthentication
-from docuhealth2.utils.supabase import upload_files, delete_from_supabase
+from docuhealth2.pagination import SelectablePagination, MergedKeysetPagination
+from docuhealth2.views import HospitalScopedMixin
 
 from .models import CaseNote, MedicalRecord, MedicalRecordAttachment, VitalSignsRequest, Admission, DrugRecord, VitalSigns, SoapNote, DischargeForm
-from .serializers import CaseNoteSerializer, MedicalRecordAttachmentSerializer, VitalSignsRequestSerializer, VitalSignsViaRequestSerializer, VitalSignsSerializer, AdmissionSerializer, ConfirmAdmissionSerializer, ClientDrugRecordSerializer, DrugRecordSerializer, SoapNoteSerializer, DischargeFormSerializer, SoapNoteAdditionalNotesSerializer, MedicalSummarySerializer
+from .attachments import stage_attachments, attachments_status
+from .timeline import timeline_querysets, timeline_entry
+from .export import FORMATS as EXPORT_FORMATS, export_response
+from .summaries import MedicalSummaryListMixin, soap_note_rows, render_soap_notes
+from .serializers import CaseNoteSerializer, MedicalRecordAttachmentSerializer, VitalSignsRequestSerializer, VitalSignsViaRequestSerializer, VitalSignsSerializer, AdmissionSerializer, ConfirmAdmissionSerializer, ClientDrugRecordSerializer, DrugRecordSerializer, SoapNoteSerializer, DischargeFormSerializer, SoapNoteAdditionalNotesSerializer, MedicalSummarySerializer, TimelineEntrySerializer
 from .schema import CREATE_SOAP_NOTE_SCHEMA, CREATE_DISCHARGE_FORM_SCHEMA
 
 from facility.models import WardBed
@@ -31,13 +36,13 @@ from organizations.models import Subscription
 
 
 @extend_schema(tags=["Medical records"])  
-class MedicalRecordListView(generics.ListAPIView):
+class MedicalRecordListView(MedicalSummaryListMixin, generics.ListAPIView):
     queryset = SoapNote.objects.all().select_related("patient", "hospital", "staff").prefetch_related("drug_records", "attachments").order_by('-created_at')
     serializer_class = MedicalSummarySerializer
     permission_classes = [IsAuthenticatedHospitalStaff | IsAuthenticatedHospitalAdmin]
 
 @extend_schema(tags=["Medical records"], summary="List medical records for a patient")    
-class ListUserMedicalrecordsView(generics.ListAPIView):
+class ListUserMedicalrecordsView(MedicalSummaryListMixin, generics.ListAPIView):
     serializer_class = MedicalSummarySerializer
     
     def get_queryset(self):
@@ -48,12 +53,12 @@ class ListUserMedicalrecordsView(generics.ListAPIView):
             return SoapNote.objects.filter(patient=user.patient_profile).select_related("patient", "hospital", "staff").prefetch_related("drug_records", "appointment").order_by('-created_at')
         
         if role == 'hospital':
-            return SoapNote.objects.filter(hospital=user.hospital_profile).select_related("patient", "hospital", "staff").prefetch_related("drug_records", "appointment").order_by('-created_at')
+            return SoapNote.objects.filter(hospital=self.request.hospital).select_related("patient", "hospital", "staff").prefetch_related("drug_records", "appointment").order_by('-created_at')
         
         return SoapNote.objects.none()
 
 @extend_schema(tags=["Doctor"], summary="Get patients medical records")
-class ListPatientMedicalRecordsView(generics.ListAPIView):
+class ListPatientMedicalRecordsView(MedicalSummaryListMixin, generics.ListAPIView):
     serializer_class = MedicalSummarySerializer
     permission_classes = [IsAuthenticatedDoctor]
 
@@ -71,9 +76,10 @@ class ListPatientMedicalRecordsView(generics.ListAPIView):
 class ListVitalSignsRequest(generics.ListAPIView):
     serializer_class = VitalSignsRequestSerializer
     permission_classes = [IsAuthenticatedNurse]
+    authenticate_from_claims = True
     
     def get_queryset(self):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         return VitalSignsRequest.objects.filter(staff=staff, status=VitalSignsRequest.Status.REQUESTED).select_related("staff").order_by("-created_at")
     
 @extend_schema(tags=["Nurse"], summary="Process a vital signs request")
@@ -85,7 +91,7 @@ class ProcessVitalSignsRequestView(generics.CreateAPIView):
     def perform_create(self, serializer):
         vital_signs_request = serializer.validated_data.pop('request')
         patient = vital_signs_request.patient
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         serializer.save(patient=patient, staff=staff, hospital=hospital)
@@ -100,7 +106,7 @@ class UpdatePatientVitalSignsView(generics.CreateAPIView):
     permission_classes = [IsAuthenticatedNurse]
     
     def perform_create(self, serializer):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         serializer.save(staff=staff, hospital=hospital)
@@ -109,6 +115,8 @@ class UpdatePatientVitalSignsView(generics.CreateAPIView):
 class ListPatientVitalSignsView(generics.ListAPIView):
     serializer_class = VitalSignsSerializer
     permission_classes = [IsAuthenticatedNurse]
+    authenticate_from_claims = True
+    pagination_class = SelectablePagination
     
     def get_queryset(self):
         hin = self.kwargs.get("patient_hin")
@@ -129,13 +137,14 @@ class RequestVitalSignsView(generics.CreateAPIView):
     permission_classes = [IsAuthenticatedDoctor]
     
     def perform_create(self, serializer):
-        hospital = self.request.user.hospital_staff_profile.hospital
+        hospital = self.request.hospital
         return serializer.save(hospital=hospital)
     
 @extend_schema(tags=["Hospital", "Nurse", "Doctor"], summary="List admitted patient by status")
 class ListAdmittedPatientsByStatusView(generics.ListAPIView):
     serializer_class = AdmissionSerializer
     permission_classes = [IsAuthenticatedHospitalAdmin | IsAuthenticatedHospitalStaff]
+    authenticate_from_claims = True
     
     def get_queryset(self):
         status_param = self.kwargs.get('status')
@@ -146,17 +155,17 @@ class ListAdmittedPatientsByStatusView(generics.ListAPIView):
 
         user = self.request.user
 
-        if hasattr(user, "hospital_profile"):
-            hospital = user.hospital_profile
+        if user.role == User.Role.HOSPITAL:
+            hospital = self.request.hospital
             return (
                 Admission.objects.filter(hospital=hospital, status=status_param)
                 .select_related("patient", "staff", "hospital", "ward")
                 .order_by("-admission_date")
             )
 
-        staff = user.hospital_staff_profile
-        hospital = staff.hospital
-        ward = getattr(staff, "ward", None)
+        staff = self.request.staff
+        hospital = self.request.hospital
+        ward = staff.ward
 
         role = staff.role  
 
@@ -185,7 +194,7 @@ class ConfirmAdmissionView(generics.UpdateAPIView):
     
     def get_object(self):
         admission_id = self.kwargs[self.lookup_url_kwarg]
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
 
         try:
             return Admission.objects.get(id=admission_id, hospital=staff.hospital)
@@ -204,8 +213,7 @@ class ConfirmAdmissionView(generics.UpdateAPIView):
         admission.admission_date = timezone.now()
         admission.save(update_fields=["status", "admission_date"])
 
-        admission.bed.status = WardBed.Status.OCCUPIED
-        admission.bed.save(update_fields=["status"])
+        admission.bed.set_status(WardBed.Status.OCCUPIED)
 
         return Response({"detail": "Admission confirmed successfully."}, status=status.HTTP_200_OK)
     
@@ -213,11 +221,11 @@ class ConfirmAdmissionView(generics.UpdateAPIView):
 class ListAdmissionsView(generics.ListAPIView):
     serializer_class = AdmissionSerializer
     permission_classes = [IsAuthenticatedNurse]
+    authenticate_from_claims = True
     
     def get_queryset(self):
-        user = self.request.user
-        staff = user.hospital_staff_profile
-        hospital = staff.hospital
+        staff = self.request.staff
+        hospital = self.request.hospital
         ward = staff.ward
         
         if not ward:
@@ -229,9 +237,10 @@ class ListAdmissionsView(generics.ListAPIView):
 class ListAdmissionRequestsView(generics.ListAPIView):
     serializer_class = AdmissionSerializer
     permission_classes = [IsAuthenticatedNurse]
+    authenticate_from_claims = True
     
     def get_queryset(self):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         ward = staff.ward
         
@@ -244,14 +253,12 @@ class RequestAdmissionView(generics.CreateAPIView):
     
     @transaction.atomic
     def perform_create(self, serializer):
-        admission = serializer.save(hospital=self.request.user.hospital_staff_profile.hospital)
+        admission = serializer.save(hospital=self.request.hospital)
         
-        bed = admission.bed
-        bed.status = WardBed.Status.REQUESTED
-        bed.save(update_fields=["status"])
+        admission.bed.set_status(WardBed.Status.REQUESTED)
         
         patient = admission.patient
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         HospitalPatientActivity.objects.create(patient=patient, staff=staff, hospital=hospital, action="request_admission")
@@ -260,9 +267,10 @@ class RequestAdmissionView(generics.CreateAPIView):
 class ListAdmissionRequestsView(generics.ListAPIView):
     serializer_class = AdmissionSerializer
     permission_classes = [IsAuthenticatedReceptionist]
+    authenticate_from_claims = True
     
     def get_queryset(self):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         return Admission.objects.filter(hospital=hospital, status=Admission.Status.PENDING).order_by('request_date')
@@ -296,7 +304,7 @@ class CreateCaseNotesView(generics.CreateAPIView):
     permission_classes = [IsAuthenticatedDoctor | IsAuthenticatedNurse]
     
     def perform_create(self, serializer):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         serializer.save(staff=staff, hospital=hospital)
@@ -305,10 +313,11 @@ class CreateCaseNotesView(generics.CreateAPIView):
 class ListCaseNotesView(generics.ListAPIView):
     serializer_class = CaseNoteSerializer
     permission_classes = [IsAuthenticatedDoctor | IsAuthenticatedNurse]
+    authenticate_from_claims = True
     
     def get_queryset(self):
         hin = self.kwargs.get("hin")
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         
         patient = get_object_or_404(PatientProfile, hin=hin)
         return CaseNote.objects.filter(patient=patient, hospital=staff.hospital).select_related("patient", "staff", "hospital").order_by('-created_at')
@@ -420,26 +429,24 @@ class CreateSoapNoteView(generics.CreateAPIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def create(self, request, *args, **kwargs):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        investigation_docs = request.FILES.getlist("investigation_docs")
-        uploaded_data = []
-        if investigation_docs:
-            uploaded_data = upload_files(investigation_docs, "soapnote_investigations")
+        attachments = stage_attachments(request.FILES.getlist("investigation_docs"), "soapnote_investigations")
         
         try: 
-            instance = serializer.save(hospital=hospital, staff=staff, investigation_docs=uploaded_data)
+            with transaction.atomic():
+                instance = serializer.save(hospital=hospital, staff=staff, investigation_docs=attachments.entries)
+                attachments.queue(soap_note=instance)
             
             headers = self.get_success_headers(serializer.data)
             return Response(self.get_serializer(instance).data, status=status.HTTP_201_CREATED, headers=headers)
             
         except Exception as e:
-            for doc in uploaded_data:
-                delete_from_supabase(doc['path'])
+            attachments.discard()
             
             print(f"Soap Note Error: {str(e)}")
             raise e
@@ -448,14 +455,19 @@ class CreateSoapNoteView(generics.CreateAPIView):
 class ListPatientSoapNotesView(generics.ListAPIView):
     serializer_class = SoapNoteSerializer
     permission_classes = [IsAuthenticatedDoctor | IsAuthenticatedNurse]
+    authenticate_from_claims = True
     
     def get_queryset(self):
         hin = self.kwargs.get("hin")
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         
         patient = get_object_or_404(PatientProfile, hin=hin)
         return SoapNote.objects.filter(patient=patient, hospital=staff.hospital).select_related("patient", "staff", "hospital").order_by('-created_at')
     
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(soap_note_rows(self.get_queryset()))
+        return self.get_paginated_response(render_soap_notes(page))
+    
 @extend_schema(tags=["Medical records"], summary="Discharge a patient", **CREATE_DISCHARGE_FORM_SCHEMA)    
 class DischargePatientView(generics.CreateAPIView):
     serializer_class = DischargeFormSerializer
@@ -463,51 +475,117 @@ class DischargePatientView(generics.CreateAPIView):
     parser_classes = [MultiPartParser, FormParser]
     
     def create(self, request, *args, **kwargs):
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         hospital = staff.hospital
         
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        investigation_docs = request.FILES.getlist("investigation_docs")
-        uploaded_data = []
-        if investigation_docs:
-            uploaded_data = upload_files(investigation_docs, "discharge_form_investigations")
+        attachments = stage_attachments(request.FILES.getlist("investigation_docs"), "discharge_form_investigations")
         
         try:
             with transaction.atomic():
-                serializer.save(hospital=hospital, staff=staff, investigation_docs=uploaded_data)
+                discharge_form = serializer.save(hospital=hospital, staff=staff, investigation_docs=attachments.entries)
+                attachments.queue(discharge_form=discharge_form)
                 
                 admission = serializer.validated_data.get('admission')
                 admission.status = Admission.Status.DISCHARGED
                 admission.discharge_date = timezone.now()
                 admission.save(update_fields=['status', 'discharge_date'])
                 
-                admission.bed.status = WardBed.Status.AVAILABLE
-                admission.bed.save(update_fields=["status"])
+                admission.bed.set_status(WardBed.Status.AVAILABLE)
                 
                 headers = self.get_success_headers(serializer.data)
                 return Response({"detail": "Patient discharged successfully."}, status=status.HTTP_201_CREATED, headers=headers)
             
         except Exception as e:
-            for doc in uploaded_data:
-                delete_from_supabase(doc['path'])
+            attachments.discard()
             
             print(f"Discharge Form Error: {str(e)}")
             raise e
         
+@extend_schema(tags=["Medical records"], summary="Upload status of a SOAP note or discharge form's investigation docs")
+class AttachmentUploadStatusView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticatedDoctor | IsAuthenticatedNurse]
+    model = None
+    
+    def get(self, request, pk):
+        staff = request.staff
+        instance = get_object_or_404(self.model, pk=pk, hospital=staff.hospital)
+        docs = instance.investigation_docs or []
+        
+        return Response({"status": attachments_status(docs), "investigation_docs": docs}, status=status.HTTP_200_OK)
+        
 @extend_schema(tags=["Medical records"], summary="List discharge forms for a patient")
 class ListPatientDischargeFormsView(generics.ListAPIView):
     serializer_class = DischargeFormSerializer
     permission_classes = [IsAuthenticatedDoctor | IsAuthenticatedNurse]
+    authenticate_from_claims = True
     
     def get_queryset(self):
         hin = self.kwargs.get("hin")
-        staff = self.request.user.hospital_staff_profile
+        staff = self.request.staff
         
         patient = get_object_or_404(PatientProfile, hin=hin)
         return DischargeForm.objects.filter(patient=patient, hospital=staff.hospital).select_related("patient", "staff", "hospital").order_by('-created_at')
     
+@extend_schema(tags=["Medical records"], summary="Patient timeline: SOAP notes, case notes, vitals, discharges, drugs, admissions and appointments, newest first")
+class PatientTimelineView(HospitalScopedMixin, generics.ListAPIView):
+    """
+    Replaces one list call per record type when a chart opens. Pages are keyed on
+    (created_at, type, id) and follow the `next` link; the patient's basic info comes along
+    so the chart needs no other request.
+    """
+    serializer_class = TimelineEntrySerializer
+    permission_classes = [IsAuthenticatedDoctor | IsAuthenticatedNurse]
+    authenticate_from_claims = True
+    pagination_class = MergedKeysetPagination
+    
+    def list(self, request, *args, **kwargs):
+        patient = get_object_or_404(PatientProfile, hin=kwargs.get("hin"))
+        
+        rows = self.paginator.paginate_querysets(timeline_querysets(patient, self.get_hospital()), request, view=self)
+        serializer = self.get_serializer([timeline_entry(row) for row in rows], many=True)
+        
+        response = self.get_paginated_response(serializer.data)
+        response.data["patient"] = PatientBasicInfoSerializer(patient).data
+        return response
+    
+class PatientExportMixin():
+    """
+    Streams a patient's chart as NDJSON (default) or, with `?output=fhir`, a FHIR-style Bundle.
+    Rows are read and written in chunks while the response streams, so nothing is paged.
+    """
+    
+    def export(self, patient, hospital=None):
+        output = self.request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({"output": f"Must be one of: {', '.join(EXPORT_FORMATS)}."})
+        
+        return export_response(patient, output, hospital)
+
+EXPORT_SCHEMA = dict(
+    parameters=[OpenApiParameter("output", OpenApiTypes.STR, enum=EXPORT_FORMATS, description="ndjson (default) or fhir")],
+    responses={200: OpenApiTypes.BINARY},
+)
+
+@extend_schema(tags=["Patient"], summary="Export all of my medical records", **EXPORT_SCHEMA)
+class ExportPatientRecordsView(PatientExportMixin, generics.GenericAPIView):
+    permission_classes = [IsAuthenticatedPatient]
+    
+    def get(self, request, *args, **kwargs):
+        return self.export(request.user.patient_profile)
+    
+@extend_schema(tags=["Medical records"], summary="Export a patient's records at this hospital", **EXPORT_SCHEMA)
+class ExportPatientChartView(PatientExportMixin, HospitalScopedMixin, generics.GenericAPIView):
+    """Everything the hospital has recorded for the patient, e.g. to send along with a referral."""
+    permission_classes = [IsAuthenticatedDoctor | IsAuthenticatedNurse | IsAuthenticatedHospitalAdmin]
+    authenticate_from_claims = True
+    
+    def get(self, request, *args, **kwargs):
+        patient = get_object_or_404(PatientProfile, hin=kwargs.get("hin"))
+        return self.export(patient, self.get_hospital())
+    
 @extend_schema(tags=["Medical records"], summary="Create additional notes for a SOAP note")
 class CreateSoapNoteAdditionalNotesView(generics.CreateAPIView):
     serializer_class = SoapNoteAdditionalNotesSerializer